@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+
+# Benchmark of the construction and solving of hashis.
+
+# The benchmark runs over the example puzzles in the fls folder
+# and over synthetic puzzles of increasing size,
+# and reports per size bucket the construction time, solving time,
+# peak memory usage and fraction of solved puzzles.
+# The results can be stored as a json file, and compared to a previously stored one
+# (the baseline), in which case the exit code is nonzero
+# if any bucket got slower by more than a given threshold
+# or if its fraction of solved puzzles decreased.
+
+# external imports
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import platform
+import tracemalloc
+import numpy as np
+
+# local imports
+thisdir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(thisdir, '../src'))
+from hashi import Hashi
+import generator
+sys.path.append(os.path.join(thisdir, '../solver'))
+import hashisolver
+
+
+def run_puzzle(txt, engine='rules', repeat=1, memory=True):
+    ### benchmark the construction and solving of one puzzle
+    # input arguments:
+    # - txt: string representation of the puzzle (see Hashi.from_str)
+    # - engine: solving engine (see hashisolver.engines)
+    # - repeat: number of repetitions; the minimum time is reported
+    # - memory: whether to measure the peak memory usage
+    #   (in a separate repetition, since tracing the memory slows down the execution)
+    # returns:
+    # - a dict with the number of vertices, construction time, solving time,
+    #   peak memory (in bytes, None if not measured) and whether the puzzle was solved.
+    result = {'construction_time': None, 'solve_time': None}
+    for _ in range(repeat):
+        starttime = time.perf_counter()
+        h = Hashi.from_str(txt)
+        construction_time = time.perf_counter() - starttime
+        starttime = time.perf_counter()
+        hashisolver.solve(h, engine=engine)
+        solve_time = time.perf_counter() - starttime
+        if result['solve_time'] is None or solve_time < result['solve_time']:
+            result['construction_time'] = construction_time
+            result['solve_time'] = solve_time
+    result['nvertices'] = h.nvertices
+    result['solved'] = bool(h.complete and h.disjointset.nsets==1)
+    result['peak_memory'] = None
+    if memory:
+        tracemalloc.start()
+        h = Hashi.from_str(txt)
+        hashisolver.solve(h, engine=engine)
+        result['peak_memory'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result
+
+
+def make_buckets(puzzles):
+    ### group the results of individual puzzles per bucket
+    buckets = {}
+    for puzzle in puzzles: buckets.setdefault(puzzle['bucket'], []).append(puzzle)
+    res = {}
+    for name, bucket in buckets.items():
+        memories = [p['peak_memory'] for p in bucket if p['peak_memory'] is not None]
+        res[name] = {
+          'npuzzles': len(bucket),
+          'mean_nvertices': float(np.mean([p['nvertices'] for p in bucket])),
+          'construction_time': float(np.sum([p['construction_time'] for p in bucket])),
+          'solve_time': float(np.sum([p['solve_time'] for p in bucket])),
+          'max_solve_time': float(np.max([p['solve_time'] for p in bucket])),
+          'peak_memory': int(np.max(memories)) if len(memories)>0 else None,
+          'solve_rate': float(np.mean([p['solved'] for p in bucket])),
+        }
+    return res
+
+
+def compare(buckets, baseline, threshold=0.2, tolerance=0.01):
+    ### compare bucket results to a baseline
+    # input arguments:
+    # - buckets: bucket results (see make_buckets)
+    # - baseline: bucket results of the baseline
+    # - threshold: maximum allowed relative increase of the construction and solving time
+    # - tolerance: absolute increase of the time (in seconds) that is always allowed
+    #   (to avoid failures because of noise on very short times)
+    # returns:
+    # - a list of messages describing the regressions (empty if there are none)
+    regressions = []
+    for name, bucket in buckets.items():
+        if name not in baseline: continue
+        ref = baseline[name]
+        for key in ['construction_time', 'solve_time']:
+            increase = bucket[key] - ref[key]
+            if increase > threshold*ref[key] and increase > tolerance:
+                msg = 'bucket {}: {} increased from {:.4f} s to {:.4f} s'.format(
+                        name, key, ref[key], bucket[key])
+                regressions.append(msg)
+        if bucket['solve_rate'] < ref['solve_rate']:
+            msg = 'bucket {}: solve rate decreased from {:.3f} to {:.3f}'.format(
+                    name, ref['solve_rate'], bucket['solve_rate'])
+            regressions.append(msg)
+    return regressions
+
+
+if __name__=='__main__':
+
+    # read command line arguments
+    parser = argparse.ArgumentParser(description='Benchmark hashi construction and solving')
+    parser.add_argument('--sizes', default=[10, 20, 50, 100], type=int, nargs='*',
+      help='Sizes (width and height) of synthetic puzzles (default: 10 20 50 100).')
+    parser.add_argument('--nboards', default=3, type=int,
+      help='Number of synthetic puzzles per size (default: 3).')
+    parser.add_argument('--density', default=0.08, type=float,
+      help='Target island density of the synthetic puzzles (default: 0.08).')
+    parser.add_argument('--seed', default=0, type=int,
+      help='Random seed for the synthetic puzzles (default: 0).')
+    parser.add_argument('--engine', default='rules', choices=hashisolver.engines,
+      help='Solving engine (default: rules).')
+    parser.add_argument('--repeat', default=3, type=int,
+      help='Number of repetitions per puzzle; the minimum time is reported (default: 3).')
+    parser.add_argument('--no-fls', default=False, action='store_true',
+      help='Do not include the puzzles in the fls folder.')
+    parser.add_argument('--no-memory', default=False, action='store_true',
+      help='Do not measure the peak memory usage.')
+    parser.add_argument('-o', '--outputfile', default=None,
+      help='File to write the results to in json format (e.g. to use as a baseline later).')
+    parser.add_argument('-b', '--baseline', default=None,
+      help='Json file with baseline results to compare to.')
+    parser.add_argument('--threshold', default=0.2, type=float,
+      help='Maximum allowed relative increase in time with respect to the baseline (default: 0.2).')
+    parser.add_argument('--tolerance', default=0.01, type=float,
+      help='Absolute increase in time (in seconds) that is always allowed (default: 0.01).')
+    args = parser.parse_args()
+
+    # make the list of puzzles
+    # note: each element is a tuple of the form (bucket, name, string representation)
+    inputs = []
+    if not args.no_fls:
+        flsfiles = sorted(glob.glob(os.path.join(thisdir, '../fls/**/*.txt'), recursive=True))
+        for flsfile in flsfiles:
+            with open(flsfile, 'r') as f: txt = f.read()
+            inputs.append(('fls', os.path.relpath(flsfile, os.path.join(thisdir, '..')), txt))
+    for size in args.sizes:
+        for idx in range(args.nboards):
+            txt = generator.generate_str(size, size, seed=args.seed+idx, density=args.density)
+            name = 'synthetic_{}x{}_{}'.format(size, size, args.seed+idx)
+            inputs.append(('synthetic_{}x{}'.format(size, size), name, txt))
+
+    # run the benchmark
+    puzzles = []
+    for bucket, name, txt in inputs:
+        result = run_puzzle(txt, engine=args.engine, repeat=args.repeat, memory=not args.no_memory)
+        result['bucket'] = bucket
+        result['name'] = name
+        puzzles.append(result)
+    buckets = make_buckets(puzzles)
+
+    # print the results
+    header = '{:<20} {:>8} {:>10} {:>14} {:>12} {:>14} {:>11}'.format(
+               'bucket', 'puzzles', 'vertices', 'construct [s]', 'solve [s]', 'memory [MB]', 'solve rate')
+    print(header)
+    print('-'*len(header))
+    for name, bucket in buckets.items():
+        memory = '-' if bucket['peak_memory'] is None else '{:.2f}'.format(bucket['peak_memory']/1e6)
+        print('{:<20} {:>8} {:>10.1f} {:>14.4f} {:>12.4f} {:>14} {:>11.3f}'.format(
+          name, bucket['npuzzles'], bucket['mean_nvertices'], bucket['construction_time'],
+          bucket['solve_time'], memory, bucket['solve_rate']))
+
+    # write the results
+    if args.outputfile is not None:
+        meta = {'python': platform.python_version(), 'numpy': np.__version__,
+                'platform': platform.platform(), 'engine': args.engine,
+                'date': time.strftime('%Y-%m-%d %H:%M:%S')}
+        with open(args.outputfile, 'w') as f:
+            json.dump({'meta': meta, 'buckets': buckets, 'puzzles': puzzles}, f, indent=2)
+
+    # compare to the baseline
+    if args.baseline is not None:
+        with open(args.baseline, 'r') as f: baseline = json.load(f)['buckets']
+        regressions = compare(buckets, baseline, threshold=args.threshold, tolerance=args.tolerance)
+        if len(regressions) > 0:
+            print('Regressions with respect to baseline {}:'.format(args.baseline))
+            for msg in regressions: print('  - {}'.format(msg))
+            sys.exit(1)
+        print('No regressions with respect to baseline {}.'.format(args.baseline))
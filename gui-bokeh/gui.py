@@ -2,9 +2,12 @@
 # external modules
 import os
 import sys
+import asyncio
+from functools import partial
 from base64 import b64decode
 from bokeh.io import show
 from bokeh.io import curdoc
+from bokeh.document import without_document_lock
 from bokeh.layouts import row, column
 from bokeh.models import Button
 from bokeh.models.widgets import FileInput
@@ -13,11 +16,10 @@ from bokeh.models.widgets import FileInput
 sys.path.append(os.path.abspath('../src'))
 from hashi import Hashi
 sys.path.append(os.path.abspath('../solver'))
-import hashisolver
+import asyncsolver
 
 # helper functions
-from hashiplot import makedummyplot
-from hashiplot import makehashiplot
+from hashiplot import HashiPlot
 
 
 class HashiSolverGui(object):
@@ -26,34 +28,40 @@ class HashiSolverGui(object):
         # copy provided attributes
         if doc is None: self.doc = curdoc()
         else: self.doc = doc
-        # get empty dummy figure
-        p = makedummyplot()
+        # get persistent plot (initially showing a welcome message)
+        # note: the plot is updated in place (see HashiPlot),
+        #       the layout itself is never replaced.
+        self.plot = HashiPlot()
         # create buttons
         self.load_button = Button(label="Load", button_type="primary")
         self.load_button.on_click(self.open_file_input)
         self.solve_button = Button(label="Solve", button_type="success")
-        self.solve_button.on_click(self.solve)
+        self.solve_button.on_click(self.start_solve)
+        self.stop_button = Button(label="Stop", button_type="danger", disabled=True)
+        self.stop_button.on_click(self.stop)
+        # create file input (only shown after clicking the load button)
+        self.file_input = FileInput(accept=".txt", visible=False)
+        self.file_input.on_change("value", self.open_file)
         # create layout
-        self.layout = self.make_default_layout(p, self.doc)
+        self.layout = self.make_default_layout(self.doc)
         # set dummy attributes initialized later
         self.hashi = None
+        self.engine = 'rules'
+        self.solve_task = None
 
     def make_layout(self, elements, doc):
         rows = [row(*els) for els in elements]
         layout = column(*rows)
-        if len(doc.roots)==0: doc.add_root(layout)
-        else: doc.roots[0].children = [layout]
+        doc.add_root(layout)
         return layout
 
-    def make_default_layout(self, hashifig, doc):
-        elements = [[hashifig], [self.load_button, self.solve_button]]
-        self.make_layout(elements, doc)
+    def make_default_layout(self, doc):
+        elements = [[self.plot.fig], [self.load_button, self.solve_button, self.stop_button],
+                    [self.file_input]]
+        return self.make_layout(elements, doc)
 
     def open_file_input(self):
-        self.file_input = FileInput(accept=".txt")
-        self.file_input.on_change("value", self.open_file)
-        layout = column(row(self.file_input))
-        curdoc().roots[0].children = [layout]
+        self.file_input.visible = True
 
     def open_file(self, attr, old, new):
         # note: because of security restrictions,
@@ -65,20 +73,54 @@ class HashiSolverGui(object):
         b64encoded = self.file_input.value
         bts = b64decode(b64encoded)
         txt = bts.decode('utf-8')
+        self.file_input.visible = False
         # load the hashi
         self.hashi = Hashi.from_str(txt)
         self.hashi.print()
-        # update the layout
-        p = makehashiplot(self.hashi)
-        self.make_default_layout(p, self.doc)
+        # update the plot
+        self.plot.set_hashi(self.hashi)
 
-    def solve(self):
+    def start_solve(self):
         # check if hashi was loaded
-        if self.hashi is None: return
-        # solve the hashi
-        hashisolver.solve(self.hashi)
+        if self.hashi is None or self.solve_task is not None: return
+        self.load_button.disabled = True
+        self.solve_button.disabled = True
+        # note: some engines can not be stopped halfway (see asyncsolver.interruptible_engines)
+        self.stop_button.disabled = (self.engine not in asyncsolver.interruptible_engines)
+        self.doc.add_next_tick_callback(self.solve)
+
+    @without_document_lock
+    async def solve(self):
+        # note: the solving runs in an executor, so the server stays responsive
+        #       and the plot is updated with the partial solution while solving.
+        #       since this callback does not hold the document lock,
+        #       all changes to the document are scheduled as next tick callbacks.
+        # note: after a cancellation, the task only finishes once the solving has stopped
+        #       (see asyncsolver.solve_async), so the buttons are not enabled too early.
+        self.solve_task = asyncio.ensure_future(asyncsolver.solve_async(self.hashi, engine=self.engine,
+                            progress=self.show_progress, interval=0.2, snapshots=True))
+        try: await self.solve_task
+        except asyncio.CancelledError: print('Solving stopped')
+        finally:
+            self.solve_task = None
+            self.doc.add_next_tick_callback(self.solve_done)
+
+    def stop(self):
+        if self.solve_task is None: return
+        self.solve_task.cancel()
+        self.stop_button.disabled = True
+
+    def show_progress(self, info):
+        self.doc.add_next_tick_callback(partial(self.update_plot, info['solution']))
+
+    def update_plot(self, solution=None):
+        self.plot.update(solution=solution)
+
+    def solve_done(self):
         self.hashi.print()
         print('Complete: {}'.format(self.hashi.complete))
-        # update the layout
-        p = makehashiplot(self.hashi)
-        self.make_default_layout(p, self.doc)
+        self.load_button.disabled = False
+        self.solve_button.disabled = False
+        self.stop_button.disabled = True
+        # update the plot
+        self.update_plot()
@@ -11,66 +11,135 @@ from bokeh.models import Label, LabelSet
 from bokeh.models import TextInput
 
 
+class HashiPlot(object):
+    # persistent plot of a hashi.
+    # the islands and the bridges each live in a single ColumnDataSource,
+    # so that updates (see update) only send the changed values to the browser,
+    # instead of rebuilding the figure.
+    # the bridges are drawn with a single multi_line glyph,
+    # with as many rows for each slot (i.e. each pair of islands that can be connected)
+    # as the multiplicity of the hashi: one for each line of a multiple bridge (empty if not used).
+
+    def __init__(self, hashi=None, width=500, height=500, color="#3288bd"):
+        ### initializer
+        # input arguments:
+        # - hashi: hashi to plot (default: show a welcome message, see set_hashi)
+        self.color = color
+        # create the figure
+        self.fig = figure(x_range=(-0.5,0.5), y_range=(-0.5, 0.5), width=width, height=height)
+        self.fig.xaxis.visible = False
+        self.fig.yaxis.visible = False
+        # add welcome label
+        self.label = Label(x=0, y=0, text='Welcome to HashiSolver!',
+                       text_align='center', text_baseline='middle')
+        self.fig.add_layout(self.label)
+        # add a circle for each vertex
+        self.islands = ColumnDataSource(dict(x=[], y=[], r=[], n=[], c=[]))
+        circles = Circle(x="x", y="y", radius="r", radius_dimension='x', radius_units='data',
+                    line_color=color, fill_color="c", line_width=3)
+        self.fig.add_glyph(self.islands, circles)
+        # add the expected number of connections for each vertex
+        labels = LabelSet(x='x', y='y', text='n', text_align='center', text_baseline='middle',
+                   source=self.islands)
+        self.fig.add_layout(labels)
+        # add lines for all bridges
+        self.bridges = ColumnDataSource(dict(xs=[], ys=[]))
+        self.fig.multi_line(xs='xs', ys='ys', source=self.bridges, line_width=2, line_color=color)
+        # set the hashi
+        self.hashi = None
+        if hashi is not None: self.set_hashi(hashi)
+
+    def set_hashi(self, hashi):
+        ### show a new hashi
+        # note: this replaces all data of the plot.
+        self.hashi = hashi
+        self.label.visible = False
+        # set the ranges
+        maxx = max([v.x for v in hashi.vertices])
+        maxy = max([v.y for v in hashi.vertices])
+        self.fig.x_range.start = -0.5
+        self.fig.x_range.end = maxx+0.5
+        self.fig.y_range.start = -0.5
+        self.fig.y_range.end = maxy+0.5
+        # set the slots
+        # note: the endpoints of each slot are sorted, as for the edges.
+        self.ends = []
+        self.slot_ids = {}
+        for sidx, (v1idx, v2idx) in enumerate(hashi.slots):
+            (v1, v2) = (hashi.vertices[v1idx], hashi.vertices[v2idx])
+            ends = tuple(sorted([(v1.x, v1.y), (v2.x, v2.y)]))
+            self.ends.append(ends)
+            self.slot_ids[ends] = sidx
+        self.multiplicity = hashi.multiplicity
+        self.counts = np.zeros(len(hashi.slots), dtype=int)
+        self.slot_vertices = np.array(hashi.slots, dtype=int).reshape(-1, 2)
+        self.n = np.array([v.n for v in hashi.vertices], dtype=int)
+        # set the islands
+        self.colors = self.get_colors(self.counts)
+        self.islands.data = dict(x=[v.x for v in hashi.vertices], y=[v.y for v in hashi.vertices],
+                              r=[0.4]*hashi.nvertices, n=[v.n for v in hashi.vertices], c=self.colors)
+        # set the (empty) bridges
+        self.bridges.data = dict(xs=[[] for _ in range(self.multiplicity*len(hashi.slots))],
+                              ys=[[] for _ in range(self.multiplicity*len(hashi.slots))])
+        self.update()
+
+    def get_colors(self, counts):
+        ### get the fill color of each island
+        # input arguments:
+        # - counts: number of edges in each slot
+        # note: the colors are determined from the edges that are shown,
+        #       not from the hashi itself, since that can be ahead of a snapshot while solving.
+        nedges = np.zeros(len(self.n), dtype=int)
+        np.add.at(nedges, self.slot_vertices[:,0], counts)
+        np.add.at(nedges, self.slot_vertices[:,1], counts)
+        return [(self.color if complete else "white") for complete in (nedges==self.n).tolist()]
+
+    def get_lines(self, sidx, nedges):
+        ### get the line coordinates for a slot with a given number of edges
+        # returns:
+        # - a list of tuples of the form (xs, ys), one for each row of the slot
+        # note: the lines of a multiple bridge are spaced evenly around the line between the islands.
+        ((x1, y1), (x2, y2)) = self.ends[sidx]
+        if nedges>self.multiplicity:
+            raise Exception('ERROR: {} edges exceed the multiplicity {}.'.format(nedges, self.multiplicity))
+        offsets = ((np.arange(nedges) - (nedges-1)/2.) * 0.1).tolist()
+        if y1==y2: lines = [([x1+0.4, x2-0.4], [y1+offset, y2+offset]) for offset in offsets]
+        else: lines = [([x1+offset, x2+offset], [y1+0.4, y2-0.4]) for offset in offsets]
+        return lines + [([], [])]*(self.multiplicity-nedges)
+
+    def update(self, solution=None):
+        ### update the plot with the current state of the hashi
+        # input arguments:
+        # - solution: snapshot of the edges to show, of the form [[x1, y1, x2, y2, number of edges], ...]
+        #   (default: the current edges of the hashi)
+        # note: only the bridges and islands that changed since the previous update are patched.
+        if self.hashi is None: return
+        if solution is None:
+            solution = [[x1, y1, x2, y2, len(edges)] for (x1, y1, x2, y2), edges in self.hashi.get_edges().items()]
+        counts = np.zeros(len(self.counts), dtype=int)
+        for x1, y1, x2, y2, nedges in solution:
+            counts[self.slot_ids[tuple(sorted([(x1, y1), (x2, y2)]))]] = nedges
+        # patch the bridges
+        patches = {'xs': [], 'ys': []}
+        for sidx in np.nonzero(counts!=self.counts)[0].tolist():
+            for row, (xs, ys) in enumerate(self.get_lines(sidx, counts[sidx])):
+                patches['xs'].append((self.multiplicity*sidx+row, xs))
+                patches['ys'].append((self.multiplicity*sidx+row, ys))
+        if len(patches['xs']) > 0: self.bridges.patch(patches)
+        self.counts = counts
+        # patch the islands
+        colors = self.get_colors(counts)
+        patches = {'c': [(idx, c) for idx, c in enumerate(colors) if c!=self.colors[idx]]}
+        if len(patches['c']) > 0: self.islands.patch(patches)
+        self.colors = colors
+
+
 def makedummyplot():
-    # create the figure
-    fig = figure(x_range=(-0.5,0.5), y_range=(-0.5, 0.5), width=500, height=500)
-    fig.xaxis.visible = False
-    fig.yaxis.visible = False
-    # add label
-    label = Label(x=0, y=0, text='Welcome to HashiSolver!',
-              text_align='center', text_baseline='middle')
-    fig.add_layout(label)
-    return fig
+    return HashiPlot().fig
 
 
-def makehashiplot(hashi, n_editable=False):
-    # extract x and y ranges
-    maxx = max([v.x for v in hashi.vertices])
-    maxy = max([v.y for v in hashi.vertices])
-    # create the figure
-    fig = figure(x_range=(-0.5,maxx+0.5), y_range=(-0.5, maxy+0.5), width=500, height=500)
-    fig.xaxis.visible = False
-    fig.yaxis.visible = False
-    # add a circle for each vertex
-    x = np.array([v.x for v in hashi.vertices])
-    y = np.array([v.y for v in hashi.vertices])
-    r = np.ones(len(x))*0.4
-    n = np.array([v.n for v in hashi.vertices])
-    c = np.array([("#3288bd" if v.complete else "white") for v in hashi.vertices])
-    source = ColumnDataSource(dict(x=x, y=y, r=r, n=n, c=c))
-    circles = Circle(x="x", y="y", radius="r", radius_dimension='x', radius_units='data',
-                line_color="#3288bd", fill_color="c", line_width=3)
-    fig.add_glyph(source, circles)
-    # add the expected number of connections for each vertex
-    if not n_editable:
-        labels = LabelSet(x='x', y='y', text='n', text_align='center', text_baseline='middle', source=source)
-        fig.add_layout(labels)
-    # add the expected number of connections for each vertex - editable version
-    # (does not work yet)
-    else: pass
-    # add lines for all edges
-    for coords, edges in hashi.get_edges().items():
-        # get correct coordinates
-        if len(edges)==1:
-            if edges[0].horizontal:
-                coords = [[coords[0]+0.4, coords[1], coords[2]-0.4, coords[3]]]
-            elif edges[0].vertical:
-                coords = [[coords[0], coords[1]+0.4, coords[2], coords[3]-0.4]]
-            else: raise Exception('Not yet implemented.')
-        elif len(edges)==2:
-            if edges[0].horizontal:
-                coords = [
-                  [coords[0]+0.4, coords[1]-0.05, coords[2]-0.4, coords[3]-0.05],
-                  [coords[0]+0.4, coords[1]+0.05, coords[2]-0.4, coords[3]+0.05]
-                ]
-            elif edges[1].vertical:
-                coords = [
-                  [coords[0]-0.05, coords[1]+0.4, coords[2]-0.05, coords[3]-0.4],
-                  [coords[0]+0.05, coords[1]+0.4, coords[2]+0.05, coords[3]-0.4]
-                ]
-            else: raise Exception('Not yet implemented.')
-        else: raise Exception('Not yet implemented.')
-        # add lines
-        for c in coords:
-            fig.line([c[0], c[2]], [c[1], c[3]], line_width=2, line_color="#3288bd")
-    return fig
+def makehashiplot(hashi, n_editable=False, solution=None):
+    # note: the editable version of the numbers does not work yet (n_editable is ignored).
+    plot = HashiPlot(hashi)
+    plot.update(solution=solution)
+    return plot.fig
@@ -9,30 +9,44 @@ from PyQt5.QtWidgets import QApplication, QMainWindow
 from PyQt5.QtWidgets import QWidget, QGridLayout
 from PyQt5.QtWidgets import QPushButton
 from PyQt5.QtWidgets import QFileDialog
+from PyQt5.QtWidgets import QMessageBox
+from PyQt5.QtCore import pyqtSignal
 
-from hashiplot import makedummyplot, makehashiplot
+from hashiplot import HashiPlot
 from hashibuilder import HashiBuilderWindow
 sys.path.append(os.path.abspath('../src'))
 from hashi import Hashi
 sys.path.append(os.path.abspath('../solver'))
-import hashisolver
+import asyncsolver
 
 
 class MplCanvas(FigureCanvasQTAgg):
     
     def __init__(self, parent=None, hashi=None):
-        if hashi is None: self.fig, self.ax = makedummyplot()
-        else: self.fig, self.ax = makehashiplot(hashi)
+        self.fig, self.ax = plt.subplots()
         super(MplCanvas, self).__init__(self.fig)
+        # note: the plot is made after the canvas is attached to the figure,
+        #       so that blitting uses this canvas.
+        self.plot = HashiPlot(self.fig, self.ax, blit=True)
+        if hashi is not None: self.plot.set_hashi(hashi)
 
 
 class HashiSolverGui(QMainWindow):
+
+    # signals to handle the progress of the background solver in the gui thread
+    progress_signal = pyqtSignal(object)
+    done_signal = pyqtSignal(object)
     
     def __init__(self, parent=None):
         super(HashiSolverGui, self).__init__(parent)
         central = QWidget()
         
         self.hashi = None
+        self.engine = 'rules'
+        self.solver = asyncsolver.BackgroundSolver()
+        self.solving = None
+        self.progress_signal.connect(self.show_progress)
+        self.done_signal.connect(self.solve_done)
         
         buttons_layout = QGridLayout()
         self.load_button = QPushButton('Load')
@@ -44,6 +58,10 @@ class HashiSolverGui(QMainWindow):
         self.solve_button = QPushButton('Solve')
         self.solve_button.clicked.connect(self.solve)
         buttons_layout.addWidget(self.solve_button, 0, 2)
+        self.stop_button = QPushButton('Stop')
+        self.stop_button.clicked.connect(self.stop)
+        self.stop_button.setEnabled(False)
+        buttons_layout.addWidget(self.stop_button, 0, 3)
         
         self.mplcanvas = MplCanvas()
         
@@ -54,13 +72,15 @@ class HashiSolverGui(QMainWindow):
         self.setCentralWidget(central)
 
     def closeEvent(self, event):
+        if self.solving is not None: self.solving.cancel()
+        self.solver.close()
         event.accept()
         
     def load(self, event):
         inputfile, _ = QFileDialog.getOpenFileName(self, 'some text', '../fls', '(*.txt)')
         if inputfile == '': return
         self.hashi = Hashi.from_txt(inputfile)
-        self.redraw()
+        self.mplcanvas.plot.set_hashi(self.hashi)
 
     def open_build_window(self, event):
         # note: buildwindow must be an attribute of self
@@ -70,21 +90,60 @@ class HashiSolverGui(QMainWindow):
         self.buildwindow.show()
 
     def build_hashi(self, event):
-        self.hashi = self.buildwindow.make_hashi()
+        # note: if the numbers are invalid (e.g. not possible with the chosen multiplicity),
+        #       show the error and keep the build window open to correct them.
+        try: hashi = self.buildwindow.make_hashi()
+        except Exception as e:
+            QMessageBox.warning(self.buildwindow, 'Invalid hashi', str(e))
+            return
+        self.hashi = hashi
         self.buildwindow.close()
         del self.buildwindow
-        self.redraw()
+        self.mplcanvas.plot.set_hashi(self.hashi)
         
     def solve(self, event):
-        if self.hashi is None: return
-        hashisolver.solve(self.hashi)
+        # note: the solving runs in the background,
+        #       the plot is updated with the partial solution while solving
+        #       (see show_progress) and when finished (see solve_done).
+        if self.hashi is None or self.solving is not None: return
+        self.set_solving(True)
+        self.solving = self.solver.submit(self.hashi, engine=self.engine, progress=self.progress_signal.emit,
+                         done=self.done_signal.emit, interval=0.05, snapshots=True)
+
+    def stop(self, event):
+        # note: the solving stops after the current solving rule;
+        #       the buttons are only enabled again when it has stopped (see solve_done).
+        if self.solving is None: return
+        self.solving.cancel()
+        self.stop_button.setEnabled(False)
+        self.statusBar().showMessage('Stopping...')
+
+    def set_solving(self, solving):
+        self.load_button.setEnabled(not solving)
+        self.build_button.setEnabled(not solving)
+        self.solve_button.setEnabled(not solving)
+        # note: some engines can not be stopped halfway (see asyncsolver.interruptible_engines)
+        self.stop_button.setEnabled(solving and self.engine in asyncsolver.interruptible_engines)
+
+    def show_progress(self, info):
+        self.statusBar().showMessage('Solving... (round {}, {} bridges)'.format(
+          info['round'], info['edges']))
+        self.redraw(solution=info['solution'])
+
+    def solve_done(self, future):
+        self.solving = None
+        self.set_solving(False)
+        if future.cancelled(): msg = 'Solving stopped'
+        elif future.exception() is not None: msg = 'Solving failed: {}'.format(future.exception())
+        else: msg = 'Solved' if self.hashi.complete else 'Could not solve completely'
+        self.statusBar().showMessage(msg)
         self.redraw()
         
-    def redraw(self):
+    def redraw(self, solution=None):
+        # note: only the changed bridges and islands are updated and blitted
+        #       (see HashiPlot), the figure is not redrawn from scratch.
         if self.hashi is None: return
-        self.mplcanvas.ax.cla()
-        _ = makehashiplot(self.hashi, fig=self.mplcanvas.fig, ax=self.mplcanvas.ax)
-        self.mplcanvas.draw()
+        self.mplcanvas.plot.update(solution=solution)
       
 def main():
    app = QApplication(sys.argv)
@@ -57,6 +57,15 @@ class HashiBuilderWindow(QWidget):
         general_label = QLabel(introtxt)
         general_label.setWordWrap(True)
 
+        # note: the multiplicity is the maximum number of bridges between two vertices,
+        #       which also determines the maximum number of connections of a vertex.
+        multiplicity_layout = QGridLayout()
+        multiplicity_label = QLabel('Maximum number of bridges between two vertices')
+        multiplicity_layout.addWidget(multiplicity_label, 0, 0)
+        self.multiplicity_edit = QLineEdit('2')
+        self.multiplicity_edit.setFixedWidth(40)
+        multiplicity_layout.addWidget(self.multiplicity_edit, 0, 1)
+
         buttons_layout = QGridLayout()
         self.ok_button = QPushButton('Ok')
         buttons_layout.addWidget(self.ok_button, 0, 0)
@@ -70,7 +79,8 @@ class HashiBuilderWindow(QWidget):
         self.main_layout = QGridLayout()
         self.main_layout.addWidget(general_label, 0, 0)
         self.main_layout.addLayout(self.dgrid_layout, 1, 0)
-        self.main_layout.addLayout(buttons_layout, 2, 0)
+        self.main_layout.addLayout(multiplicity_layout, 2, 0)
+        self.main_layout.addLayout(buttons_layout, 3, 0)
         
         self.setLayout(self.main_layout)
 
@@ -81,7 +91,7 @@ class HashiBuilderWindow(QWidget):
             dgrid.append([])
             for j in range(ncols):
                 textbox = QLineEdit()
-                textbox.setMaxLength(1)
+                textbox.setMaxLength(2)
                 textbox.setFixedWidth(40)
                 textbox.setAlignment(QtCore.Qt.AlignCenter)
                 dgrid[i].append(textbox)
@@ -92,15 +102,19 @@ class HashiBuilderWindow(QWidget):
         event.accept()
 
     def make_hashi(self):
-        hashistr = ''
-        for i in range(len(self.dgrid)):
+        # note: the numbers can have more than one digit,
+        #       so the hashi is made from a dict of positions instead of a string.
+        # note: an exception is raised if the numbers are not possible
+        #       with the chosen multiplicity (see Hashi.from_dict).
+        multiplicity = int(self.multiplicity_edit.text())
+        vertices = {}
+        nrows = len(self.dgrid)
+        for i in range(nrows):
             for j in range(len(self.dgrid[i])):
-                txt = self.dgrid[i][j].text()
-                if( txt=='' or txt==' ' or txt=='\t' or txt=='-' ): hashistr += '-'
-                else: hashistr += str(int(txt))
-            hashistr += '\n'
-        hashistr = hashistr.strip(' \t\n')
-        hashi = Hashi.from_str(hashistr)
+                txt = self.dgrid[i][j].text().strip(' \t')
+                if( txt=='' or txt=='-' ): continue
+                vertices[(j, nrows-1-i)] = int(txt)
+        hashi = Hashi.from_dict(vertices, multiplicity=multiplicity)
         return hashi
 
     def open_change_size_window(self, event):
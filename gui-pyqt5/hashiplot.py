@@ -2,57 +2,175 @@ import numpy as np
 import matplotlib as mpl
 import matplotlib.pyplot as plt
 from matplotlib.figure import Figure
+from matplotlib.collections import EllipseCollection, LineCollection
+
+
+class HashiPlot(object):
+    # persistent plot of a hashi on given matplotlib axes.
+    # the islands are drawn as a single EllipseCollection,
+    # the bridges as a single LineCollection (with as many segments for each slot
+    # as the multiplicity of the hashi, where a slot is a pair of islands that can be connected:
+    # one for each line of a multiple bridge),
+    # and the numbers as one marker collection per distinct number.
+    # updates (see update) modify the data of these collections in place,
+    # and, if blitting is enabled, only redraw them on top of a cached background.
+    # note: with blitting, the collections are animated artists,
+    #       which are not drawn by a regular draw of the figure (e.g. savefig);
+    #       use blit=False for static plots.
+
+    def __init__(self, fig, ax, blit=False, color='b', completecolor='lightskyblue'):
+        ### initializer
+        self.fig = fig
+        self.ax = ax
+        self.blit = blit
+        self.color = color
+        self.completecolor = mpl.colors.to_rgba(completecolor)
+        self.incompletecolor = mpl.colors.to_rgba('white')
+        self.hashi = None
+        self.artists = []
+        self.background = None
+        # add welcome label
+        self.ax.set_axis_off()
+        self.label = self.ax.text(0.5, 0.5, 'Welcome to HashiSolver!', ha='center', va='center',
+                       transform=self.ax.transAxes, fontsize=15)
+        # recapture the background after each full draw (e.g. after resizing)
+        if self.blit: self.fig.canvas.mpl_connect('draw_event', self.on_draw)
+
+    def on_draw(self, event):
+        ### handler of draw events: cache the background and draw the animated artists on top
+        self.background = self.fig.canvas.copy_from_bbox(self.ax.bbox)
+        self.draw_artists()
+
+    def draw_artists(self):
+        ### draw the (animated) artists
+        for artist in self.artists: self.ax.draw_artist(artist)
+
+    def set_hashi(self, hashi):
+        ### show a new hashi
+        # note: this replaces all artists and triggers a full redraw.
+        self.hashi = hashi
+        self.label.set_visible(False)
+        for artist in self.artists: artist.remove()
+        # set the axes
+        maxx = max([v.x for v in hashi.vertices])
+        maxy = max([v.y for v in hashi.vertices])
+        self.ax.set_axis_on()
+        self.ax.get_xaxis().set_ticks([])
+        self.ax.get_yaxis().set_ticks([])
+        self.ax.set_xlim((-0.5, maxx+0.5))
+        self.ax.set_ylim((-0.5, maxy+0.5))
+        self.ax.set_aspect('equal')
+        # add the bridges (initially empty)
+        # note: the endpoints of each slot are sorted, as for the edges;
+        #       unused segments are set to nan and left out of the collection.
+        self.ends = []
+        self.slot_ids = {}
+        for sidx, (v1idx, v2idx) in enumerate(hashi.slots):
+            (v1, v2) = (hashi.vertices[v1idx], hashi.vertices[v2idx])
+            ends = tuple(sorted([(v1.x, v1.y), (v2.x, v2.y)]))
+            self.ends.append(ends)
+            self.slot_ids[ends] = sidx
+        self.multiplicity = hashi.multiplicity
+        self.counts = np.zeros(len(hashi.slots), dtype=int)
+        self.slot_vertices = np.array(hashi.slots, dtype=int).reshape(-1, 2)
+        self.n = np.array([v.n for v in hashi.vertices], dtype=int)
+        self.segments = np.full((self.multiplicity*len(hashi.slots), 2, 2), np.nan)
+        self.bridges = LineCollection([], linewidths=2, colors=self.color,
+                         animated=self.blit)
+        self.ax.add_collection(self.bridges)
+        # add a circle for each vertex
+        xy = np.array([[v.x, v.y] for v in hashi.vertices], dtype=float)
+        self.colors = np.array(self.get_colors(self.counts))
+        self.islands = EllipseCollection(0.8, 0.8, 0., units='xy', offsets=xy,
+                         offset_transform=self.ax.transData, facecolors=self.colors,
+                         edgecolors=self.color, animated=self.blit)
+        self.ax.add_collection(self.islands)
+        # add the expected number of connections for each vertex
+        # (one marker collection per distinct number, scaled to the size of the islands)
+        diameter = 0.8 * self.ax.bbox.width / (maxx+1) * 72. / self.fig.dpi
+        size = min(10., 0.5*diameter)**2
+        self.numbers = []
+        for value in np.unique(self.n).tolist():
+            mask = (self.n==value)
+            self.numbers.append(self.ax.scatter(xy[mask,0], xy[mask,1], s=size, c='k',
+                                  marker='${}$'.format(value), linewidths=0, animated=self.blit))
+        self.artists = [self.bridges, self.islands] + self.numbers
+        self.update(redraw=False)
+        self.fig.canvas.draw_idle()
+
+    def get_colors(self, counts):
+        ### get the fill color of each island
+        # input arguments:
+        # - counts: number of edges in each slot
+        # note: the colors are determined from the edges that are shown,
+        #       not from the hashi itself, since that can be ahead of a snapshot while solving.
+        nedges = np.zeros(len(self.n), dtype=int)
+        np.add.at(nedges, self.slot_vertices[:,0], counts)
+        np.add.at(nedges, self.slot_vertices[:,1], counts)
+        return [(self.completecolor if complete else self.incompletecolor) for complete in (nedges==self.n).tolist()]
+
+    def get_segments(self, sidx, nedges):
+        ### get the segments for a slot with a given number of edges
+        # returns:
+        # - an array of shape (multiplicity, 2, 2) with the segments of the slot
+        #   (nan for unused segments)
+        # note: the lines of a multiple bridge are spaced evenly around the line between the islands.
+        ((x1, y1), (x2, y2)) = self.ends[sidx]
+        segments = np.full((self.multiplicity, 2, 2), np.nan)
+        if nedges==0: return segments
+        if nedges>self.multiplicity:
+            raise Exception('ERROR: {} edges exceed the multiplicity {}.'.format(nedges, self.multiplicity))
+        offsets = (np.arange(nedges) - (nedges-1)/2.) * 0.14
+        if y1==y2:
+            segments[:nedges,:,0] = [x1+0.4, x2-0.4]
+            segments[:nedges,:,1] = y1 + offsets[:,np.newaxis]
+        else:
+            segments[:nedges,:,0] = x1 + offsets[:,np.newaxis]
+            segments[:nedges,:,1] = [y1+0.4, y2-0.4]
+        return segments
+
+    def update(self, solution=None, redraw=True):
+        ### update the plot with the current state of the hashi
+        # input arguments:
+        # - solution: snapshot of the edges to show, of the form [[x1, y1, x2, y2, number of edges], ...]
+        #   (default: the current edges of the hashi)
+        # - redraw: whether to redraw the canvas
+        #   (by blitting if enabled and possible, else with a regular draw)
+        # note: only the segments of the slots that changed since the previous update are modified.
+        if self.hashi is None: return
+        if solution is None:
+            solution = [[x1, y1, x2, y2, len(edges)] for (x1, y1, x2, y2), edges in self.hashi.get_edges().items()]
+        counts = np.zeros(len(self.counts), dtype=int)
+        for x1, y1, x2, y2, nedges in solution:
+            counts[self.slot_ids[tuple(sorted([(x1, y1), (x2, y2)]))]] = nedges
+        changed = np.nonzero(counts!=self.counts)[0]
+        for sidx in changed.tolist():
+            m = self.multiplicity
+            self.segments[m*sidx:m*(sidx+1)] = self.get_segments(sidx, counts[sidx])
+        if len(changed) > 0:
+            self.bridges.set_segments(self.segments[~np.isnan(self.segments[:,0,0])])
+        self.counts = counts
+        colors = np.array(self.get_colors(counts))
+        if not np.array_equal(colors, self.colors):
+            self.colors = colors
+            self.islands.set_facecolors(colors)
+        if not redraw: return
+        if self.blit and self.background is not None:
+            self.fig.canvas.restore_region(self.background)
+            self.draw_artists()
+            self.fig.canvas.blit(self.ax.bbox)
+        else: self.fig.canvas.draw_idle()
 
 
 def makedummyplot():
     fig, ax = plt.subplots()
-    ax.set_axis_off()
-    ax.text(0.5, 0.5, 'Welcome to HashiSolver!', ha='center', va='center', transform=ax.transAxes,
-            fontsize=15)
+    HashiPlot(fig, ax)
     return (fig, ax)
 
-def makehashiplot(hashi, fig=None, ax=None):
-    # extract x and y ranges
-    maxx = max([v.x for v in hashi.vertices])
-    maxy = max([v.y for v in hashi.vertices])
+def makehashiplot(hashi, fig=None, ax=None, solution=None):
     # create the figure
     if fig is None or ax is None: fig, ax = plt.subplots()
-    ax.get_xaxis().set_ticks([])
-    ax.get_yaxis().set_ticks([])
-    ax.set_xlim((-0.5, maxx+0.5))
-    ax.set_ylim((-0.5, maxy+0.5))
-    ax.set_aspect('equal')
-    # add a circle for each vertex
-    for vertex in hashi.vertices:
-        facecolor = 'lightskyblue' if vertex.complete else 'white'
-        c = plt.Circle((vertex.x, vertex.y), radius=0.4, edgecolor='b', facecolor=facecolor)
-        ax.add_artist(c)
-    # add the expected number of connections for each vertex
-    for vertex in hashi.vertices:
-        ax.text(vertex.x, vertex.y, str(vertex.n), ha='center', va='center')
-    # add lines for all edges
-    for coords, edges in hashi.get_edges().items():
-        # get correct coordinates
-        if len(edges)==1:
-            if edges[0].horizontal:
-                coords = [[coords[0]+0.4, coords[1], coords[2]-0.4, coords[3]]]
-            elif edges[0].vertical:
-                coords = [[coords[0], coords[1]+0.4, coords[2], coords[3]-0.4]]
-            else: raise Exception('Not yet implemented.')
-        elif len(edges)==2:
-            if edges[0].horizontal:
-                coords = [
-                  [coords[0]+0.4, coords[1]-0.07, coords[2]-0.4, coords[3]-0.07],
-                  [coords[0]+0.4, coords[1]+0.07, coords[2]-0.4, coords[3]+0.07]
-                ]
-            elif edges[1].vertical:
-                coords = [
-                  [coords[0]-0.07, coords[1]+0.4, coords[2]-0.07, coords[3]-0.4],
-                  [coords[0]+0.07, coords[1]+0.4, coords[2]+0.07, coords[3]-0.4]
-                ]
-            else: raise Exception('Not yet implemented.')
-        else: raise Exception('Not yet implemented.')
-        # add lines
-        for c in coords:
-            ax.plot([c[0], c[2]], [c[1], c[3]], linewidth=2, color='b')
+    plot = HashiPlot(fig, ax)
+    plot.set_hashi(hashi)
+    plot.update(solution=solution)
     return (fig,ax)
@@ -1,18 +1,26 @@
+import os
 import numpy as np
 import cv2
 import matplotlib.pyplot as plt
 from matplotlib.patches import Rectangle
 
 
-def digitreco(digit_image, references=None, doplot=False):
-    # recognize a single digit
+# cache of the reference images read from disk (see load_references)
+_references = None
 
-    # read reference images from disk if they are not provided,
-    # or if they are provided, make a hard copy
-    # (needed because they will be modified, e.g. cropped and resized).
-    if references is None:
-        # read digit images
-        references = {}
+# cache of the default recognizer (see get_recognizer)
+_recognizer = None
+
+
+def load_references():
+    ### read the reference digit images from disk
+    # returns:
+    # - a dict mapping digits to binary images (1 = black, 0 = white)
+    # note: the images are only read once per process;
+    #       a copy is returned, so that the caller can modify them.
+    global _references
+    if _references is None:
+        _references = {}
         for digit in [1,2,3,4,5,6,7,8]:
             abspath = os.path.abspath(os.path.dirname(__file__))
             dimage = '../res/number_{}.png'.format(digit)
@@ -21,7 +29,98 @@ def digitreco(digit_image, references=None, doplot=False):
             darray = cv2.cvtColor(darray, cv2.COLOR_BGR2GRAY)
             darray = np.where(darray>128,0,1)
             darray = darray.astype(np.uint8)
-            references[digit] = darray
+            _references[digit] = darray
+    return {digit: np.copy(im) for digit,im in _references.items()}
+
+
+def crop(image):
+    ### remove whitespace (rows and columns without filled pixels) around an image
+    image = image[~np.all(image==0, axis=1),:]
+    image = image[:,~np.all(image==0, axis=0)]
+    return image
+
+
+class DigitRecognizer(object):
+    ### class for recognizing many digits at once
+    # the reference images are cropped and resized to a canonical size once, at initialization.
+    # the digit images to recognize are cropped and resized to the same canonical size,
+    # and scored against all references in a single matrix product.
+    # the score of a digit image against a reference is their overlap
+    # (sum of the product of both images, normalized by the sum of each image),
+    # as in digitreco.
+
+    def __init__(self, references=None, size=(32,32)):
+        ### initializer
+        # input arguments:
+        # - references: dict mapping digits to binary reference images
+        #   (default: read from disk, see load_references)
+        # - size: canonical size (height, width) of the images
+        if references is None: references = load_references()
+        self.size = size
+        self.digits = np.array(sorted(references.keys()))
+        self.references = np.array([self.normalize(references[digit]).ravel() for digit in self.digits])
+        self.filled = np.sum(self.references, axis=1)
+
+    def normalize(self, image):
+        ### crop and resize an image to the canonical size
+        # returns:
+        # - a float array with the canonical size, or None if the image is empty
+        image = crop(image)
+        if image.size==0: return None
+        return cv2.resize(image.astype(np.float32), (self.size[1], self.size[0]),
+                 interpolation=cv2.INTER_AREA)
+
+    def scores(self, images):
+        ### calculate the overlap scores of digit images against all references
+        # input arguments:
+        # - images: list of binary images (each with arbitrary shape)
+        # returns:
+        # - an array of shape (number of images, number of references);
+        #   the rows for empty images are zero.
+        res = np.zeros((len(images), len(self.digits)))
+        cells = [self.normalize(image) for image in images]
+        valid = np.array([cell is not None for cell in cells], dtype=bool)
+        if not np.any(valid): return res
+        cells = np.array([cell.ravel() for cell in cells if cell is not None])
+        overlaps = np.matmul(cells, self.references.T)
+        res[valid] = overlaps / np.outer(np.sum(cells, axis=1), self.filled)
+        return res
+
+    def recognize(self, images):
+        ### recognize a list of digit images
+        # returns:
+        # - a tuple of the form (digits, confidences), where:
+        #   - digits is a list with the recognized digit for each image (None for empty images)
+        #   - confidences is an array with a confidence score between 0 and 1 for each image,
+        #     defined as 1 minus the ratio of the second best to the best overlap score
+        #     (0 for empty images)
+        if len(images)==0: return ([], np.zeros(0))
+        scores = self.scores(images)
+        best = np.argmax(scores, axis=1)
+        ranked = np.sort(scores, axis=1)
+        confidences = np.zeros(len(images))
+        valid = (ranked[:,-1] > 0)
+        confidences[valid] = 1 - ranked[valid,-2]/ranked[valid,-1]
+        digits = [(int(self.digits[idx]) if v else None) for idx, v in zip(best, valid)]
+        return (digits, confidences)
+
+
+def get_recognizer():
+    ### get a DigitRecognizer with the default references
+    # note: the recognizer is only made once per process.
+    global _recognizer
+    if _recognizer is None: _recognizer = DigitRecognizer()
+    return _recognizer
+
+
+def digitreco(digit_image, references=None, doplot=False):
+    # recognize a single digit
+    # note: for recognizing many digits, DigitRecognizer is much faster.
+
+    # read reference images from disk if they are not provided,
+    # or if they are provided, make a hard copy
+    # (needed because they will be modified, e.g. cropped and resized).
+    if references is None: references = load_references()
     else:
         newreferences = {digit: np.copy(im) for digit,im in references.items()}
         references = newreferences
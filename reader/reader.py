@@ -1,6 +1,7 @@
 # imports
 import os
 import sys
+import functools
 import numpy as np
 import cv2
 import matplotlib.pyplot as plt
@@ -9,7 +10,34 @@ from matplotlib.patches import Rectangle
 sys.path.append(os.path.abspath('../src'))
 from hashi import Hashi
 
-from digitreco import digitreco
+from digitreco import digitreco, get_recognizer
+
+
+def decodeimage(imagefile):
+    ### read an image file and perform the preprocessing of HashiImageReader.loadimage
+    # (except for the optional resizing)
+    # note: this does not depend on the state of a HashiImageReader,
+    #       so it can be done e.g. in separate threads for many images
+    #       (see setimage to pass the result to a HashiImageReader).
+    image = cv2.imread(imagefile)
+    if image is None: raise Exception('ERROR: could not read image {}.'.format(imagefile))
+    image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    image = np.where(image>128,0,1)
+    image = image.astype(np.uint8)
+    # remove whitespace
+    image = image[~np.all(image==0, axis=1),:]
+    image = image[:,~np.all(image==0, axis=0)]
+    return image
+
+
+@functools.lru_cache(maxsize=None)
+def get_mask(shape):
+    ### get the circular mask used to suppress the circle edges in a cell of a given shape
+    # note: the masks are cached per shape, as many cells have the same shape.
+    Y, X = np.ogrid[:shape[0], :shape[1]]
+    center = (shape[0]/2, shape[1]/2)
+    dist = np.sqrt((X-center[0])**2 + (Y-center[1])**2)
+    return dist <= center[0]*0.8
 
 
 class HashiImageReader(object):
@@ -21,10 +49,15 @@ class HashiImageReader(object):
     # - digital written numbers
     # (main use case: screenshots from online puzzles)
 
-    def __init__(self):
+    def __init__(self, recognizer=None):
+        ### initializer
+        # input arguments:
+        # - recognizer: DigitRecognizer to use (default: the one with the default references)
         self.image = None
         self.nrows = None
         self.ncols = None
+        self.recognizer = recognizer if recognizer is not None else get_recognizer()
+        self.confidences = None
     
     def loadimage(self, imagefile, targetsize=None):
         ### load an image and perform preprocessing.
@@ -36,19 +69,19 @@ class HashiImageReader(object):
         # - type conversion to numpy uint8
         # - crop potential edges and extra space in between
         # - resizing (optional)
-        self.image = cv2.imread(imagefile)
-        self.image = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
-        self.image = np.where(self.image>128,0,1)
-        self.image = self.image.astype(np.uint8)
-        # remove whitespace
-        self.image = self.image[~np.all(self.image==0, axis=1),:]
-        self.image = self.image[:,~np.all(self.image==0, axis=0)]
+        self.setimage(decodeimage(imagefile))
         print('Loaded image {}'.format(imagefile))
         if targetsize is not None:
             self.image = cv2.resize(self.image, targetsize)
             self.image = np.where(self.image>128,0,1)
             print('Converted image to size {}'.format(targetsize))
 
+    def setimage(self, image):
+        ### set an image that was already preprocessed (see decodeimage)
+        self.image = image
+        self.nrows = None
+        self.ncols = None
+
     def drawimage(self, doplot=True, invert=True, title=None, ticks=False):
         ### draw the currently loaded image for visual inspection
         if self.image is None: raise Exception('Current image is None')
@@ -149,42 +182,51 @@ class HashiImageReader(object):
         if self.image is None: raise Exception('Current image is None')
         if self.nrows is None or self.ncols is None: self.findsize(verbose=verbose)
         # initialize output
+        # note: the digits are recognized all at once after the loop over the cells;
+        #       the confidence of each recognized digit is stored in self.confidences.
         res = {}
-        # read digit images
-        dimages = {}
-        for digit in [1,2,3,4,5,6,7,8]:
-            abspath = os.path.abspath(os.path.dirname(__file__))
-            dimage = '../res/number_{}.png'.format(digit)
-            dimage = os.path.join(abspath,dimage)
-            darray = cv2.imread(dimage)
-            darray = cv2.cvtColor(darray, cv2.COLOR_BGR2GRAY)
-            darray = np.where(darray>128,0,1)
-            darray = darray.astype(np.uint8)
-            dimages[digit] = darray
-        # loop over individual cells
+        positions = []
+        imgcells = []
+        # find the occupied cells
         # (i.e. potential vertex positions)
+        # note: this is done for all cells at once, by summing the image per cell
+        #       (and the filled rows and columns per cell) with np.add.reduceat;
+        #       only the occupied cells are extracted from the image afterwards.
         cellheight = self.image.shape[0]/self.nrows
         cellwidth = self.image.shape[1]/self.ncols
-        for i in range(self.nrows):
-            for j in range(self.ncols):
-                imgcell = self.image[int(i*cellheight):int((i+1)*cellheight),
-                            int(j*cellwidth):int((j+1)*cellwidth)]
-                # remove whitespace
-                imgcell = imgcell[~np.all(imgcell==0, axis=1),:]
-                imgcell = imgcell[:,~np.all(imgcell==0, axis=0)]
-                if tuple(imgcell.shape)==(0,0): continue
-                # check fraction of filled pixels
-                fillfrac = np.sum(imgcell)/(imgcell.shape[0]*imgcell.shape[1])
-                if np.sum(imgcell)==0 or fillfrac < 0.1: continue
-                # apply a mask to suppress the circle edges
-                Y, X = np.ogrid[:imgcell.shape[0], :imgcell.shape[1]]
-                center = (imgcell.shape[0]/2, imgcell.shape[1]/2)
-                dist = np.sqrt((X-center[0])**2 + (Y-center[1])**2)
-                mask = dist <= center[0]*0.8
-                imgcell = np.where(mask, imgcell, 0)
-                # read digit
-                n = digitreco(imgcell, references=dimages, doplot=verbose)
-                if n is not None: res[(j, self.ncols-i-1)] = n
+        rowedges = (np.arange(self.nrows)*cellheight).astype(int)
+        coledges = (np.arange(self.ncols)*cellwidth).astype(int)
+        image = self.image.astype(np.int64)
+        # number of filled pixels per image row and cell column, and per cell
+        rowsums = np.add.reduceat(image, coledges, axis=1)
+        cellsums = np.add.reduceat(rowsums, rowedges, axis=0)
+        # number of non-empty rows and columns per cell
+        # (i.e. the shape of the cell after removing whitespace)
+        cellrows = np.add.reduceat(rowsums>0, rowedges, axis=0)
+        colsums = np.add.reduceat(image, rowedges, axis=0)
+        cellcols = np.add.reduceat(colsums>0, coledges, axis=1)
+        # check fraction of filled pixels
+        fillfracs = cellsums / np.maximum(cellrows*cellcols, 1)
+        occupied = (cellsums > 0) & (fillfracs >= 0.1)
+        for i, j in zip(*np.nonzero(occupied)):
+            imgcell = self.image[int(i*cellheight):int((i+1)*cellheight),
+                        int(j*cellwidth):int((j+1)*cellwidth)]
+            # remove whitespace
+            imgcell = imgcell[~np.all(imgcell==0, axis=1),:]
+            imgcell = imgcell[:,~np.all(imgcell==0, axis=0)]
+            # apply a mask to suppress the circle edges
+            imgcell = np.where(get_mask(imgcell.shape), imgcell, 0)
+            positions.append((int(j), self.ncols-int(i)-1))
+            imgcells.append(imgcell)
+            # make a plot of the digit recognition
+            if verbose: digitreco(imgcell, doplot=True)
+        # read digits
+        (digits, confidences) = self.recognizer.recognize(imgcells)
+        self.confidences = {}
+        for position, n, confidence in zip(positions, digits, confidences):
+            if n is None: continue
+            res[position] = n
+            self.confidences[position] = confidence
         return res
 
 
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import argparse
+
+sys.path.append('./src')
+sys.path.append('./solver')
+import solverservice
+
+
+if __name__=='__main__':
+
+    # read command line arguments
+    parser = argparse.ArgumentParser(description='Run a local Hashi solver service over HTTP')
+    parser.add_argument('--host', default='127.0.0.1',
+      help='Host to listen on (default: 127.0.0.1).')
+    parser.add_argument('--port', default=8000, type=int,
+      help='Port to listen on (default: 8000).')
+    parser.add_argument('-w', '--workers', default=None, type=int,
+      help='Number of worker processes (default: number of cpus).')
+    parser.add_argument('-t', '--timeout', default=60., type=float,
+      help='Maximum (and default) timeout in seconds per puzzle (default: 60).')
+    args = parser.parse_args()
+
+    # run the service
+    solverservice.serve(host=args.host, port=args.port, workers=args.workers,
+      max_timeout=args.timeout, paths=[os.path.abspath('./reader')])
@@ -2,39 +2,92 @@
 
 import os
 import sys
+import argparse
+import itertools
 
 sys.path.append('./src')
 from hashi import Hashi
 sys.path.append('./solver')
 import hashisolver
+import batchsolver
+import imagepipeline
+sys.path.append('./reader')
 
 
 if __name__=='__main__':
 
+    # read command line arguments
+    parser = argparse.ArgumentParser(description='Solve Hashi puzzles')
+    parser.add_argument('inputs', nargs='*',
+      help='Input files (.txt, .png, .jpg or .hpz), directories or glob patterns,'
+          +' or - for the standard input (implies --stream).'
+          +' If a single input file is given, the hashi is printed before and after solving;'
+          +' else the results are written in JSON Lines format (one line per puzzle).')
+    parser.add_argument('-m', '--manifest', default=None,
+      help='Text file with one input (file, directory or glob pattern) per line.')
+    parser.add_argument('-s', '--stream', default=False, action='store_true',
+      help='Read the input files as streams of puzzles in txt format,'
+          +' separated by empty lines or by lines starting with # (optionally followed by a name).')
+    parser.add_argument('-b', '--batch', default=False, action='store_true',
+      help='Use the batch output format, also for a single input file.')
+    parser.add_argument('-e', '--engine', default='rules', choices=hashisolver.engines,
+      help='Solving engine (default: rules).')
+    parser.add_argument('-w', '--workers', default=None, type=int,
+      help='Number of worker processes in batch mode (default: number of cpus).')
+    parser.add_argument('--threads', default=4, type=int,
+      help='Number of threads for decoding images in batch mode (default: 4).')
+    parser.add_argument('-t', '--timeout', default=None, type=float,
+      help='Timeout in seconds per puzzle in batch mode (default: no timeout).')
+    parser.add_argument('-o', '--outputfile', default=None,
+      help='Output file in batch mode (default: stdout).')
+    parser.add_argument('-p', '--pretty', default=False, action='store_true',
+      help='Print the solved hashis in batch mode (to stderr if no output file is given).')
+    args = parser.parse_args()
+    if len(args.inputs)==0 and args.manifest is None:
+        parser.error('provide at least one input or a manifest.')
+
+    # stream mode
+    if args.stream or '-' in args.inputs:
+        lines = batchsolver.iter_lines(args.inputs)
+        results = batchsolver.solve_stream(lines, engine=args.engine,
+                    workers=args.workers, timeout=args.timeout, pretty=args.pretty)
+        summary = batchsolver.write_jsonl(results, outputfile=args.outputfile, pretty=args.pretty)
+        msg = 'Processed {} puzzles: {}'.format(sum(summary.values()),
+                ', '.join(['{} {}'.format(n, status) for status, n in sorted(summary.items())]))
+        print(msg, file=sys.stderr)
+        sys.exit(0)
+
+    # batch mode
+    batch = (args.batch or args.manifest is not None
+             or len(args.inputs)!=1 or not os.path.isfile(args.inputs[0])
+             or args.inputs[0].endswith(tuple(batchsolver.puzzlefile_extensions)))
+    if batch:
+        inputfiles = batchsolver.find_inputfiles(args.inputs, manifest=args.manifest)
+        # note: images are read and solved in a separate pipeline (see imagepipeline),
+        #       after the other input files;
+        #       the pipeline is only started if there are images.
+        imagefiles = [f for f in inputfiles if f.endswith(tuple(batchsolver.image_extensions))]
+        otherfiles = [f for f in inputfiles if f not in set(imagefiles)]
+        results = batchsolver.solve_batch(otherfiles, engine=args.engine,
+                    workers=args.workers, timeout=args.timeout, pretty=args.pretty)
+        if len(imagefiles) > 0:
+            results = itertools.chain(results,
+                        imagepipeline.solve_images(imagefiles, engine=args.engine,
+                          workers=args.workers, threads=args.threads, timeout=args.timeout, pretty=args.pretty))
+        summary = batchsolver.write_jsonl(results, outputfile=args.outputfile, pretty=args.pretty)
+        msg = 'Processed {} puzzles: {}'.format(sum(summary.values()),
+                ', '.join(['{} {}'.format(n, status) for status, n in sorted(summary.items())]))
+        print(msg, file=sys.stderr)
+        sys.exit(0)
+
     # read input file
-    inputfile = sys.argv[1]
-    h = None
-
-    # handle case where txt input file is provided
-    if inputfile.endswith('.txt'):
-        h = Hashi.from_txt(inputfile)
-    # handle case where image is provided
-    elif inputfile.endswith('.png') or inputfile.endswith('.jpg'):
-        sys.path.append('./reader')
-        from reader import HashiImageReader
-        HIR = HashiImageReader()
-        HIR.loadimage(inputfile)
-        vertices = HIR.hashidict(verbose=False)
-        h = Hashi.from_dict(vertices)
-    else:
-        msg = 'ERROR: type of input file not recognized;'
-        msg += ' only .txt, .png and .jpg files are supported (for now).'
-        raise Exception(msg)
+    inputfile = args.inputs[0]
+    h = batchsolver.read_hashi(inputfile)
 
     # print the hashi
     h.print()
 
     # solve the hashi
-    hashisolver.solve(h)
+    hashisolver.solve(h, engine=args.engine)
     h.print()
     print('Complete: {}'.format(h.complete))
@@ -0,0 +1,176 @@
+# Asynchronous solving methods.
+
+# These methods run hashisolver.solve in an executor (by default a thread),
+# so that the caller (e.g. the event loop of a graphical interface or a server)
+# is not blocked while solving.
+# Progress is reported after each application of a solving rule (see SolverStats),
+# either through a callback (see solve_async) or as an asynchronous iterator (see iter_progress).
+# Solving can be cancelled by cancelling the corresponding asyncio task;
+# it then stops after the solving rule that is currently being applied,
+# leaving the hashi in its partially solved state.
+# The task only finishes once the executor has stopped modifying the hashi.
+
+# Note: progress is only reported per solving rule for the 'rules' engine;
+#       the other engines report progress only once, when they are finished,
+#       and can not be cancelled halfway (see interruptible_engines).
+# Note: the hashi is modified in the executor while solving;
+#       the progress reports contain the number of edges and optionally a snapshot of them
+#       (see snapshots argument), which can be used safely in the meantime.
+
+# external imports
+import time
+import asyncio
+import threading
+import functools
+
+# local imports
+import hashisolver
+
+
+class SolveCancelled(Exception):
+    # exception raised in the executor to stop solving after a cancellation
+    pass
+
+
+# solving engines that can be cancelled halfway
+# (i.e. that report progress after each solving rule)
+interruptible_engines = ['rules']
+
+
+def get_snapshot(hashi):
+    ### get the current edges of a hashi
+    # returns:
+    # - a list of the form [[x1, y1, x2, y2, number of edges], ...]
+    return [[x1, y1, x2, y2, len(edges)] for (x1, y1, x2, y2), edges in hashi.get_edges().items()]
+
+
+async def solve_async(hashi, engine='rules', progress=None, interval=0., snapshots=False, executor=None):
+    ### solve a hashi without blocking the event loop
+    # input arguments:
+    # - engine: solving engine (see hashisolver.engines)
+    # - progress: function to call with a progress report (a dict)
+    #   after each application of a solving rule; it is called in the event loop,
+    #   with the keys of the SolverStats callback (round, rule, time, edges_added,
+    #   connections_closed) and additionally edges (total number of edges),
+    #   complete (whether the hashi is complete), final (True only for the last report)
+    #   and solution (only if snapshots is True, see get_snapshot).
+    # - interval: minimum time in seconds between two progress reports
+    #   (the final report is always sent)
+    # - snapshots: whether to include a snapshot of the edges in the progress reports
+    # - executor: concurrent.futures executor to run the solving in (default: the default executor)
+    # returns:
+    # - the SolverStats of the solving
+    loop = asyncio.get_running_loop()
+    cancelled = threading.Event()
+    last_report = [0.]
+    def report(info, final=False):
+        info['edges'] = len(hashi.edges)
+        info['complete'] = hashi.complete
+        info['final'] = final
+        if snapshots: info['solution'] = get_snapshot(hashi)
+        loop.call_soon_threadsafe(progress, info)
+    def callback(info):
+        # note: this is called in the executor
+        if cancelled.is_set(): raise SolveCancelled()
+        if progress is None: return
+        now = time.perf_counter()
+        if now - last_report[0] < interval: return
+        last_report[0] = now
+        report(info)
+    function = functools.partial(hashisolver.solve, hashi, engine=engine, callback=callback)
+    future = loop.run_in_executor(executor, function)
+    try:
+        stats = await asyncio.shield(future)
+    except asyncio.CancelledError:
+        # note: cancelling the await does not stop the executor,
+        #       so signal the solving to stop at the next callback,
+        #       and wait until it has stopped, so that the hashi is not modified anymore
+        #       once the cancellation is reported to the caller.
+        cancelled.set()
+        try: await future
+        except Exception: pass
+        raise
+    if progress is not None:
+        report({'round': stats.rounds, 'rule': None, 'time': stats.time,
+                'edges_added': 0, 'connections_closed': 0}, final=True)
+    return stats
+
+
+async def iter_progress(hashi, **kwargs):
+    ### solve a hashi without blocking the event loop, yielding the progress reports
+    # input arguments:
+    # - kwargs: passed down to solve_async
+    # returns:
+    # - an asynchronous generator yielding the progress reports (see solve_async),
+    #   the last one having final set to True.
+    # note: if the iteration is stopped early, the solving is cancelled.
+    queue = asyncio.Queue()
+    task = asyncio.ensure_future(solve_async(hashi, progress=queue.put_nowait, **kwargs))
+    try:
+        while True:
+            getter = asyncio.ensure_future(queue.get())
+            await asyncio.wait([getter, task], return_when=asyncio.FIRST_COMPLETED)
+            if not getter.done():
+                # solving finished (or failed) without a final report
+                getter.cancel()
+                if not queue.empty(): yield queue.get_nowait()
+                task.result()
+                return
+            info = getter.result()
+            yield info
+            if info['final']: return
+    finally:
+        if not task.done(): task.cancel()
+
+
+class BackgroundTask(object):
+    # handle of a solving task running in a BackgroundSolver
+
+    def __init__(self, loop, task):
+        ### initializer
+        self.loop = loop
+        self.task = task
+
+    def cancel(self):
+        ### request to stop the solving
+        # note: this returns immediately; the done function (see BackgroundSolver.submit)
+        #       is called once the solving has actually stopped.
+        self.loop.call_soon_threadsafe(self.task.cancel)
+
+
+class BackgroundSolver(object):
+    # implementation of a solver running its own event loop in a background thread,
+    # for callers that do not run an asyncio event loop themselves
+    # (e.g. a PyQt5 graphical interface).
+    # note: the progress and done functions are called in the background thread;
+    #       use e.g. Qt signals to handle them in the thread of the caller.
+
+    def __init__(self):
+        ### initializer
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def submit(self, hashi, progress=None, done=None, **kwargs):
+        ### start solving a hashi in the background
+        # input arguments:
+        # - progress: see solve_async
+        # - done: function to call with the asyncio task of the solving when it is finished
+        #   (use task.cancelled(), task.exception() and task.result() to check the outcome)
+        # - kwargs: passed down to solve_async
+        # returns:
+        # - a BackgroundTask; call its cancel method to stop the solving
+        # note: the task is created in the event loop, so that cancelling it
+        #       only completes once the solving has actually stopped (see solve_async);
+        #       a concurrent.futures.Future would be marked as cancelled right away.
+        async def start():
+            task = asyncio.ensure_future(solve_async(hashi, progress=progress, **kwargs))
+            if done is not None: task.add_done_callback(done)
+            return task
+        task = asyncio.run_coroutine_threadsafe(start(), self.loop).result()
+        return BackgroundTask(self.loop, task)
+
+    def close(self):
+        ### stop the background thread
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
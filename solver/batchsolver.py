@@ -0,0 +1,340 @@
+# Solving methods for batches of puzzles.
+
+# The puzzles are read from input files (txt, images or puzzle files, see read_hashi),
+# which can be specified as files, directories, glob patterns or a manifest file
+# (see find_inputfiles).
+# They are solved in parallel over a pool of worker processes,
+# and the results are returned as soon as they are available (see solve_batch).
+# Alternatively, the puzzles can be read one by one from a stream of text,
+# e.g. a large file with many puzzles or the standard input (see solve_stream).
+# Each result is a dict that can be written as one line of a JSON Lines file.
+
+# Note: a puzzle that fails (e.g. unreadable input file, exception in the solver)
+#       or that exceeds the timeout does not stop the batch;
+#       the result for that puzzle simply reports the failure.
+
+# external imports
+import os
+import sys
+import glob
+import json
+import time
+import signal
+import collections
+import multiprocessing
+
+# local imports
+from hashi import Hashi
+from puzzlefile import PuzzleFile
+import hashisolver
+
+
+# file extensions that are recognized as input files
+txt_extensions = ['.txt']
+image_extensions = ['.png', '.jpg']
+# file extensions of puzzle files (containing many puzzles, see PuzzleFile)
+puzzlefile_extensions = ['.hpz']
+
+# puzzle files that were already opened in this process
+# (so that they are memory-mapped only once per worker process)
+puzzlefiles = {}
+
+
+def get_puzzlefile(inputfile):
+    ### get the (memory-mapped) PuzzleFile object for a puzzle file
+    if inputfile not in puzzlefiles: puzzlefiles[inputfile] = PuzzleFile(inputfile)
+    return puzzlefiles[inputfile]
+
+
+def read_hashi(inputfile, index=None):
+    ### read a hashi from an input file
+    # input arguments:
+    # - index: index of the puzzle in the file (only for puzzle files)
+    # note: txt files, images and puzzle files are supported;
+    #       for images, the reader folder must be in the python path.
+    if inputfile.endswith(tuple(puzzlefile_extensions)):
+        if index is None: raise Exception('ERROR: index is required for puzzle files.')
+        return get_puzzlefile(inputfile).get_hashi(index)
+    if inputfile.endswith(tuple(txt_extensions)):
+        return Hashi.from_txt(inputfile)
+    if inputfile.endswith(tuple(image_extensions)):
+        from reader import HashiImageReader
+        HIR = HashiImageReader()
+        HIR.loadimage(inputfile)
+        vertices = HIR.hashidict(verbose=False)
+        return Hashi.from_dict(vertices)
+    msg = 'ERROR: type of input file {} not recognized;'.format(inputfile)
+    extensions = txt_extensions + image_extensions + puzzlefile_extensions
+    msg += ' only {} files are supported (for now).'.format(', '.join(extensions))
+    raise Exception(msg)
+
+
+def find_inputfiles(inputs, manifest=None):
+    ### find the input files corresponding to a list of inputs
+    # input arguments:
+    # - inputs: list of files, directories or glob patterns;
+    #   for directories, all files with a recognized extension are used
+    #   (not including subdirectories).
+    # - manifest: path to a text file with one input (file, directory or glob pattern) per line;
+    #   empty lines and lines starting with '#' are ignored,
+    #   and relative paths are interpreted with respect to the location of the manifest.
+    # returns:
+    # - list of input files (without duplicates, in the order they were found)
+    inputs = list(inputs)
+    if manifest is not None:
+        manifestdir = os.path.dirname(manifest)
+        with open(manifest, 'r') as f: lines = [line.strip() for line in f.readlines()]
+        for line in lines:
+            if len(line)==0 or line.startswith('#'): continue
+            inputs.append(os.path.join(manifestdir, line))
+    extensions = tuple(txt_extensions + image_extensions + puzzlefile_extensions)
+    inputfiles = []
+    for inputname in inputs:
+        if os.path.isdir(inputname):
+            names = sorted([os.path.join(inputname, f) for f in os.listdir(inputname)])
+            inputfiles += [f for f in names if os.path.isfile(f) and f.endswith(extensions)]
+        elif os.path.isfile(inputname):
+            inputfiles.append(inputname)
+        else:
+            matches = sorted(glob.glob(inputname))
+            if len(matches)==0:
+                msg = 'WARNING in find_inputfiles: input {} does not match any file.'.format(inputname)
+                print(msg, file=sys.stderr)
+            inputfiles += [f for f in matches if os.path.isfile(f)]
+    # remove duplicates
+    return list(dict.fromkeys(inputfiles))
+
+
+def raise_timeout(signum, frame):
+    ### helper function to solve_puzzle (signal handler for the timeout)
+    raise TimeoutError('puzzle exceeded the timeout')
+
+
+def get_solution(hashi):
+    ### get the edges of a hashi in a format suitable for json
+    # returns:
+    # - a list of the form [[x1, y1, x2, y2, number of edges], ...]
+    return [[x1, y1, x2, y2, len(edges)] for (x1, y1, x2, y2), edges in hashi.get_edges().items()]
+
+
+def init_result(result):
+    ### helper function to solve_puzzle
+    # fill a result dict with the keys of a result (see solve_file) for a puzzle that is not solved
+    # (e.g. also for reporting a puzzle for which no result was received in time)
+    result.update({'status': 'error', 'complete': False,
+                   'nvertices': None, 'nedges': None, 'time': None})
+    return result
+
+
+def solve_puzzle(read, result, engine='rules', timeout=None, pretty=False, solution=False):
+    ### helper function to solve_file and solve_text
+    # input arguments:
+    # - read: function without arguments returning the hashi to solve
+    # - result: dict to fill with the result (see solve_file)
+    # - engine, timeout, pretty, solution: see solve_file
+    init_result(result)
+    starttime = time.time()
+    # note: the timeout is implemented with a timer raising a TimeoutError (see raise_timeout);
+    #       the previous signal handler is restored afterwards (e.g. when solving in the main process).
+    # note: the timer is disarmed as soon as the solving is finished (or failed),
+    #       so that it can not go off while the result is being made;
+    #       if it goes off right before that, the status is set to timeout
+    #       instead of letting the TimeoutError escape (which would stop a whole batch).
+    use_timer = (timeout is not None and hasattr(signal, 'setitimer'))
+    if use_timer: previous_handler = signal.signal(signal.SIGALRM, raise_timeout)
+    try:
+        try:
+            if use_timer: signal.setitimer(signal.ITIMER_REAL, timeout)
+            h = read()
+            result['nvertices'] = h.nvertices
+            stats = hashisolver.solve(h, engine=engine, stats=True)
+        finally:
+            if use_timer: signal.setitimer(signal.ITIMER_REAL, 0)
+        solved = (h.complete and h.disjointset.nsets==1)
+        result['status'] = 'solved' if solved else 'unsolved'
+        result['complete'] = h.complete
+        result['nedges'] = len(h.edges)
+        result['stats'] = stats.to_dict()
+        if pretty: result['board'] = h.fancy_str()
+        if solution: result['solution'] = get_solution(h)
+    except TimeoutError:
+        result['status'] = 'timeout'
+    except Exception as e:
+        result['error'] = str(e)
+    finally:
+        if use_timer:
+            try: signal.setitimer(signal.ITIMER_REAL, 0)
+            except TimeoutError: result['status'] = 'timeout'
+            signal.signal(signal.SIGALRM, previous_handler)
+    result['time'] = time.time() - starttime
+    return result
+
+
+def solve_file(inputfile, index=None, engine='rules', timeout=None, pretty=False, solution=False):
+    ### read and solve a hashi from an input file
+    # input arguments:
+    # - index: index of the puzzle in the file (only for puzzle files)
+    # - engine: solving engine (see hashisolver.engines)
+    # - timeout: maximum time in seconds for reading and solving the hashi
+    #   (default: no maximum; only supported on platforms with signal.setitimer)
+    # - pretty: whether to include the fancy string representation of the solved hashi
+    # - solution: whether to include the edges of the solved hashi (see get_solution)
+    # returns:
+    # - a dict with the following keys:
+    #   - file: the input file
+    #   - index: index of the puzzle in the file (only for puzzle files)
+    #   - status: 'solved', 'unsolved', 'timeout' or 'error'
+    #   - complete: whether all vertices are complete
+    #   - nvertices: number of vertices
+    #   - nedges: number of edges after solving
+    #   - time: wall time in seconds for reading and solving the hashi
+    #   - stats: statistics of the solving rules (see SolverStats.to_dict)
+    #   - error: the error message (only if status is 'error')
+    #   - board: the fancy string representation (only if pretty is True)
+    #   - solution: the edges (only if solution is True)
+    result = {'file': inputfile}
+    if index is not None: result['index'] = index
+    return solve_puzzle(lambda: read_hashi(inputfile, index=index), result,
+             engine=engine, timeout=timeout, pretty=pretty, solution=solution)
+
+
+def solve_text(txt, name=None, engine='rules', timeout=None, pretty=False, solution=False):
+    ### parse and solve a hashi from its string representation (see Hashi.from_str)
+    # input arguments:
+    # - name: name of the puzzle to put in the result
+    # - engine, timeout, pretty, solution: see solve_file
+    # returns:
+    # - a dict with the same keys as for solve_file, but with name instead of file and index
+    result = {'name': name}
+    return solve_puzzle(lambda: Hashi.from_str(txt), result,
+             engine=engine, timeout=timeout, pretty=pretty, solution=solution)
+
+
+def solve_file_kwargs(kwargs):
+    ### helper function to solve_batch (unpack keyword arguments for solve_file)
+    return solve_file(**kwargs)
+
+
+def solve_batch(inputfiles, engine='rules', workers=None, timeout=None, pretty=False):
+    ### solve a batch of input files in parallel
+    # input arguments:
+    # - inputfiles: list of input files (see e.g. find_inputfiles);
+    #   for puzzle files, each puzzle in the file is solved separately.
+    # - workers: number of worker processes (default: number of cpus);
+    #   if 1, the files are solved in the current process.
+    # - engine, timeout, pretty: see solve_file
+    # returns:
+    # - a generator yielding the result (see solve_file) for each input file,
+    #   in the order in which they are finished (not necessarily the input order).
+    if workers is None: workers = os.cpu_count()
+    tasks = []
+    for f in inputfiles:
+        indices = [None]
+        if f.endswith(tuple(puzzlefile_extensions)): indices = range(len(get_puzzlefile(f)))
+        for index in indices:
+            tasks.append({'inputfile': f, 'index': index, 'engine': engine,
+                          'timeout': timeout, 'pretty': pretty})
+    if workers==1 or len(tasks)<=1:
+        for task in tasks: yield solve_file(**task)
+        return
+    with multiprocessing.Pool(processes=min(workers, len(tasks))) as pool:
+        for result in pool.imap_unordered(solve_file_kwargs, tasks):
+            yield result
+
+
+def iter_puzzle_texts(lines):
+    ### split a stream of lines into the string representations of puzzles
+    # input arguments:
+    # - lines: iterable of lines (e.g. an open file or sys.stdin)
+    # returns:
+    # - a generator yielding tuples of the form (name, string representation)
+    # note: puzzles are separated by empty lines or by record lines starting with '#';
+    #       the text after the '#' in a record line is used as the name of the next puzzle
+    #       (default: the number of the puzzle in the stream, starting from 0).
+    # note: only the lines of the current puzzle are kept in memory.
+    counter = 0
+    name = None
+    puzzlelines = []
+    for line in lines:
+        line = line.strip()
+        if len(line)==0 or line.startswith('#'):
+            if len(puzzlelines) > 0:
+                yield (name if name is not None else str(counter), '\n'.join(puzzlelines))
+                counter += 1
+                name = None
+                puzzlelines = []
+            if line.startswith('#') and len(line[1:].strip()) > 0: name = line[1:].strip()
+            continue
+        puzzlelines.append(line)
+    if len(puzzlelines) > 0:
+        yield (name if name is not None else str(counter), '\n'.join(puzzlelines))
+
+
+def iter_lines(inputs):
+    ### iterate over the lines of several input files
+    # input arguments:
+    # - inputs: list of file names, where - stands for the standard input
+    # note: an empty line is inserted between files,
+    #       so that puzzles from different files are always separated.
+    for inputname in inputs:
+        if inputname=='-':
+            for line in sys.stdin: yield line
+        else:
+            with open(inputname, 'r') as f:
+                for line in f: yield line
+        yield ''
+
+
+def solve_stream(lines, engine='rules', workers=None, timeout=None, pretty=False, max_pending=None):
+    ### solve a stream of puzzles
+    # input arguments:
+    # - lines: iterable of lines (see iter_puzzle_texts)
+    # - workers: number of worker processes (default: number of cpus);
+    #   if 1, the puzzles are solved in the current process.
+    # - max_pending: maximum number of puzzles that are read but not yet yielded
+    #   (default: 4 times the number of workers)
+    # - engine, timeout, pretty: see solve_file
+    # returns:
+    # - a generator yielding the result (see solve_text) for each puzzle,
+    #   in the order of the stream.
+    # note: the puzzles are read from the stream only when there is room for them
+    #       (see max_pending), so that the memory usage does not grow with the size of the stream.
+    if workers is None: workers = os.cpu_count()
+    tasks = ({'txt': txt, 'name': name, 'engine': engine, 'timeout': timeout, 'pretty': pretty}
+               for name, txt in iter_puzzle_texts(lines))
+    if workers==1:
+        for task in tasks: yield solve_text(**task)
+        return
+    if max_pending is None: max_pending = 4*workers
+    pending = collections.deque()
+    with multiprocessing.Pool(processes=workers) as pool:
+        for task in tasks:
+            pending.append(pool.apply_async(solve_text, kwds=task))
+            if len(pending) >= max_pending: yield pending.popleft().get()
+        while len(pending) > 0: yield pending.popleft().get()
+
+
+def write_jsonl(results, outputfile=None, pretty=False):
+    ### write results to a JSON Lines file (or to stdout)
+    # input arguments:
+    # - results: iterable of results (see solve_file and solve_text)
+    # - outputfile: output file (default: stdout)
+    # - pretty: whether to print the board of each result
+    #   (to stdout if an outputfile is given, to stderr otherwise)
+    # returns:
+    # - a dict with the number of results per status
+    summary = {}
+    f = open(outputfile, 'w') if outputfile is not None else sys.stdout
+    try:
+        for result in results:
+            summary[result['status']] = summary.get(result['status'], 0) + 1
+            board = result.pop('board', None)
+            f.write(json.dumps(result) + '\n')
+            f.flush()
+            if pretty and board is not None:
+                # note: results of solve_file have a file, results of solve_text a name.
+                print('{}\n{}'.format(result.get('file', result.get('name')), board),
+                  file=(sys.stdout if outputfile is not None else sys.stderr))
+    finally:
+        if outputfile is not None: f.close()
+    return summary
@@ -0,0 +1,234 @@
+# Solving methods based on a constraint formulation of the puzzle.
+
+# The hashi is encoded as one integer variable per candidate edge
+# (i.e. per pair of neighbouring vertices, see Hashi.slots),
+# holding the number of connections between both vertices, with the constraints:
+# - degree: for each vertex, the variables of its candidate edges sum up to the vertex number.
+# - crossing: of two crossing candidate edges, at most one has a non-zero value.
+# - connectivity: for each set of vertices that is not the full hashi,
+#   at least one candidate edge leaving the set has a non-zero value.
+#   since there are too many of these constraints to list them all,
+#   they are added lazily, i.e. only when a full assignment is found
+#   that violates them (and kept for the rest of the search).
+
+# The variables are represented by their lower and upper bounds.
+# The search alternates propagation of the constraints on these bounds
+# (with array operations on all variables at once) with branching on a variable,
+# and backtracks when the bounds become inconsistent.
+# It is independent of the rule based solving methods in hashisolver,
+# and complete, i.e. it finds a solution for every puzzle that has one.
+
+# external imports
+import numpy as np
+
+class ConstraintModel(object):
+    # implementation of the constraint formulation of a hashi.
+
+    def __init__(self, hashi):
+        ### initializer from the current state of a hashi
+        # note: established connections are taken into account as lower bounds,
+        #       closed connections as upper bounds.
+        self.hashi = hashi
+        self.nslots = len(hashi.slots)
+        self.slots = np.array(hashi.slots, dtype=np.int32).reshape(-1, 2)
+        self.n = np.array([v.n for v in hashi.vertices], dtype=np.int32)
+        # candidate edge indices per vertex and direction,
+        # where -1 (no candidate edge) is replaced by an extra dummy variable
+        # that is always zero.
+        self.incidence = np.where(hashi.slot_indices>=0, hashi.slot_indices, self.nslots)
+        # positions of each candidate edge in the flattened incidence array
+        # (one for each of its two vertices)
+        self.ends = np.zeros((self.nslots, 2), dtype=np.int32)
+        for sidx, (v1idx, v2idx) in enumerate(hashi.slots):
+            direction = int(np.nonzero(hashi.slot_indices[v1idx]==sidx)[0][0])
+            self.ends[sidx,0] = 4*v1idx + direction
+            self.ends[sidx,1] = 4*v2idx + (direction+2)%4
+        # pairs of crossing candidate edges
+        pairs = [(sidx, other_sidx) for sidx, crossings in enumerate(hashi.crossings)
+                   for other_sidx in crossings if sidx < other_sidx]
+        self.crossings = np.array(pairs, dtype=np.int32).reshape(-1, 2)
+        # connectivity constraints (added lazily)
+        # note: each element is an array of candidate edge indices,
+        #       at least one of which must have a non-zero value.
+        self.cuts = []
+        # initial bounds
+        self.lower = np.zeros(self.nslots+1, dtype=np.int32)
+        self.upper = np.zeros(self.nslots+1, dtype=np.int32)
+        for sidx, (v1idx, v2idx) in enumerate(hashi.slots):
+            v1 = hashi.vertices[v1idx]
+            v2 = hashi.vertices[v2idx]
+            direction = v2.direction(v1)
+            established = v1.n_established_connections(direction)
+            potential = min(v1.n_potential_connections(direction),
+                            v2.n_potential_connections((direction+2)%4))
+            self.lower[sidx] = established
+            self.upper[sidx] = established + potential
+
+    def propagate(self, lower, upper):
+        ### tighten the bounds until no more changes are made
+        # note: lower and upper are modified in place.
+        # returns:
+        # - False if the bounds became inconsistent, True otherwise.
+        while True:
+            old_lower = lower.copy()
+            old_upper = upper.copy()
+            # degree constraints
+            lower_inc = lower[self.incidence]
+            upper_inc = upper[self.incidence]
+            sum_lower = np.sum(lower_inc, axis=1)
+            sum_upper = np.sum(upper_inc, axis=1)
+            if np.any(sum_lower > self.n) or np.any(sum_upper < self.n): return False
+            new_lower = (self.n[:, np.newaxis] - (sum_upper[:, np.newaxis] - upper_inc)).ravel()
+            new_upper = (self.n[:, np.newaxis] - (sum_lower[:, np.newaxis] - lower_inc)).ravel()
+            lower[:self.nslots] = np.maximum(lower[:self.nslots],
+              np.maximum(new_lower[self.ends[:,0]], new_lower[self.ends[:,1]]))
+            upper[:self.nslots] = np.minimum(upper[:self.nslots],
+              np.minimum(new_upper[self.ends[:,0]], new_upper[self.ends[:,1]]))
+            # crossing constraints
+            if len(self.crossings) > 0:
+                first = self.crossings[:,0]
+                second = self.crossings[:,1]
+                upper[second[lower[first] > 0]] = 0
+                upper[first[lower[second] > 0]] = 0
+            # connectivity constraints
+            for cut in self.cuts:
+                if np.any(lower[cut] > 0): continue
+                open_slots = cut[upper[cut] > 0]
+                if len(open_slots)==0: return False
+                if len(open_slots)==1: lower[open_slots[0]] = max(lower[open_slots[0]], 1)
+            if np.any(lower > upper): return False
+            if( np.array_equal(lower, old_lower) and np.array_equal(upper, old_upper) ): return True
+
+    def components(self, values):
+        ### get the connected components of the vertices for given variable values
+        # returns:
+        # - an array of shape (nvertices) with for each vertex a component label,
+        #   i.e. the smallest vertex index in its component
+        # note: the components are found with array operations only,
+        #       by repeatedly attaching the label of one end of each edge to the smaller label
+        #       of the other end, and following the labels until they point to themselves.
+        labels = np.arange(len(self.n))
+        edges = self.slots[values[:self.nslots] > 0]
+        first = edges[:,0]
+        second = edges[:,1]
+        while True:
+            first_labels = labels[first]
+            second_labels = labels[second]
+            different = (first_labels != second_labels)
+            if not np.any(different): return labels
+            first_labels = first_labels[different]
+            second_labels = second_labels[different]
+            labels[np.maximum(first_labels, second_labels)] = np.minimum(first_labels, second_labels)
+            while True:
+                next_labels = labels[labels]
+                if np.array_equal(next_labels, labels): break
+                labels = next_labels
+
+    def n_components(self, values):
+        ### get the number of connected components of the vertices for given variable values
+        return len(np.unique(self.components(values)))
+
+    def add_cuts(self, labels):
+        ### add connectivity constraints for the given components
+        # input arguments:
+        # - labels: component labels as returned by components
+        for label in np.unique(labels):
+            inside = (labels==label)
+            cut = np.nonzero(inside[self.slots[:,0]] != inside[self.slots[:,1]])[0]
+            self.cuts.append(cut)
+
+    def choose(self, lower, upper):
+        ### choose the variable to branch on
+        # note: the variable is chosen among the unfixed ones
+        #       as the one with a vertex that has the least freedom,
+        #       i.e. the smallest difference between the maximum sum of its variables
+        #       and its vertex number.
+        unfixed = np.nonzero(lower[:self.nslots] < upper[:self.nslots])[0]
+        if len(unfixed)==0: return None
+        slack = np.sum(upper[self.incidence], axis=1) - self.n
+        slot_slack = np.minimum(slack[self.slots[unfixed,0]], slack[self.slots[unfixed,1]])
+        return unfixed[np.argmin(slot_slack)]
+
+
+def iter_solutions(model, max_nodes=None, verbose=False):
+    ### search for the solutions of a ConstraintModel
+    # returns:
+    # - a generator yielding for each solution an array
+    #   with the number of connections for each candidate edge.
+    # note: each element in the stack is a tuple of the form (lower, upper),
+    #       holding the bounds of a branch that was not explored yet.
+    stack = [(model.lower.copy(), model.upper.copy())]
+    n_nodes = 0
+    while len(stack) > 0:
+        if max_nodes is not None and n_nodes >= max_nodes: break
+        (lower, upper) = stack.pop()
+        n_nodes += 1
+        if not model.propagate(lower, upper): continue
+        # check if all vertices can still be connected
+        if model.n_components(upper) > 1: continue
+        sidx = model.choose(lower, upper)
+        if sidx is None:
+            # full assignment: check connectivity
+            labels = model.components(lower)
+            n_components = len(np.unique(labels))
+            if n_components==1:
+                yield lower[:model.nslots].copy()
+                continue
+            # add connectivity constraints and try again
+            # (will fail the propagation and backtrack)
+            model.add_cuts(labels)
+            if verbose:
+                msg = 'INFO in constraint solver: added {} connectivity constraints'.format(n_components)
+                msg += ' (total: {})'.format(len(model.cuts))
+                print(msg)
+            stack.append((lower, upper))
+            continue
+        # branch: first try making a connection,
+        # then try not making more connections than the current lower bound
+        lower_none = lower.copy()
+        upper_none = upper.copy()
+        upper_none[sidx] = lower[sidx]
+        stack.append((lower_none, upper_none))
+        lower[sidx] += 1
+        stack.append((lower, upper))
+
+
+def find_solution(model, max_nodes=None, verbose=False):
+    ### search for a solution of a ConstraintModel
+    # returns:
+    # - an array with the number of connections for each candidate edge,
+    #   or None if no solution was found.
+    return next(iter_solutions(model, max_nodes=max_nodes, verbose=verbose), None)
+
+
+def count_solutions(hashi, max_solutions=2, max_nodes=None, verbose=False):
+    ### count the solutions of a hashi (starting from its current state)
+    # input arguments:
+    # - max_solutions: stop counting when this number of solutions is found
+    #   (e.g. the default of 2 is sufficient to check whether the solution is unique)
+    # - max_nodes: maximum number of branches to explore (default: no maximum)
+    # returns:
+    # - the number of solutions found
+    #   (at most max_solutions; may be underestimated if max_nodes is reached)
+    # note: the hashi is not modified.
+    model = ConstraintModel(hashi)
+    n_solutions = 0
+    for _ in iter_solutions(model, max_nodes=max_nodes, verbose=verbose):
+        n_solutions += 1
+        if n_solutions >= max_solutions: break
+    return n_solutions
+
+
+def solve(hashi, max_nodes=None, verbose=False):
+    ### main solving method with the constraint formulation
+    # input arguments:
+    # - max_nodes: maximum number of branches to explore (default: no maximum)
+    # returns:
+    # - True if a solution was found (the hashi is then in its solved state),
+    #   False otherwise (the hashi is then unmodified).
+    model = ConstraintModel(hashi)
+    values = find_solution(model, max_nodes=max_nodes, verbose=verbose)
+    if values is None: return False
+    for sidx, (v1idx, v2idx) in enumerate(hashi.slots):
+        for _ in range(values[sidx] - model.lower[sidx]): hashi.add_edge(v1idx, v2idx)
+    return True
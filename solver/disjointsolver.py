@@ -2,19 +2,28 @@
 
 # Note: not yet complete.
 
-def close_connections_disjoint(hashi, verbose=False):
+def close_connections_disjoint(hashi, vertices=None, verbose=False):
     # PRELIMINARY VERSION, KNOWN TO BE INCOMPLETE
     # dynamically close vertex connections,
     # based on the criterion that a connection that would create
     # a disjoint set of vertices disconnected from the rest is forbidden
     # (i.e. all vertices must be connected to each other).
+    # input arguments:
+    # - vertices: iterable of vertex indices to process (default: all vertices)
     n_closed = 0
-    for vidx,vertex in enumerate(hashi.vertices):
+    if vertices is None: vertices = range(hashi.nvertices)
+    for vidx in vertices:
+        vertex = hashi.vertices[vidx]
         if vertex.complete: continue
         # get the cluster of connected vertices
-        cluster = hashi.get_cluster(vertex)
+        cluster_id = hashi.get_cluster_id(vertex)
+        cluster = hashi.clusters[cluster_id]
+        cluster_size = hashi.disjointset.size[cluster_id]
         # if all vertices are already connected, skip
-        if len(cluster.vertices)==hashi.nvertices: continue
+        if cluster_size==hashi.nvertices: continue
+        # if the cluster has more than two incomplete vertices,
+        # no single connection can make it complete, so skip
+        if len(cluster.incomplete) > 2: continue
         # loop over potential connections
         for direction in vertex.directions_with_potential_connection():
             # get the other vertex
@@ -22,9 +31,12 @@ def close_connections_disjoint(hashi, verbose=False):
             if other_vertex is None: raise Exception('ERROR: something went wrong.')
             other_direction = vertex.direction(other_vertex)
             # get the cluster of the other vertex
-            other_cluster = hashi.get_cluster(other_vertex)
+            other_cluster_id = hashi.get_cluster_id(other_vertex)
+            other_cluster = hashi.clusters[other_cluster_id]
             # if the two clusters together make up the full hashi, skip
-            if len(list(set(cluster.vertices + other_cluster.vertices)))==hashi.nvertices: continue
+            joined_size = cluster_size
+            if other_cluster_id != cluster_id: joined_size += hashi.disjointset.size[other_cluster_id]
+            if joined_size==hashi.nvertices: continue
             # if adding the connection would make both vertices complete,
             # it is not allowed and can be closed.
             if( cluster.would_make_complete((vertex, other_vertex))
@@ -33,29 +45,77 @@ def close_connections_disjoint(hashi, verbose=False):
                     msg = 'INFO in disjoint solver: closed connection'
                     msg += ' between {} and {}'.format(vertex, other_vertex)
                     print(msg)
-                vertex.close_n_connections(direction, 1, suppress_warnings=True)
-                other_vertex.close_n_connections(other_direction, 1, suppress_warnings=True)
+                hashi.close_n_connections(vidx, direction, 1, suppress_warnings=True)
+                hashi.close_n_connections(other_vertex, other_direction, 1, suppress_warnings=True)
                 n_closed += 1
     return n_closed
 
-def make_joining_connection(hashi, verbose=False):
+def is_dead_end(cluster, other_cluster):
+    ### helper function to make_joining_connection.
+    # check whether other_cluster cannot connect to anything else than cluster,
+    # once a connection between both is made.
+    # this is the case if either:
+    # - all its potential external connections go to cluster, or
+    # - all its potential external connections to other clusters start from a single vertex
+    #   that misses only one connection, and all potential connections with cluster
+    #   go to that same vertex (so that vertex is complete after connecting).
+    outside_vertices = set()
+    inside_vertices = set()
+    for (v, extvertex) in other_cluster.get_external_connections():
+        if cluster.contains(extvertex): inside_vertices.add(v)
+        else: outside_vertices.add(v)
+    if len(outside_vertices)==0: return True
+    if len(outside_vertices)>1: return False
+    vertex = list(outside_vertices)[0]
+    if vertex.n_missing_connections()!=1: return False
+    if len(inside_vertices - outside_vertices)>0: return False
+    return True
+
+def make_joining_connection(hashi, cluster_ids=None, verbose=False):
     ### make a necessary joining connection
     # if a cluster has only one external connection that would not make it disjoint,
     # this connection has to be made necessarily
+    # note: a connection towards another cluster makes both clusters disjoint from the rest
+    #       if it makes the other cluster complete and the other cluster cannot connect
+    #       to anything else (see is_dead_end), unless both clusters together make up the full hashi;
+    #       connections towards clusters that would be made complete,
+    #       but that could still connect to other clusters, are counted as candidates.
+    # input arguments:
+    # - cluster_ids: iterable of cluster ids to process (default: all clusters)
     added_edges = []
     # loop over clusters
-    for cluster in hashi.clusters:
+    # note: loop over a copy, since clusters are merged when adding edges;
+    #       clusters that were merged into another one in the meantime are skipped.
+    if cluster_ids is None: clusters = list(hashi.clusters.items())
+    else: clusters = [(cid, hashi.clusters.get(cid)) for cid in cluster_ids]
+    for cluster_id, cluster in clusters:
+        if cluster is None or hashi.clusters.get(cluster_id) is not cluster: continue
+        # if all vertices are already connected, skip
+        joined_size = hashi.disjointset.size[cluster_id]
+        if joined_size==hashi.nvertices: continue
         candidate_connections = []
+        skipped_cluster_ids = set()
         # loop over external connections
         for potential_connection in cluster.get_external_connections():
             # if this connection is made towards a cluster which is made
-            # complete by this connection, do not count this connection
+            # complete by this connection and cannot connect to anything else,
+            # do not count this connection
             (intvertex, extvertex) = potential_connection
-            other_cluster = hashi.get_cluster(extvertex)
-            if other_cluster.would_make_complete((potential_connection)): continue
+            other_cluster_id = hashi.get_cluster_id(extvertex)
+            other_cluster = hashi.clusters[other_cluster_id]
+            if( other_cluster.would_make_complete((potential_connection))
+                and is_dead_end(cluster, other_cluster) ):
+                if other_cluster_id not in skipped_cluster_ids:
+                    skipped_cluster_ids.add(other_cluster_id)
+                    joined_size += hashi.disjointset.size[other_cluster_id]
+                continue
             # add the candidate
             candidate_connections.append(potential_connection)
+            # shortcut: stop as soon as there is more than one candidate
+            if len(candidate_connections) > 1: break
         if len(candidate_connections)!=1: continue
+        # if this cluster together with the skipped clusters make up the full hashi, skip
+        if joined_size==hashi.nvertices: continue
         (v1, v2) = candidate_connections[0]
         hashi.add_edge(v1, v2)
         added_edges.append((v1, v2))
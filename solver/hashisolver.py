@@ -1,51 +1,215 @@
 # external imports
+import time
 import numpy as np
 
 # local imports
+from solverstats import SolverStats
 import vertexsolver
 import disjointsolver
 
 
-def close_connections(hashi, verbose=False):
-    # dynamically close vertex connections,
+def find_connections_to_close(state):
+    ### find the number of connections to close for all vertices and directions,
     # based on available number of endpoints.
+    # input arguments:
+    # - state: a BoardState
+    # returns:
+    # - an array of shape (nvertices, 4) with the number of connections to close
+    #   for each vertex and direction.
+    # note: the maximum number of endpoints in a given direction
+    #       is the multiplicity of the vertex in that direction,
+    #       but could be constrained if that vertex already has established connections;
+    #       the number of potential connections in that direction
+    #       should not exceed it.
+    if np.any((state.neighbours < 0) & (state.potential > 0)):
+        raise Exception('ERROR: something went wrong.')
+    max_endpoints = np.minimum(state.multiplicity, state.n_missing())
+    max_endpoints = state.neighbour_values(max_endpoints)
+    n_close = np.maximum(state.potential - max_endpoints, 0)
+    return n_close
+
+
+def close_vertex_connections(hashi, vidx):
+    # dynamically close vertex connections for a single vertex,
+    # based on available number of endpoints.
+    # note: same as close_connections, but for a single vertex.
     n_closed = 0
-    # loop over vertices and directions for each vertex
-    for vertex in hashi.vertices:
-        for direction in vertex.directions_with_potential_connection():
-            # find number of potential connections and other vertex in this direction
-            n_potential_direction = vertex.n_potential_connections(direction)
-            other_vertex = vertex.neighbours[direction]
-            if other_vertex is None: raise Exception('ERROR: something went wrong.')
-            # determine maximum number of endpoints
-            # (baseline is just the multiplicity of the other vertex,
-            #  but could be constrained if the other vertex already has established connections)
-            max_endpoints = min(
-                    other_vertex.multiplicity,
-                    other_vertex.n - np.sum(other_vertex.connections==1)
-            )
-            # close the appropriate number of connections
-            # so that the number of potential connections does not exceed
-            # the number of availabe endpoints
-            if max_endpoints < n_potential_direction:
-                n_close = n_potential_direction - max_endpoints
-                vertex.close_n_connections(direction, n_close)
-                n_closed += n_close
+    vertex = hashi.vertices[vidx]
+    # loop over directions
+    for direction in vertex.directions_with_potential_connection():
+        # find number of potential connections and other vertex in this direction
+        n_potential_direction = vertex.n_potential_connections(direction)
+        other_vertex = vertex.neighbours[direction]
+        if other_vertex is None: raise Exception('ERROR: something went wrong.')
+        # determine maximum number of endpoints
+        # (baseline is just the multiplicity of the other vertex,
+        #  but could be constrained if the other vertex already has established connections)
+        max_endpoints = min(other_vertex.multiplicity, other_vertex.n_missing_connections())
+        # close the appropriate number of connections
+        # so that the number of potential connections does not exceed
+        # the number of availabe endpoints
+        if max_endpoints < n_potential_direction:
+            n_close = n_potential_direction - max_endpoints
+            hashi.close_n_connections(vidx, direction, n_close)
+            n_closed += n_close
     return n_closed
 
 
-def solve(hashi, verbose=False):
-    ### main solving method
+def close_connections(hashi, vertices=None, verbose=False):
+    # dynamically close vertex connections,
+    # based on available number of endpoints.
+    # input arguments:
+    # - vertices: iterable of vertex indices to process (default: all vertices)
+    # note: if all vertices are processed, the number of connections to close
+    #       is determined for all vertices at once in find_connections_to_close;
+    #       this is equivalent to processing the vertices one by one,
+    #       since closing connections does not change the number of available endpoints.
+    # note: the array state is kept up to date by the hashi (see Hashi.get_board_state),
+    #       so only the vertices modified since the previous sweep are read again,
+    #       and only the vertices and directions with connections to close are written back.
+    if vertices is not None:
+        return sum([close_vertex_connections(hashi, vidx) for vidx in vertices])
+    state = hashi.get_board_state()
+    n_close = find_connections_to_close(state)
+    for vidx, direction in zip(*np.nonzero(n_close)):
+        hashi.close_n_connections(int(vidx), int(direction), int(n_close[vidx, direction]))
+    return int(np.sum(n_close))
+
+
+def get_neighbourhood(hashi, vertices):
+    ### get the indices of the given vertices and their neighbours
+    # input arguments:
+    # - vertices: iterable of vertex indices
+    # returns:
+    # - a set of vertex indices
+    res = set(vertices)
+    for vidx in vertices:
+        res.update([nidx for nidx in hashi.neighbour_indices[vidx].tolist() if nidx >= 0])
+    return res
 
-    # vertex solver
-    added_edges = ['dummy']
-    n_closed_connections = 1 # dummy
-    while len(added_edges)>0 or n_closed_connections>0:
-        added_edges = []
-        n_closed_connections = 0
-        n_closed_connections += close_connections(hashi)
-        for vertex in hashi.vertices:
-            added_edges += vertexsolver.fill_vertex(hashi, vertex, repeat=True, verbose=verbose)
-        n_closed_connections += close_connections(hashi)
-        n_closed_connections += disjointsolver.close_connections_disjoint(hashi, verbose=verbose)
-        added_edges += disjointsolver.make_joining_connection(hashi, verbose=verbose)
+
+def get_cluster_neighbourhood(hashi, vertices):
+    ### get the ids of the clusters containing the given vertices
+    # and of the clusters they could be connected to
+    # input arguments:
+    # - vertices: iterable of vertex indices
+    # returns:
+    # - a set of cluster ids
+    cluster_ids = set([hashi.disjointset.find(vidx) for vidx in vertices])
+    res = set(cluster_ids)
+    for cluster_id in cluster_ids:
+        # note: complete vertices cannot be connected to anything anymore
+        for vertex in hashi.clusters[cluster_id].incomplete:
+            if vertex.complete: continue
+            for neighbour in vertex.neighbours:
+                if neighbour is None: continue
+                res.add(hashi.get_cluster_id(neighbour))
+    return res
+
+
+# solving engines that can be selected in solve
+# - 'rules': the deterministic solving methods in this file (may leave the hashi unsolved)
+# - 'search': backtracking search on top of the deterministic solving methods (see searchsolver)
+# - 'constraint': exact constraint formulation (see constraintsolver)
+engines = ['rules', 'search', 'constraint']
+
+
+def solve_with_engine(hashi, engine, verbose=False):
+    ### helper function to solve.
+    # solve a hashi with one of the engines other than 'rules'
+    # note: the modules are imported only when needed
+    #       (searchsolver imports this module in turn).
+    if engine=='search':
+        import searchsolver
+        return searchsolver.solve(hashi, verbose=verbose)
+    if engine=='constraint':
+        import constraintsolver
+        return constraintsolver.solve(hashi, verbose=verbose)
+    msg = 'ERROR: solving engine {} not recognized;'.format(engine)
+    msg += ' options are {}.'.format(engines)
+    raise Exception(msg)
+
+
+def solve(hashi, engine='rules', modified=None, changed=None, verbose=False, stats=False, callback=None):
+    ### main solving method
+    # input arguments:
+    # - engine: name of the solving engine to use (see engines for the available options)
+    # - modified: set of indices of vertices that were modified
+    #   since the last time the hashi was solved (default: process all vertices)
+    #   (only used for engine 'rules')
+    # - changed: set to which the indices of all vertices modified while solving are added
+    #   (default: not kept track of; only used for engine 'rules')
+    # - stats: whether to collect statistics of the solving rules (see SolverStats)
+    # - callback: function to call after each application of a solving rule
+    #   (see SolverStats; implies stats=True)
+    # returns:
+    # - a SolverStats object if stats is True or a callback is given,
+    #   else None for engine 'rules' and the return value of the engine for other engines.
+    # note: the hashi is modified in place;
+    #       use hashi.complete to check whether it was solved.
+    # note: for engines other than 'rules', the statistics only contain
+    #       a single entry for the engine as a whole.
+    stats = SolverStats(callback=callback) if (stats or callback is not None) else None
+    starttime = time.perf_counter()
+    if engine!='rules':
+        if stats is None: return solve_with_engine(hashi, engine, verbose=verbose)
+        stats.rounds = 1
+        stats.apply(engine, hashi, solve_with_engine, hashi, engine, verbose=verbose)
+        stats.time = time.perf_counter() - starttime
+        return stats
+    # define helper function to apply a solving rule
+    # (recording its statistics if requested)
+    if stats is None:
+        def apply(name, function, *args, **kwargs): return function(*args, **kwargs)
+    else:
+        def apply(name, function, *args, **kwargs): return stats.apply(name, hashi, function, *args, **kwargs)
+    # note: the solving methods are applied in rounds, until no more changes are made.
+    #       the first round processes all vertices; in later rounds,
+    #       only the vertices that were modified in the previous round are processed
+    #       (or those that depend on them, i.e. their neighbours for the vertex based methods,
+    #       and the vertices in their cluster or in neighbouring clusters
+    #       for the cluster based methods).
+    # note: if many vertices need to be processed, it is faster to process all of them
+    #       (using the array based versions of the vertex methods);
+    #       the fraction above which this is done is given by full_sweep_fraction.
+    full_sweep_fraction = 0.25
+    # define helper function to get the argument to pass to the solving methods
+    def select(vertices):
+        if vertices is None: return None
+        if len(vertices) > full_sweep_fraction * hashi.nvertices: return None
+        return sorted(vertices)
+    # do the rounds
+    while modified is None or len(modified)>0:
+        hashi.touched = set()
+        if stats is not None: stats.rounds += 1
+        # vertex solver
+        if modified is None: vertices = None
+        else: vertices = get_neighbourhood(hashi, modified)
+        apply('close_connections', close_connections, hashi, vertices=select(vertices))
+        if modified is None: vertices = None
+        else: vertices = modified | hashi.touched
+        apply('fill_vertices', vertexsolver.fill_vertices, hashi, vertices=select(vertices), verbose=verbose)
+        if modified is None: vertices = None
+        else: vertices = get_neighbourhood(hashi, modified | hashi.touched)
+        apply('close_connections', close_connections, hashi, vertices=select(vertices))
+        # disjoint solver
+        if modified is None: cluster_ids = None
+        else: cluster_ids = get_cluster_neighbourhood(hashi, modified | hashi.touched)
+        # note: only clusters with at most two incomplete vertices
+        #       can be made complete by a single connection,
+        #       so the other ones do not need to be processed.
+        vertices = None
+        if cluster_ids is not None:
+            vertices = [hashi.vertex_indices[v] for cid in cluster_ids
+                          if len(hashi.clusters[cid].incomplete) <= 2
+                          for v in hashi.clusters[cid].incomplete]
+        apply('close_connections_disjoint', disjointsolver.close_connections_disjoint,
+          hashi, vertices=select(vertices), verbose=verbose)
+        if modified is not None:
+            cluster_ids = get_cluster_neighbourhood(hashi, modified | hashi.touched)
+        apply('make_joining_connection', disjointsolver.make_joining_connection,
+          hashi, cluster_ids=cluster_ids, verbose=verbose)
+        modified = hashi.touched
+        if changed is not None: changed.update(modified)
+    if stats is not None: stats.time = time.perf_counter() - starttime
+    return stats
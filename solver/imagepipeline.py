@@ -0,0 +1,150 @@
+# Pipelined reading and solving of many puzzle images.
+
+# The images pass through the following stages:
+# - decoding: the image files are read and binarized (see reader.decodeimage)
+#   in a number of threads (the decoding in opencv releases the GIL)
+# - recognition and solving: the grid and digits are recognized (see HashiImageReader.hashidict)
+#   and the resulting hashi is solved, in a pool of worker processes.
+# The stages are connected by bounded queues, so that the decoded images
+# that are waiting for a worker process do not pile up in memory.
+# The results are returned as soon as each image is finished (see solve_images),
+# with the same keys as for batchsolver.solve_file,
+# and additionally the time spent in each stage (key timings).
+
+# Note: the reader folder must be in the python path (also for the worker processes).
+
+# external imports
+import os
+import time
+import queue
+import threading
+import multiprocessing
+
+# local imports
+from hashi import Hashi
+import batchsolver
+
+
+def recognize_and_solve(imagefile, image, timings, engine='rules', timeout=None, pretty=False, solution=False):
+    ### recognize and solve a decoded image
+    # input arguments:
+    # - imagefile: name of the image file (only used in the result)
+    # - image: decoded image (see reader.decodeimage)
+    # - timings: dict with the timings of the previous stages,
+    #   including the time at which the image was decoded (key decoded)
+    # - engine, timeout, pretty, solution: see batchsolver.solve_file
+    # returns:
+    # - a dict with the result (see batchsolver.solve_file) and key timings,
+    #   holding the time in seconds for each stage (decode, wait, recognize, solve)
+    timings = dict(timings)
+    timings['wait'] = time.time() - timings.pop('decoded')
+    from reader import HashiImageReader
+    def read():
+        starttime = time.time()
+        HIR = HashiImageReader()
+        HIR.setimage(image)
+        hashi = Hashi.from_dict(HIR.hashidict(verbose=False))
+        timings['recognize'] = time.time() - starttime
+        return hashi
+    result = batchsolver.solve_puzzle(read, {'file': imagefile},
+               engine=engine, timeout=timeout, pretty=pretty, solution=solution)
+    if 'recognize' in timings: timings['solve'] = result['time'] - timings['recognize']
+    result['timings'] = timings
+    return result
+
+
+def decode(imagefile):
+    ### helper function to solve_images (decoding stage for a single image)
+    # returns:
+    # - a tuple of the form (image, timings), where image is None if decoding failed
+    #   (and timings then contains the error message)
+    from reader import decodeimage
+    starttime = time.time()
+    try: image = decodeimage(imagefile)
+    except Exception as e: return (None, {'error': str(e)})
+    endtime = time.time()
+    return (image, {'decode': endtime - starttime, 'decoded': endtime})
+
+
+def error_result(imagefile, error):
+    ### helper function to solve_images (result for an image that failed outside of solving)
+    return {'file': imagefile, 'status': 'error', 'complete': False,
+            'nvertices': None, 'nedges': None, 'time': None, 'error': error}
+
+
+def solve_images(imagefiles, engine='rules', workers=None, threads=4, timeout=None,
+                 pretty=False, max_queued=None):
+    ### read and solve a batch of images in a pipeline
+    # input arguments:
+    # - imagefiles: list of image files
+    # - workers: number of worker processes for recognition and solving (default: number of cpus);
+    #   if 1, the images are recognized and solved in the current process.
+    # - threads: number of threads for decoding the images
+    # - max_queued: maximum number of decoded images that are waiting for a worker process,
+    #   and maximum number of images in the worker processes (default: 2 times the number of workers)
+    # - engine, timeout, pretty: see batchsolver.solve_file
+    # returns:
+    # - a generator yielding the result (see recognize_and_solve) for each image,
+    #   in the order in which they are finished (not necessarily the input order).
+    if workers is None: workers = os.cpu_count()
+    if max_queued is None: max_queued = 2*workers
+    imagefiles = list(imagefiles)
+    # shortcut: do not start any process or thread if there are no images
+    if len(imagefiles)==0: return
+    kwargs = {'engine': engine, 'timeout': timeout, 'pretty': pretty}
+    # queue of images to decode (filled upfront, as it only holds file names)
+    todecode = queue.Queue()
+    for imagefile in imagefiles: todecode.put(imagefile)
+    # bounded queue of decoded images
+    decoded = queue.Queue(maxsize=max_queued)
+    # queue of results
+    results = queue.Queue()
+    def decode_worker():
+        while True:
+            try: imagefile = todecode.get_nowait()
+            except queue.Empty: return
+            (image, timings) = decode(imagefile)
+            if image is None: results.put(error_result(imagefile, timings['error']))
+            else: decoded.put((imagefile, image, timings))
+    def start_decoders():
+        for _ in range(threads): threading.Thread(target=decode_worker, daemon=True).start()
+    # serial recognition and solving
+    if workers==1:
+        start_decoders()
+        for _ in range(len(imagefiles)):
+            while results.empty():
+                try: (imagefile, image, timings) = decoded.get(timeout=0.1)
+                except queue.Empty: continue
+                results.put(recognize_and_solve(imagefile, image, timings, **kwargs))
+            yield results.get()
+        return
+    # parallel recognition and solving
+    # note: the dispatcher thread moves the decoded images to the worker processes,
+    #       with at most max_queued images in the worker processes at the same time.
+    slots = threading.BoundedSemaphore(max_queued)
+    stop = threading.Event()
+    # note: the worker processes are started before the decoding threads,
+    #       as forking a process while other threads are running can deadlock.
+    with multiprocessing.Pool(processes=workers) as pool:
+        start_decoders()
+        def dispatch():
+            while not stop.is_set():
+                try: (imagefile, image, timings) = decoded.get(timeout=0.1)
+                except queue.Empty: continue
+                while not slots.acquire(timeout=0.1):
+                    if stop.is_set(): return
+                def callback(result):
+                    slots.release()
+                    results.put(result)
+                def error_callback(e, imagefile=imagefile):
+                    slots.release()
+                    results.put(error_result(imagefile, str(e)))
+                pool.apply_async(recognize_and_solve, (imagefile, image, timings), kwargs,
+                  callback=callback, error_callback=error_callback)
+        dispatcher = threading.Thread(target=dispatch, daemon=True)
+        dispatcher.start()
+        try:
+            for _ in range(len(imagefiles)): yield results.get()
+        finally:
+            stop.set()
+            dispatcher.join()
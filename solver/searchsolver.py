@@ -0,0 +1,197 @@
+# Solving methods based on search (trial and error).
+
+# These methods are intended for puzzles that cannot be solved completely
+# with the deterministic solving methods (see hashisolver.solve).
+# They pick a vertex and a direction in which a connection is still possible,
+# and try both to make a connection and to close all remaining connections
+# in that direction, each time followed by the deterministic solving methods.
+# If this leads to a contradiction, the attempt is undone and the other option is tried.
+
+# Note: the attempts are undone using the checkpoint and rollback methods of the hashi,
+#       which only undo the recorded modifications instead of copying the full hashi.
+
+# local imports
+import hashisolver
+
+
+def is_solved(hashi):
+    ### check if a hashi is solved
+    # note: on top of all vertices being complete,
+    #       all vertices must be connected to each other.
+    return (hashi.complete and hashi.disjointset.nsets==1)
+
+
+def is_consistent(hashi, vertices=None):
+    ### check if the current state of a hashi could still lead to a solution
+    # input arguments:
+    # - vertices: iterable of indices of vertices that were modified
+    #   since the last time the hashi was found to be consistent
+    #   (default: check all vertices and clusters)
+    # note: this is a necessary condition, not a sufficient one.
+    # note: the conditions for a vertex only depend on the vertex and its neighbours,
+    #       and the conditions for a cluster only on its vertices and their neighbours,
+    #       so if vertices are given, only those, their neighbours,
+    #       and the clusters containing any of them need to be checked.
+    if vertices is None:
+        to_check = hashi.vertices
+        clusters = hashi.clusters.values()
+    else:
+        neighbourhood = hashisolver.get_neighbourhood(hashi, vertices)
+        to_check = [hashi.vertices[vidx] for vidx in neighbourhood]
+        clusters = [hashi.clusters[cid] for cid in
+                      set([hashi.disjointset.find(vidx) for vidx in neighbourhood])]
+    for vertex in to_check:
+        n_missing = vertex.n_missing_connections()
+        if n_missing < 0: return False
+        if n_missing == 0: continue
+        # check if the missing connections can still be made
+        n_available = 0
+        for direction in vertex.directions_with_potential_connection():
+            other_vertex = vertex.neighbours[direction]
+            n_available += min(vertex.n_potential_connections(direction),
+                               other_vertex.n_potential_connections((direction+2)%4),
+                               other_vertex.n_missing_connections())
+        if n_available < n_missing: return False
+    # check if all clusters can still be connected to the rest
+    if hashi.disjointset.nsets > 1:
+        for cluster in clusters:
+            if len(cluster.get_external_connections())==0: return False
+    return True
+
+
+def choose_most_constrained(hashi):
+    ### choose the vertex and direction to try next
+    # the vertex is chosen as the incomplete vertex with the fewest directions
+    # in which a connection can still be made (ties are broken by taking the vertex
+    # with the most missing connections); the direction is the first one
+    # in which a connection can still be made.
+    best = None
+    best_key = None
+    for vidx, vertex in enumerate(hashi.vertices):
+        if vertex.complete: continue
+        directions = [d for d in vertex.directions_with_potential_connection()
+                        if vertex.can_connect_with(vertex.neighbours[d])]
+        if len(directions)==0: continue
+        key = (len(directions), -vertex.n_missing_connections())
+        if best_key is None or key < best_key:
+            best = (vidx, directions[0])
+            best_key = key
+            if key[0]==1: break
+    return best
+
+
+def choose_first(hashi):
+    ### choose the vertex and direction to try next
+    # the vertex is chosen as the first incomplete vertex,
+    # and the direction as the first one in which a connection can still be made.
+    for vidx, vertex in enumerate(hashi.vertices):
+        if vertex.complete: continue
+        for direction in vertex.directions_with_potential_connection():
+            if vertex.can_connect_with(vertex.neighbours[direction]): return (vidx, direction)
+    return None
+
+
+# dict matching heuristic names to functions choosing the vertex and direction to try next
+heuristics = {
+  'most_constrained': choose_most_constrained,
+  'first': choose_first,
+}
+
+
+def try_option(hashi, vidx, direction, option, verbose=False):
+    ### helper function to solve.
+    # apply an option for a given vertex and direction,
+    # followed by the deterministic solving methods.
+    # input arguments:
+    # - option: 0 for making a connection in the given direction,
+    #   1 for closing all remaining connections in the given direction
+    #   (on both sides).
+    # returns:
+    # - False if a contradiction was found, True otherwise
+    #   (note: the hashi is not restored in case of a contradiction).
+    vertex = hashi.vertices[vidx]
+    other_vertex = vertex.neighbours[direction]
+    hashi.touched = set()
+    # note: the state before applying the option is assumed to be consistent,
+    #       so only the modified vertices need to be checked afterwards (see is_consistent).
+    changed = set()
+    try:
+        if option==0:
+            hashi.add_edge(vertex, other_vertex)
+        else:
+            hashi.close_n_connections(vidx, direction,
+              vertex.n_potential_connections(direction), suppress_warnings=True)
+            hashi.close_n_connections(other_vertex, (direction+2)%4,
+              other_vertex.n_potential_connections((direction+2)%4), suppress_warnings=True)
+        changed.update(hashi.touched)
+        hashisolver.solve(hashi, modified=hashi.touched, changed=changed, verbose=verbose)
+    except TimeoutError:
+        # note: a timeout (e.g. raised by a signal handler, see batchsolver)
+        #       is not a contradiction and should stop the search.
+        raise
+    except Exception as e:
+        # note: the deterministic solving methods raise an exception
+        #       when they run into an impossible state.
+        if verbose: print('INFO in search solver: contradiction ({})'.format(e))
+        return False
+    return is_consistent(hashi, vertices=changed)
+
+
+def solve(hashi, heuristic='most_constrained', max_nodes=None, verbose=False):
+    ### main solving method with search
+    # input arguments:
+    # - heuristic: name of the heuristic to choose the vertex and direction to try next
+    #   (see heuristics for the available options)
+    # - max_nodes: maximum number of options to try (default: no maximum)
+    # returns:
+    # - True if a solution was found (the hashi is then in its solved state),
+    #   False otherwise (the hashi is then in the state after the deterministic solving methods).
+    # note: a TimeoutError raised while solving is passed on to the caller
+    #       (the hashi is then left in an intermediate state).
+    choose = heuristics[heuristic]
+    # first run the deterministic solving methods
+    try: hashisolver.solve(hashi, verbose=verbose)
+    except TimeoutError: raise
+    except Exception: return False
+    if is_solved(hashi): return True
+    if not is_consistent(hashi): return False
+    # search
+    # note: each element in the stack is a tuple of the form
+    #       (marker, vertex index, direction, option),
+    #       where marker is the checkpoint to roll back to before trying the next option.
+    root_marker = hashi.checkpoint()
+    stack = []
+    n_nodes = 0
+    consistent = True
+    solved = False
+    while True:
+        if max_nodes is not None and n_nodes >= max_nodes: break
+        if consistent:
+            if is_solved(hashi):
+                solved = True
+                break
+            choice = choose(hashi)
+            if choice is not None:
+                (vidx, direction) = choice
+                if verbose:
+                    msg = 'INFO in search solver: trying connection from {}'.format(hashi.vertices[vidx])
+                    msg += ' in direction {} (depth {})'.format(direction, len(stack))
+                    print(msg)
+                stack.append((hashi.checkpoint(), vidx, direction, 0))
+                n_nodes += 1
+                consistent = try_option(hashi, vidx, direction, 0, verbose=verbose)
+                continue
+        # backtrack to the most recent option that was not tried yet
+        option_found = False
+        while len(stack)>0 and not option_found:
+            (marker, vidx, direction, option) = stack.pop()
+            hashi.rollback(marker)
+            if option==0:
+                stack.append((marker, vidx, direction, 1))
+                n_nodes += 1
+                consistent = try_option(hashi, vidx, direction, 1, verbose=verbose)
+                option_found = True
+        if not option_found: break
+    if not solved: hashi.rollback(root_marker)
+    hashi.clear_trail()
+    return solved
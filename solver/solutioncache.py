@@ -0,0 +1,194 @@
+# Cache of solutions of previously solved puzzles.
+
+# Puzzles are identified by a fingerprint of their island layout,
+# i.e. a hash of their string representation (see Hashi.to_grid and Hashi.grid_to_str),
+# which is independent of translations of the islands.
+# Optionally, the fingerprint is also made independent of the 8 symmetries of the grid
+# (rotations and reflections), by taking the smallest string representation
+# over all symmetries (see canonical_form).
+# Solutions are stored as lists of edges in the coordinates of the canonical form,
+# and are transformed back to the coordinates of the puzzle at hand when they are used.
+
+# The cache has two tiers:
+# - an in-memory tier holding the most recently used solutions (least recently used eviction)
+# - an optional on-disk tier in an SQLite database, with a maximum number of entries
+#   (least recently used entries are removed when the maximum is exceeded)
+# Solutions found on disk are also added to the in-memory tier.
+
+# external imports
+import time
+import json
+import sqlite3
+import hashlib
+from collections import OrderedDict
+import numpy as np
+
+# local imports
+from hashi import Hashi
+import hashisolver
+
+
+def canonical_form(hashi, symmetries=False):
+    ### get the canonical form of the island layout of a hashi
+    # input arguments:
+    # - symmetries: whether to take into account rotations and reflections of the grid
+    #   (else only translations)
+    # returns:
+    # - a tuple of the form (txt, cells, shape), where:
+    #   - txt is the canonical string representation
+    #     (including the multiplicity line if the multiplicity is not the default, see Hashi.to_str)
+    #   - cells is an array with for each position in the canonical grid (flattened)
+    #     the flattened index of the corresponding position in the original grid
+    #   - shape is the shape (number of rows, number of columns) of the original grid
+    # note: the original grid is the one of Hashi.to_grid, i.e. rows from top to bottom
+    #       and columns from left to right.
+    grid = hashi.to_grid()
+    header = Hashi.multiplicity_header(hashi.multiplicity)
+    txt = header + Hashi.grid_to_str(grid)
+    cells = np.arange(grid.size).reshape(grid.shape)
+    if not symmetries: return (txt, cells.ravel(), grid.shape)
+    best = None
+    for flip in [False, True]:
+        for k in range(4):
+            tgrid = np.rot90(np.fliplr(grid) if flip else grid, k)
+            ttxt = header + Hashi.grid_to_str(tgrid)
+            if best is not None and ttxt >= best[0]: continue
+            tcells = np.rot90(np.fliplr(cells) if flip else cells, k)
+            best = (ttxt, tcells.ravel(), grid.shape)
+    return best
+
+
+def fingerprint(txt):
+    ### get the fingerprint of a canonical string representation
+    return hashlib.sha256(txt.encode('utf-8')).hexdigest()
+
+
+def get_offsets(hashi):
+    ### helper function to get the coordinates of the top left position in the original grid
+    offsetx = min([v.x for v in hashi.vertices])
+    maxy = max([v.y for v in hashi.vertices])
+    return (offsetx, maxy)
+
+
+def encode_solution(hashi, cells, shape):
+    ### encode the edges of a solved hashi in the coordinates of the canonical grid
+    # input arguments:
+    # - cells, shape: see canonical_form
+    # returns:
+    # - a list of the form [[idx1, idx2, number of edges], ...],
+    #   where idx1 and idx2 are flattened positions in the canonical grid
+    (offsetx, maxy) = get_offsets(hashi)
+    inverse = np.zeros(len(cells), dtype=np.int64)
+    inverse[cells] = np.arange(len(cells))
+    solution = []
+    for (x1, y1, x2, y2), edges in hashi.get_edges().items():
+        idx1 = int(inverse[(maxy-y1)*shape[1] + (x1-offsetx)])
+        idx2 = int(inverse[(maxy-y2)*shape[1] + (x2-offsetx)])
+        solution.append([idx1, idx2, len(edges)])
+    return solution
+
+
+def apply_solution(hashi, solution, cells, shape):
+    ### add the edges of an encoded solution (see encode_solution) to a hashi
+    (offsetx, maxy) = get_offsets(hashi)
+    for idx1, idx2, n in solution:
+        (row1, col1) = divmod(int(cells[idx1]), shape[1])
+        (row2, col2) = divmod(int(cells[idx2]), shape[1])
+        v1idx = hashi.coordinate_indices[(col1+offsetx, maxy-row1)]
+        v2idx = hashi.coordinate_indices[(col2+offsetx, maxy-row2)]
+        for _ in range(n): hashi.add_edge(v1idx, v2idx)
+
+
+class SolutionCache(object):
+    # implementation of a two-tier cache of solutions, keyed by fingerprint
+
+    def __init__(self, maxsize=1024, dbfile=None, max_disk_entries=100000, symmetries=False):
+        ### initializer
+        # input arguments:
+        # - maxsize: maximum number of solutions in the in-memory tier
+        # - dbfile: path to the SQLite database file for the on-disk tier
+        #   (default: no on-disk tier); the file is created if it does not exist yet.
+        # - max_disk_entries: maximum number of solutions in the on-disk tier
+        # - symmetries: whether to identify puzzles that are rotations or reflections of each other
+        self.maxsize = maxsize
+        self.max_disk_entries = max_disk_entries
+        self.symmetries = symmetries
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.db = None
+        if dbfile is not None:
+            self.db = sqlite3.connect(dbfile)
+            self.db.execute('CREATE TABLE IF NOT EXISTS solutions'
+                            ' (key TEXT PRIMARY KEY, solution TEXT NOT NULL, last_used REAL NOT NULL)')
+            self.db.execute('CREATE INDEX IF NOT EXISTS solutions_last_used ON solutions (last_used)')
+            self.db.commit()
+
+    def __str__(self):
+        infostr = 'SolutionCache ({} in memory, {} on disk, {} hits, {} misses)'.format(
+                    len(self.memory), self.n_disk_entries(), self.hits, self.misses)
+        return infostr
+
+    def close(self):
+        ### close the on-disk tier
+        if self.db is not None: self.db.close()
+        self.db = None
+
+    def n_disk_entries(self):
+        ### get the number of solutions in the on-disk tier
+        if self.db is None: return 0
+        return self.db.execute('SELECT COUNT(*) FROM solutions').fetchone()[0]
+
+    def get(self, key):
+        ### get the encoded solution for a given fingerprint (None if not in the cache)
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return self.memory[key]
+        if self.db is not None:
+            row = self.db.execute('SELECT solution FROM solutions WHERE key=?', (key,)).fetchone()
+            if row is not None:
+                self.db.execute('UPDATE solutions SET last_used=? WHERE key=?', (time.time(), key))
+                self.db.commit()
+                solution = json.loads(row[0])
+                self._put_memory(key, solution)
+                self.hits += 1
+                return solution
+        self.misses += 1
+        return None
+
+    def put(self, key, solution):
+        ### add an encoded solution for a given fingerprint
+        self._put_memory(key, solution)
+        if self.db is None: return
+        self.db.execute('INSERT OR REPLACE INTO solutions VALUES (?, ?, ?)',
+                        (key, json.dumps(solution), time.time()))
+        n_remove = self.n_disk_entries() - self.max_disk_entries
+        if n_remove > 0:
+            self.db.execute('DELETE FROM solutions WHERE key IN'
+                            ' (SELECT key FROM solutions ORDER BY last_used ASC LIMIT ?)', (n_remove,))
+        self.db.commit()
+
+    def _put_memory(self, key, solution):
+        ### helper function to get and put (add a solution to the in-memory tier)
+        self.memory[key] = solution
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.maxsize: self.memory.popitem(last=False)
+
+    def solve(self, hashi, **kwargs):
+        ### solve a hashi, using the cache if possible
+        # input arguments:
+        # - kwargs: passed down to hashisolver.solve in case the solution is not in the cache
+        # returns:
+        # - True if the solution was taken from the cache, False otherwise
+        # note: only solutions of fully solved hashis are added to the cache.
+        (txt, cells, shape) = canonical_form(hashi, symmetries=self.symmetries)
+        key = fingerprint(txt)
+        solution = self.get(key)
+        if solution is not None:
+            apply_solution(hashi, solution, cells, shape)
+            return True
+        hashisolver.solve(hashi, **kwargs)
+        if hashi.complete and hashi.disjointset.nsets==1:
+            self.put(key, encode_solution(hashi, cells, shape))
+        return False
@@ -0,0 +1,228 @@
+# Long-running solver service over HTTP.
+
+# The service keeps a pool of worker processes in which all solving modules are imported
+# (and exercised once on a small puzzle) at startup,
+# so that requests only pay for the actual solving.
+# Requests are handled concurrently; each puzzle in a request is solved in a worker process.
+
+# Endpoints:
+# - GET /health: returns {"status": "ok", "workers": <number of workers>}
+# - POST /solve: solves one or more puzzles. the body is either:
+#   - plain text: the string representation of a puzzle (see Hashi.from_str)
+#   - json: a dict with the following keys (all optional except one of the puzzle keys):
+#     - puzzle: string representation of a puzzle
+#     - puzzles: list of string representations of puzzles (batch request)
+#     - image / images: base64 encoded image(s) of a puzzle (png or jpg, requires opencv)
+#     - engine: solving engine (see hashisolver.engines)
+#     - timeout: timeout in seconds per puzzle (must be positive;
+#       values above the maximum timeout of the service are reduced to it)
+#     - pretty: whether to include the fancy string representation of the solved puzzles
+#   the response is a dict with key results, holding a list with one result per puzzle
+#   (see batchsolver.solve_file, with the solution included).
+#   invalid requests (see SolverService.parse_request) get a response with code 400
+#   and a dict with key error.
+
+# external imports
+import os
+import sys
+import json
+import time
+import base64
+import tempfile
+import multiprocessing
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# local imports
+import hashisolver
+import batchsolver
+
+
+# puzzle used to warm up the worker processes
+warmup_puzzle = '2-2\n---\n2-2'
+
+
+def init_worker(paths):
+    ### initializer of the worker processes
+    # input arguments:
+    # - paths: list of paths to add to the python path (e.g. the reader folder)
+    # note: imports the optional modules that are used by the solving engines
+    #       and solves a small puzzle with each engine,
+    #       so that this does not need to happen for the first request.
+    for path in paths:
+        if path not in sys.path: sys.path.append(path)
+    for engine in hashisolver.engines: batchsolver.solve_text(warmup_puzzle, engine=engine)
+    try:
+        import reader
+    except ImportError: pass
+
+
+def solve_image(data, suffix, **kwargs):
+    ### solve a puzzle from the content of an image file
+    # input arguments:
+    # - data: content of the image file (bytes)
+    # - suffix: file extension (e.g. '.png')
+    # - kwargs: passed down to batchsolver.solve_file
+    # note: the image reader works on files, so the image is written to a temporary file.
+    (fd, imagefile) = tempfile.mkstemp(suffix=suffix)
+    try:
+        with os.fdopen(fd, 'wb') as f: f.write(data)
+        result = batchsolver.solve_file(imagefile, **kwargs)
+        result['file'] = None
+    finally:
+        os.remove(imagefile)
+    return result
+
+
+class SolverService(object):
+    # implementation of the solver service
+
+    def __init__(self, workers=None, max_timeout=60., paths=None):
+        ### initializer
+        # input arguments:
+        # - workers: number of worker processes (default: number of cpus)
+        # - max_timeout: maximum (and default) timeout in seconds per puzzle
+        # - paths: list of paths to add to the python path of the workers
+        self.workers = workers if workers is not None else os.cpu_count()
+        self.max_timeout = max_timeout
+        self.pool = multiprocessing.Pool(processes=self.workers,
+                      initializer=init_worker, initargs=(paths if paths is not None else [],))
+
+    def close(self):
+        ### stop the worker processes
+        self.pool.terminate()
+        self.pool.join()
+
+    def parse_request(self, request):
+        ### check a solve request and extract its arguments
+        # input arguments:
+        # - request: dict (see the description of the /solve endpoint above)
+        # returns:
+        # - a tuple of the form (puzzles, images, kwargs), with puzzles a list of strings,
+        #   images a list of tuples (content, file extension) and kwargs a dict
+        #   with the keyword arguments for batchsolver.solve_text and solve_image.
+        # note: a ValueError is raised for any invalid request.
+        if not isinstance(request, dict): raise ValueError('request must be a json object.')
+        engine = request.get('engine', 'rules')
+        if not isinstance(engine, str) or engine not in hashisolver.engines:
+            raise ValueError('engine {} not recognized; options are {}.'.format(engine, hashisolver.engines))
+        timeout = request.get('timeout', self.max_timeout)
+        # note: bool is a subclass of int, but is not a valid timeout;
+        #       a timeout of zero would disable the timer (see batchsolver.solve_puzzle).
+        if isinstance(timeout, bool) or not isinstance(timeout, (int, float)) or not timeout > 0:
+            raise ValueError('timeout must be a positive number of seconds, found {}.'.format(timeout))
+        timeout = min(float(timeout), self.max_timeout)
+        pretty = request.get('pretty', False)
+        if not isinstance(pretty, bool): raise ValueError('pretty must be true or false.')
+        kwargs = {'engine': engine, 'timeout': timeout, 'pretty': pretty, 'solution': True}
+        # get the puzzles and images
+        def get_strings(key, listkey):
+            res = []
+            if key in request: res.append(request[key])
+            if listkey in request:
+                if not isinstance(request[listkey], list):
+                    raise ValueError('{} must be a list of strings.'.format(listkey))
+                res += request[listkey]
+            if not all([isinstance(el, str) for el in res]):
+                raise ValueError('{} and {} must be strings.'.format(key, listkey))
+            return res
+        puzzles = get_strings('puzzle', 'puzzles')
+        images = []
+        for image in get_strings('image', 'images'):
+            # note: binascii.Error is a subclass of ValueError
+            data = base64.b64decode(image, validate=True)
+            suffix = '.png' if data.startswith(b'\x89PNG') else '.jpg'
+            images.append((data, suffix))
+        if len(puzzles)+len(images)==0: raise ValueError('request does not contain any puzzle.')
+        return (puzzles, images, kwargs)
+
+    def handle(self, request):
+        ### handle a solve request
+        # input arguments:
+        # - request: dict (see the description of the /solve endpoint above)
+        # returns:
+        # - a dict with key results
+        # note: a ValueError is raised for invalid requests (see parse_request).
+        (puzzles, images, kwargs) = self.parse_request(request)
+        timeout = kwargs['timeout']
+        # submit all puzzles before waiting for any of them
+        # note: each pending puzzle is stored together with the keys identifying it in the results.
+        starttime = time.time()
+        pending = []
+        for idx, txt in enumerate(puzzles):
+            pending.append(({'name': str(idx)}, self.pool.apply_async(batchsolver.solve_text, (txt,),
+                             dict(kwargs, name=str(idx)))))
+        for (data, suffix) in images:
+            pending.append(({'file': None}, self.pool.apply_async(solve_image, (data, suffix), kwargs)))
+        # collect the results
+        # note: the timeout is also applied in the workers themselves;
+        #       the extra margin here only guards against workers that do not respond.
+        #       a puzzle without a result in time gets a result with the same keys as the others
+        #       (see batchsolver.init_result).
+        results = []
+        for (base, result) in pending:
+            try: results.append(result.get(timeout=timeout+5.))
+            except multiprocessing.TimeoutError:
+                result = batchsolver.init_result(base)
+                result.update({'status': 'timeout', 'time': time.time()-starttime})
+                results.append(result)
+        return {'results': results}
+
+
+def make_handler(service):
+    ### make a request handler class for a given SolverService
+
+    class SolverRequestHandler(BaseHTTPRequestHandler):
+
+        def send_json(self, code, content):
+            body = json.dumps(content).encode('utf-8')
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path=='/health':
+                self.send_json(200, {'status': 'ok', 'workers': service.workers})
+            else: self.send_json(404, {'error': 'unknown path {}'.format(self.path)})
+
+        def do_POST(self):
+            if self.path!='/solve':
+                self.send_json(404, {'error': 'unknown path {}'.format(self.path)})
+                return
+            # note: json and unicode decoding errors are subclasses of ValueError,
+            #       so all invalid requests get a response with code 400;
+            #       any other error is reported with code 500 instead of dropping the connection.
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                if length < 0: raise ValueError('invalid content length {}.'.format(length))
+                body = self.rfile.read(length).decode('utf-8')
+                if self.headers.get('Content-Type', '').startswith('application/json'):
+                    request = json.loads(body)
+                else: request = {'puzzle': body}
+                response = service.handle(request)
+            except ValueError as e:
+                self.send_json(400, {'error': str(e)})
+                return
+            except Exception as e:
+                self.send_json(500, {'error': str(e)})
+                return
+            self.send_json(200, response)
+
+        def log_message(self, format, *args):
+            # note: requests are not logged, to keep the output clean
+            pass
+
+    return SolverRequestHandler
+
+
+def serve(host='127.0.0.1', port=8000, workers=None, max_timeout=60., paths=None):
+    ### run the solver service until interrupted
+    service = SolverService(workers=workers, max_timeout=max_timeout, paths=paths)
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    print('Serving on http://{}:{} with {} workers'.format(host, port, service.workers))
+    try: server.serve_forever()
+    except KeyboardInterrupt: pass
+    finally:
+        server.server_close()
+        service.close()
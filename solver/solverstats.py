@@ -0,0 +1,88 @@
+# Instrumentation of the solving methods.
+
+# A SolverStats object collects, for each solving rule applied by hashisolver.solve,
+# the number of times it was called, the wall time spent in it,
+# the number of edges it added and the number of connections it closed,
+# as well as the number of rounds needed to reach the point where no more changes are made.
+# It is only filled if requested (see the stats and callback arguments of hashisolver.solve),
+# so that the solving methods do not suffer from any overhead otherwise.
+
+# external imports
+import time
+
+
+class RuleStats(object):
+    # implementation of the statistics of a single solving rule
+
+    def __init__(self, name):
+        ### initializer
+        self.name = name
+        self.calls = 0
+        self.time = 0.
+        self.edges_added = 0
+        self.connections_closed = 0
+
+    def __str__(self):
+        infostr = '{:<28} {:>7} {:>10.4f} {:>7} {:>7}'.format(self.name, self.calls, self.time,
+                    self.edges_added, self.connections_closed)
+        return infostr
+
+    def to_dict(self):
+        return {'calls': self.calls, 'time': self.time,
+                'edges_added': self.edges_added, 'connections_closed': self.connections_closed}
+
+
+class SolverStats(object):
+    # implementation of the statistics of a call to hashisolver.solve
+
+    def __init__(self, callback=None):
+        ### initializer
+        # input arguments:
+        # - callback: function that is called after each application of a solving rule,
+        #   with as argument a dict with the keys round, rule, time, edges_added
+        #   and connections_closed (the latter three for this application only).
+        self.rules = {}
+        self.rounds = 0
+        self.time = 0.
+        self.callback = callback
+
+    def __str__(self):
+        lines = ['SolverStats ({} rounds, {:.4f} s)'.format(self.rounds, self.time)]
+        lines.append('{:<28} {:>7} {:>10} {:>7} {:>7}'.format('rule', 'calls', 'time [s]', 'edges', 'closed'))
+        for rule in self.rules.values(): lines.append(str(rule))
+        return '\n'.join(lines)
+
+    def get(self, name):
+        ### get the RuleStats for a given rule (make it if it does not exist yet)
+        if name not in self.rules: self.rules[name] = RuleStats(name)
+        return self.rules[name]
+
+    def apply(self, name, hashi, function, *args, **kwargs):
+        ### apply a solving rule and record its statistics
+        # input arguments:
+        # - name: name of the rule
+        # - hashi: the hashi the rule is applied to
+        # - function: the function implementing the rule
+        # - args, kwargs: arguments passed to function
+        # returns:
+        # - the return value of function
+        n_edges = len(hashi.edges)
+        n_closed = hashi.n_closed_connections()
+        starttime = time.perf_counter()
+        res = function(*args, **kwargs)
+        elapsed = time.perf_counter() - starttime
+        edges_added = len(hashi.edges) - n_edges
+        connections_closed = hashi.n_closed_connections() - n_closed
+        rule = self.get(name)
+        rule.calls += 1
+        rule.time += elapsed
+        rule.edges_added += edges_added
+        rule.connections_closed += connections_closed
+        if self.callback is not None:
+            self.callback({'round': self.rounds, 'rule': name, 'time': elapsed,
+                           'edges_added': edges_added, 'connections_closed': connections_closed})
+        return res
+
+    def to_dict(self):
+        return {'rounds': self.rounds, 'time': self.time,
+                'rules': dict([(name, rule.to_dict()) for name, rule in self.rules.items()])}
@@ -6,7 +6,8 @@
 
 # They are intended to be run in a loop over all vertices in a hashi
 # (or potentially on some specific vertex if there is a special reason to believe
-# a connection could be established for that vertex).
+# a connection could be established for that vertex);
+# see fill_vertices for a version that checks all vertices at once.
 
 # external imports
 import numpy as np
@@ -18,9 +19,8 @@ def find_directions_to_connect(vertex):
     # based only on vertex connection properties.
 
     # compare number of potential connections with target number of connections
-    n_established = np.sum(vertex.connections==1)
-    n_needed = vertex.n - n_established
-    n_potential = np.sum(vertex.connections==0)
+    n_needed = vertex.n_missing_connections()
+    n_potential = vertex.n_potential_connections()
     res = []
 
     # simplest case where all connections can be trivially filled,
@@ -36,8 +36,7 @@ def find_directions_to_connect(vertex):
     # could potentially absorb all missing connections.
     for direction in vertex.directions_with_potential_connection():
         # calculate number of potential connections in other directions than this one
-        n_potential_other_directions = sum([vertex.n_potential_connections(d)
-            for d in [0,1,2,3] if d!=direction])
+        n_potential_other_directions = n_potential - vertex.n_potential_connections(direction)
         # at least the overflow must be filled in this direction
         overflow = n_needed - n_potential_other_directions
         if overflow>0:
@@ -47,6 +46,45 @@ def find_directions_to_connect(vertex):
             res += [direction]*overflow
     return res
 
+def find_connections_to_make(state):
+    ### vectorized version of find_directions_to_connect for all vertices at once.
+    # input arguments:
+    # - state: a BoardState
+    # returns:
+    # - an array of shape (nvertices, 4) with the number of connections that can be made
+    #   for each vertex and direction.
+    # note: for each direction, at least the overflow must be filled,
+    #       i.e. the number of missing connections that cannot be absorbed
+    #       by the potential connections in all other directions;
+    #       this includes the trivial case where the number of potential connections
+    #       equals the number of missing connections.
+    n_potential = state.n_potential()
+    overflow = (state.n_missing() - n_potential)[:, np.newaxis] + state.potential
+    overflow = np.where(state.potential > 0, np.maximum(overflow, 0), 0)
+    if np.any(overflow > state.potential):
+        msg = 'ERROR: something went wrong'
+        raise Exception(msg)
+    return overflow
+
+def fill_vertices(hashi, vertices=None, verbose=False):
+    # function to add edges to a hashi by filling up vertex connections,
+    # for all vertices in the hashi.
+    # input arguments:
+    # - vertices: iterable of vertex indices to process (default: all vertices)
+    # note: if all vertices are processed, the vertices for which connections can be made
+    #       are determined for all vertices at once in find_connections_to_make,
+    #       after which the connections are made with fill_vertex
+    #       (which re-checks each vertex, since making connections for one vertex
+    #       might have modified the state of the next ones).
+    if vertices is None:
+        state = hashi.get_board_state()
+        n_connect = find_connections_to_make(state)
+        vertices = np.nonzero(np.any(n_connect > 0, axis=1))[0]
+    added_edges = []
+    for vidx in vertices:
+        added_edges += fill_vertex(hashi, hashi.vertices[vidx], repeat=True, verbose=verbose)
+    return added_edges
+
 def fill_vertex(hashi, vertex, repeat=False, verbose=False):
     # function to add edges to a hashi by filling up vertex connections.
     # example:
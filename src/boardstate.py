@@ -0,0 +1,103 @@
+# external imports
+import numpy as np
+
+# local imports
+from vertex import Vertex
+from hashi import Hashi
+
+
+class BoardState(object):
+    # implementation of the state of all vertices in a hashi as contiguous arrays.
+    # note: a BoardState made with from_hashi is a snapshot, i.e. it is not updated
+    #       when edges are added to the hashi it was made from;
+    #       use Hashi.get_board_state to get one that is kept up to date
+    #       (by updating the rows of modified vertices, see update);
+    #       its main purpose is to allow solving methods
+    #       to process all vertices at once with array operations,
+    #       instead of looping over Vertex objects.
+    # note: the arrays are indexed by vertex index (same order as hashi.vertices),
+    #       and where applicable by direction (same convention as for Vertex,
+    #       i.e. [up, right, down, left]).
+
+    def __init__(self, x, y, n, multiplicity, neighbours, established, potential):
+        ### initializer
+        # input arguments:
+        # - x, y: arrays of shape (nvertices) with vertex coordinates
+        # - n: array of shape (nvertices) with number of required connections
+        # - multiplicity: array of shape (nvertices) with vertex multiplicities
+        # - neighbours: array of shape (nvertices, 4) with neighbour indices
+        #   (-1 for no neighbour in a given direction)
+        # - established: array of shape (nvertices, 4) with number of
+        #   established connections in each direction
+        # - potential: array of shape (nvertices, 4) with number of
+        #   potential connections in each direction
+        self.x = np.asarray(x, dtype=np.int32)
+        self.y = np.asarray(y, dtype=np.int32)
+        self.n = np.asarray(n, dtype=np.int32)
+        self.multiplicity = np.asarray(multiplicity, dtype=np.int32)
+        self.neighbours = np.asarray(neighbours, dtype=np.int32).reshape(-1, 4)
+        self.established = np.asarray(established, dtype=np.int32).reshape(-1, 4)
+        self.potential = np.asarray(potential, dtype=np.int32).reshape(-1, 4)
+        self.nvertices = len(self.n)
+        # derived quantities
+        self.n_established = np.sum(self.established, axis=1)
+
+    def __str__(self):
+        infostr = 'BoardState ({} vertices, {} edges)'.format(
+                    self.nvertices, int(np.sum(self.n_established))//2)
+        return infostr
+
+    @staticmethod
+    def from_hashi(hashi):
+        ### make a BoardState from the current state of a hashi
+        vertices = hashi.vertices
+        x = [v.x for v in vertices]
+        y = [v.y for v in vertices]
+        n = [v.n for v in vertices]
+        multiplicity = [v.multiplicity for v in vertices]
+        counts = [v.connection_counts() for v in vertices]
+        established = [c[0] for c in counts]
+        potential = [c[1] for c in counts]
+        return BoardState(x, y, n, multiplicity, hashi.neighbour_indices, established, potential)
+
+    def update(self, hashi, vertices):
+        ### update the rows of the given vertices from the current state of a hashi
+        # input arguments:
+        # - vertices: list of vertex indices
+        counts = [hashi.vertices[vidx].connection_counts() for vidx in vertices]
+        self.established[vertices] = [c[0] for c in counts]
+        self.potential[vertices] = [c[1] for c in counts]
+        self.n_established[vertices] = np.sum(self.established[vertices], axis=1)
+
+    def to_hashi(self):
+        ### make a new hashi corresponding to this BoardState
+        vertices = [Vertex(int(self.x[vidx]), int(self.y[vidx]), int(self.n[vidx]),
+                      multiplicity=int(self.multiplicity[vidx]))
+                      for vidx in range(self.nvertices)]
+        hashi = Hashi(vertices)
+        # add the established connections
+        # (only considering up and right directions to avoid duplicates)
+        for vidx in range(self.nvertices):
+            for direction in [0,1]:
+                nidx = int(self.neighbours[vidx, direction])
+                for _ in range(self.established[vidx, direction]): hashi.add_edge(vidx, nidx)
+        # close the connections that are neither established nor potential
+        for vidx, vertex in enumerate(hashi.vertices):
+            for direction in vertex.directions_with_potential_connection():
+                n_close = vertex.n_potential_connections(direction) - self.potential[vidx, direction]
+                if n_close > 0: hashi.close_n_connections(vidx, direction, n_close, suppress_warnings=True)
+        return hashi
+
+    def n_missing(self):
+        ### get the number of missing connections for each vertex
+        return self.n - self.n_established
+
+    def n_potential(self):
+        ### get the total number of potential connections for each vertex
+        return np.sum(self.potential, axis=1)
+
+    def neighbour_values(self, values, default=0):
+        ### get the values of a per-vertex array for the neighbours of each vertex
+        # note: returns an array of shape (nvertices, 4),
+        #       with the provided default for directions without a neighbour.
+        return np.where(self.neighbours >= 0, values[self.neighbours], default)
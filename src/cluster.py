@@ -11,6 +11,15 @@ class Cluster(object):
     def __init__(self, vertices=None):
         ### initializer
         self.vertices = vertices if vertices is not None else []
+        # keep a set of the vertices as well,
+        # for fast checking whether a vertex belongs to this cluster
+        self.vertexset = set(self.vertices)
+        # keep track of the incomplete vertices
+        # note: this is a dict (used as an ordered set) with the incomplete vertices as keys;
+        #       it is not updated automatically when a vertex becomes complete
+        #       (the Hashi the cluster belongs to takes care of that, see Hashi._touch),
+        #       so that the solving methods only need to look at the incomplete vertices.
+        self.incomplete = dict([(v, True) for v in self.vertices if not v.complete])
 
     def __str__(self):
         infostr = 'Cluster with following vertices ({}):\n'.format(len(self.vertices))
@@ -38,9 +47,16 @@ class Cluster(object):
                 if vertex.is_connected_with(othervertex):
                     canadd = True
                     break
-        if canadd: self.vertices.append(vertex)
+        if canadd:
+            self.vertices.append(vertex)
+            self.vertexset.add(vertex)
+            if not vertex.complete: self.incomplete[vertex] = True
         else: raise Exception('ERROR: cannot add vertex to cluster.')
 
+    def contains(self, vertex):
+        ### check if a vertex belongs to this cluster
+        return (vertex in self.vertexset)
+
     def add_cluster(self, other, check_connection=True):
         ### add all vertices of another cluster to this cluster
         # note: just as with add_vertex, make the connection first,
@@ -59,15 +75,19 @@ class Cluster(object):
                         break
                 if canadd: break
         if canadd:
-            for vertex in other.vertices: self.add_vertex(vertex, check_connection=False)
+            self.vertices.extend(other.vertices)
+            self.vertexset.update(other.vertexset)
+            self.incomplete.update(other.incomplete)
         else: raise Exception('ERROR: cannot add clusters to each other.')
 
     def get_connections(self, only_internal=False, only_external=False):
         ### get a list of all potential connections for this cluster
         # - only_internal: if set to True, keep only connections that do not cross the cluster boundary
         # - only_external: if set to True, keep only connections that cross the cluster boundary
+        # note: complete vertices have no potential connections,
+        #       so only the incomplete vertices are considered.
         res = []
-        for vertex in self.vertices:
+        for vertex in self.incomplete:
             # shortcut: skip vertices that are complete
             if vertex.complete: continue
             # loop over neighbours
@@ -79,10 +99,10 @@ class Cluster(object):
                 # optional filtering
                 if only_internal:
                     # skip neighbours that are outside the cluster
-                    if neighbour not in self.vertices: continue
+                    if neighbour not in self.vertexset: continue
                 if only_external:
                     # skip neighbours that belong to the cluster
-                    if neighbour in self.vertices: continue
+                    if neighbour in self.vertexset: continue
                 # add potential connection to list
                 res.append((vertex, neighbour))
         return res
@@ -95,17 +115,31 @@ class Cluster(object):
         ### get a list of all potential connections that cross the cluster boundary
         return self.get_connections(only_external=True)
 
+    def n_open_external_slots(self):
+        ### get the number of connections that can still be made across the cluster boundary
+        # note: for each potential external connection, the number of connections
+        #       that can still be made is the smallest of the number of potential connections
+        #       for both vertices in each others direction.
+        n = 0
+        for (vertex, neighbour) in self.get_external_connections():
+            n += min(vertex.n_potential_connections(neighbour.direction(vertex)),
+                     neighbour.n_potential_connections(vertex.direction(neighbour)))
+        return n
+
     def would_make_complete(self, connection):
         ### check if a given connection would make a cluster complete
         (v1, v2) = connection
         if not v1.can_connect_with(v2):
             raise Exception('ERROR: something went wrong.')
         # check if all other vertices in this cluster are complete
-        completion = [v.complete for v in self.vertices if (v!=v1 and v!=v2)]
-        if not all(completion): return False
+        # note: this stops at the first incomplete vertex other than v1 and v2,
+        #       so if the incomplete vertices are kept up to date, at most three vertices are checked.
+        for v in self.incomplete:
+            if v.complete or v is v1 or v is v2: continue
+            return False
         # check if v1 and v2 are complete except in each others direction
         for v in [v1, v2]:
-            if v not in self.vertices: continue
+            if v not in self.vertexset: continue
             direction = v2.direction(v1) if v==v1 else v1.direction(v2)
             if v.n_missing_connections() > v.n_potential_connections(direction): return False
         return True
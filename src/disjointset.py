@@ -0,0 +1,64 @@
+class DisjointSet(object):
+    # implementation of a disjoint-set (union-find) data structure.
+    # note: the elements are the integers 0 ... n-1 (e.g. vertex indices);
+    #       each set is identified by the index of its root element.
+    # note: uses path compression in find and union by size in union,
+    #       so that both operations take nearly constant time.
+
+    def __init__(self, n):
+        ### initializer
+        # note: initially, each element forms its own set.
+        self.parent = list(range(n))
+        self.size = [1]*n
+        self.nsets = n
+        # note: path compression can be disabled,
+        #       e.g. if unions need to be undone later (see split).
+        self.path_compression = True
+
+    def __str__(self):
+        infostr = 'DisjointSet ({} elements, {} sets)'.format(len(self.parent), self.nsets)
+        return infostr
+
+    def find(self, idx):
+        ### find the root of the set containing a given element
+        root = idx
+        while self.parent[root] != root: root = self.parent[root]
+        if not self.path_compression: return root
+        # path compression: let all elements on the path point to the root
+        while self.parent[idx] != root:
+            self.parent[idx], idx = root, self.parent[idx]
+        return root
+
+    def get_size(self, idx):
+        ### get the size of the set containing a given element
+        return self.size[self.find(idx)]
+
+    def connected(self, idx1, idx2):
+        ### check if two elements belong to the same set
+        return (self.find(idx1) == self.find(idx2))
+
+    def union(self, idx1, idx2):
+        ### merge the sets containing two elements
+        # note: returns a tuple of the form (root, absorbed root),
+        #       where root is the root of the merged set,
+        #       and absorbed root is the root of the set that was merged into it
+        #       (i.e. it is no longer a root after this operation);
+        #       returns None if both elements were already in the same set.
+        root1 = self.find(idx1)
+        root2 = self.find(idx2)
+        if root1 == root2: return None
+        # union by size: attach the smaller set to the larger one
+        if self.size[root1] < self.size[root2]: root1, root2 = root2, root1
+        self.parent[root2] = root1
+        self.size[root1] += self.size[root2]
+        self.nsets -= 1
+        return (root1, root2)
+
+    def split(self, root, absorbed_root):
+        ### undo a union
+        # note: the arguments are supposed to be the output of the corresponding union;
+        #       only the most recent union can be undone (and so on in reverse order),
+        #       and path compression must have been disabled in the meantime.
+        self.parent[absorbed_root] = absorbed_root
+        self.size[root] -= self.size[absorbed_root]
+        self.nsets += 1
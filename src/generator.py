@@ -0,0 +1,145 @@
+# Generation of random hashi puzzles.
+
+# A puzzle is generated by first making a random layout of islands and bridges
+# that satisfies all the rules of the game (connected, no crossing bridges,
+# at most two bridges between two islands, or another multiplicity),
+# and then deriving the island numbers
+# from the number of bridges at each island.
+# By construction, each generated puzzle has at least one solution (the layout itself),
+# but it is not necessarily unique (see the unique argument of generate).
+
+# The layout is grown from a random island, by repeatedly adding a bridge
+# of random length in a random direction from a random island,
+# if all cells it covers (including the new island at its end) are still free.
+# Afterwards, extra bridges can be added between islands that see each other,
+# to also obtain layouts with loops.
+
+# external imports
+import random
+import numpy as np
+
+# local imports
+from hashi import Hashi
+
+
+def generate_layout(width, height, density=0.08, min_length=2, max_length=6,
+                    loop_fraction=0.1, multiplicity=2, rng=None):
+    ### generate a random layout of islands and bridges
+    # input arguments:
+    # - width, height: size of the grid
+    # - density: target fraction of grid cells that contain an island
+    #   (the actual density can be lower if no more bridges fit in the grid)
+    # - min_length, max_length: range of bridge lengths, i.e. differences in coordinates
+    #   between the islands they connect (the default minimum of 2 avoids adjacent islands)
+    # - loop_fraction: probability to add an extra bridge between islands that see each other
+    # - multiplicity: maximum number of bridges between two islands
+    # - rng: random.Random instance (default: unseeded)
+    # returns:
+    # - a tuple of the form (islands, bridges),
+    #   where islands is a dict of the form {(x,y): n, ...}
+    #   and bridges is a dict of the form {((x1,y1), (x2,y2)): number of bridges, ...}
+    if rng is None: rng = random.Random()
+    if width*height < 2:
+        raise Exception('ERROR: grid of size {}x{} is too small.'.format(width, height))
+    # note: occupied holds the cells covered by islands and bridges
+    occupied = set()
+    islands = {}
+    bridges = {}
+    start = (rng.randrange(width), rng.randrange(height))
+    islands[start] = 0
+    occupied.add(start)
+    # note: keys holds the islands from which new bridges can still be tried,
+    #       and islands are removed from it after too many failed tries
+    keys = [start]
+    nfailed = {start: 0}
+    target = max(2, int(round(width*height*density)))
+    directions = [(0,1), (1,0), (0,-1), (-1,0)]
+    while len(islands) < target and len(keys) > 0:
+        kidx = rng.randrange(len(keys))
+        (x, y) = keys[kidx]
+        (dx, dy) = rng.choice(directions)
+        length = rng.randint(min_length, max_length)
+        cells = [(x+dx*k, y+dy*k) for k in range(1, length+1)]
+        free = True
+        for (cx, cy) in cells:
+            if( cx<0 or cx>=width or cy<0 or cy>=height or (cx, cy) in occupied ):
+                free = False
+                break
+        if not free:
+            nfailed[(x, y)] += 1
+            if nfailed[(x, y)] >= 20:
+                keys[kidx] = keys[-1]
+                keys.pop()
+            continue
+        occupied.update(cells)
+        end = cells[-1]
+        nbridges = rng.choice(range(1, multiplicity+1))
+        islands[end] = nbridges
+        islands[(x, y)] += nbridges
+        bridges[((x, y), end)] = nbridges
+        keys.append(end)
+        nfailed[end] = 0
+    if len(islands) < 2:
+        raise Exception('ERROR: could not generate a layout with at least two islands.')
+    # add extra bridges between islands that see each other
+    if loop_fraction > 0:
+        bridged = set(bridges.keys()) | set([(b, a) for (a, b) in bridges.keys()])
+        for (x, y) in sorted(islands.keys()):
+            for (dx, dy) in [(1,0), (0,1)]:
+                cells = []
+                (cx, cy) = (x+dx, y+dy)
+                while( cx<width and cy<height and (cx, cy) not in occupied ):
+                    cells.append((cx, cy))
+                    (cx, cy) = (cx+dx, cy+dy)
+                if (cx, cy) not in islands or ((x, y), (cx, cy)) in bridged: continue
+                if len(cells)+1 < min_length: continue
+                if rng.random() >= loop_fraction: continue
+                occupied.update(cells)
+                nbridges = rng.choice(range(1, multiplicity+1))
+                islands[(x, y)] += nbridges
+                islands[(cx, cy)] += nbridges
+                bridges[((x, y), (cx, cy))] = nbridges
+                bridged.add(((x, y), (cx, cy)))
+    return (islands, bridges)
+
+
+def layout_to_str(islands, width, height, multiplicity=2):
+    ### make the string representation of a layout (see Hashi.from_str)
+    # note: separators are used if any island needs more than one digit (see Hashi.grid_to_str).
+    grid = np.full((height, width), '-', dtype=object)
+    for (x, y), n in islands.items(): grid[height-1-y, x] = str(n)
+    return Hashi.multiplicity_header(multiplicity) + Hashi.grid_to_str(grid)
+
+
+def generate_str(width, height, seed=None, unique=False, max_attempts=100, **kwargs):
+    ### generate the string representation of a random puzzle (see Hashi.from_str)
+    # input arguments:
+    # - width, height: size of the grid
+    # - seed: random seed (default: unseeded)
+    # - unique: whether to only return a puzzle with a unique solution;
+    #   layouts are generated until one is found with a unique solution,
+    #   with the constraint solver (note: the solver folder must be in the python path).
+    # - max_attempts: maximum number of layouts to try if unique is True
+    #   (an exception is raised if none of them has a unique solution)
+    # - kwargs: passed down to generate_layout
+    # note: large puzzles rarely have a unique solution,
+    #       so the unique option is mostly useful for small puzzles
+    #       (or with a low loop_fraction).
+    rng = random.Random(seed)
+    for _ in range(max_attempts if unique else 1):
+        (islands, _) = generate_layout(width, height, rng=rng, **kwargs)
+        txt = layout_to_str(islands, width, height, multiplicity=kwargs.get('multiplicity', 2))
+        if not unique: return txt
+        import constraintsolver
+        if constraintsolver.count_solutions(Hashi.from_str(txt), max_solutions=2)==1: return txt
+    msg = 'ERROR: no puzzle with a unique solution found in {} attempts.'.format(max_attempts)
+    raise Exception(msg)
+
+
+def generate(width, height, seed=None, unique=False, max_attempts=100, **kwargs):
+    ### generate a random puzzle
+    # returns:
+    # - a Hashi object
+    # note: see generate_str for the input arguments.
+    txt = generate_str(width, height, seed=seed, unique=unique, max_attempts=max_attempts, **kwargs)
+    return Hashi.from_str(txt)
@@ -4,6 +4,7 @@ import numpy as np
 # local imports
 from vertex import Vertex
 from cluster import Cluster
+from disjointset import DisjointSet
 from edge import Edge
 
 
@@ -14,28 +15,78 @@ class Hashi(object):
         # set basic attributes
         self.vertices = vertices
         self.nvertices = len(vertices)
+        # note: the multiplicity (maximum number of bridges between two vertices)
+        #       is stored per vertex; the multiplicity of the hashi is the largest one
+        #       (they are normally all the same).
+        self.multiplicity = max([v.multiplicity for v in vertices]) if len(vertices)>0 else 2
         self.edges = []
         self.complete = False
+        # make lookup tables from vertex and from coordinate to vertex index
+        self.vertex_indices = {}
+        self.coordinate_indices = {}
+        for vidx, vertex in enumerate(self.vertices):
+            self.vertex_indices[vertex] = vidx
+            self.coordinate_indices[(vertex.x, vertex.y)] = vidx
         # determine correct neighbours
         # (i.e. topologically connected vertices)
-        for vertex in self.vertices:
+        self.neighbour_indices = np.array(self.find_neighbours(), dtype=np.int32).reshape(-1, 4)
+        for vidx, vertex in enumerate(self.vertices):
             for direction in [0,1,2,3]:
-                # find neighbour in list of provided vertices
-                neighbour = vertex.find_closest(vertices, direction)
-                vertex.neighbours[direction] = neighbour
+                nidx = self.neighbour_indices[vidx, direction]
+                vertex.neighbours[direction] = self.vertices[nidx] if nidx>=0 else None
+        # initialize topology
+        # note: this needs to be done after setting the neighbours,
+        #       since the topology is defined based on those neighbours
+        # note: the topology is stored per vertex and per direction
+        #       (instead of as a dense matrix of all vertex pairs),
+        #       since each vertex has at most four neighbours;
+        #       convention is -1 for no neighbour in a given direction,
+        #       else the number of established connections with that neighbour.
+        #       use get_topology to retrieve the value for a pair of vertices.
+        self.topology = -np.ones((self.nvertices, 4), dtype=np.int8)
+        self.make_topology()
+        # initialize candidate edges and the candidate edges they cross
+        # note: this needs to be done after setting the neighbours,
+        #       since candidate edges can only be made between neighbours
+        self.make_crossings()
         # initialize clusters
         # note: initally, none of the vertices have a connection,
         #       so each vertex represents its own cluster;
         #       they will be gradually merged into only one cluster
         #       when fully solved.
-        self.clusters = [Cluster(vertices=[v]) for v in vertices]
-        self.cluster_lookup_table = {}
-        for idx in range(len(vertices)): self.cluster_lookup_table[idx] = self.clusters[idx]
-        # initialize topology
-        # note: this needs to be done after setting the neighbours,
-        #       since the topology matrix is defined based on those neighbours
-        self.topology = -np.ones((self.nvertices, self.nvertices))
-        self.make_topology()
+        # note: the connectivity is tracked with a disjoint-set structure
+        #       on the vertex indices; the root index of a vertex is its cluster id.
+        #       the clusters attribute is a dict matching cluster ids
+        #       to the corresponding Cluster objects.
+        # note: this needs to be done after initializing the topology,
+        #       since that can make vertices complete (e.g. vertices with no connections needed).
+        self.disjointset = DisjointSet(self.nvertices)
+        self.clusters = {}
+        for vidx, vertex in enumerate(self.vertices): self.clusters[vidx] = Cluster(vertices=[vertex])
+        # keep track of the number of complete vertices
+        # (so that checking completion of the hashi does not require a loop)
+        self.n_complete = sum([1 for v in self.vertices if v.complete])
+        # keep track of the total number of closed connections over all vertices
+        # (so that e.g. the solver statistics do not require a loop, see n_closed_connections)
+        # note: this is updated by add_edge, close_n_connections and rollback.
+        self.n_closed = sum([v.n_closed_connections() for v in self.vertices])
+        # keep track of vertices that are modified
+        # note: this is a set of vertex indices; it is filled by add_edge and close_n_connections
+        #       and can be reset by solving methods to find out which vertices
+        #       were modified in the meantime.
+        # note: if the connections between two vertices are modified
+        #       (e.g. closed on one side), both vertices are considered modified.
+        self.touched = set()
+        # initialize the array state of all vertices
+        # note: this is a BoardState that is made on first use (see get_board_state);
+        #       afterwards, only the rows of the vertices in stale
+        #       (i.e. the vertices modified since the last call) are refreshed.
+        self.board_state = None
+        self.stale = set()
+        # initialize the trail of modifications
+        # note: this is None by default, i.e. modifications are not recorded;
+        #       see checkpoint and rollback.
+        self.trail = None
 
     def __str__(self):
         # basic printing
@@ -44,6 +95,10 @@ class Hashi(object):
 
     def print(self):
         # fancy printing
+        print(self.fancy_str())
+
+    def fancy_str(self):
+        # make the string representation used for fancy printing
 
         # initialize grid of characters
         offsetx = min([v.x for v in self.vertices])
@@ -58,19 +113,22 @@ class Hashi(object):
             chars[len(chars)-1-2*(v.y-offsety)][2*(v.x-offsetx)] = str(v.n)
                 
         # fill edges
-        for e in self.edges:
-            xcoords = []
-            ycoords = []
-            if e.horizontal:
-                xcoords = list(range(2*(e.x1-offsetx)+1, 2*(e.x2-offsetx)))
-                ycoords = [len(chars)-1-2*(e.y1-offsety)]*len(xcoords)
-                chardict = {' ': '-', '-': '='}
-            elif e.vertical:
-                ycoords = list(range(len(chars)-2*(e.y2-offsety), len(chars)-1-2*(e.y1-offsety)))
-                xcoords = [2*(e.x1-offsetx)]*len(ycoords)
-                chardict = {' ': '|', '|': '"'}
-            for xcoord,ycoord in zip(xcoords, ycoords):
-                chars[ycoord][xcoord] = chardict[chars[ycoord][xcoord]]
+        # note: the character depends on the number of edges between two vertices
+        #       (single and double bridges as '-' and '=' or '|' and '"',
+        #       triple bridges as '≡' or '⦀', and larger numbers as '#').
+        hchars = ['-', '=', '≡']
+        vchars = ['|', '"', '⦀']
+        for (x1, y1, x2, y2), edges in self.get_edges().items():
+            nedges = len(edges)
+            if y1==y2:
+                xcoords = list(range(2*(x1-offsetx)+1, 2*(x2-offsetx)))
+                ycoords = [len(chars)-1-2*(y1-offsety)]*len(xcoords)
+                char = hchars[nedges-1] if nedges<=len(hchars) else '#'
+            else:
+                ycoords = list(range(len(chars)-2*(y2-offsety), len(chars)-1-2*(y1-offsety)))
+                xcoords = [2*(x1-offsetx)]*len(ycoords)
+                char = vchars[nedges-1] if nedges<=len(vchars) else '#'
+            chars[ycoords, xcoords] = char
 
         # group characters in lines
         lines = [''.join(linechars) for linechars in chars]
@@ -82,55 +140,211 @@ class Hashi(object):
 
         # append lines in a single string
         txt = '\n'.join(lines)
-        print(txt)
+        return txt
 
     @staticmethod
-    def from_txt(txtfile):
+    def from_txt(txtfile, multiplicity=None):
         # static constructor from txt input file
         with open(txtfile, 'r') as f: txt = f.read()
-        return Hashi.from_str(txt)
+        return Hashi.from_str(txt, multiplicity=multiplicity)
+
+    @staticmethod
+    def from_str(txt, multiplicity=None):
+        # static constructor from a string representation (see parse_str for the formats)
+        # input arguments:
+        # - multiplicity: maximum number of bridges between two vertices
+        #   (default: the value in the header of the string representation if present, else 2)
+        (x, y, n, header_multiplicity) = Hashi.parse_str(txt)
+        if multiplicity is None: multiplicity = header_multiplicity
+        if multiplicity is None: multiplicity = 2
+        Hashi.check_numbers(x, y, n, multiplicity)
+        vertices = [Vertex(xi, yi, ni, multiplicity=multiplicity)
+                      for xi, yi, ni in zip(x.tolist(), y.tolist(), n.tolist())]
+        # return a Hashi object
+        hashi = Hashi(vertices)
+        hashi.check_neighbour_numbers()
+        return hashi
+
+    @staticmethod
+    def check_numbers(x, y, n, multiplicity):
+        # helper function to from_str and from_dict:
+        # check that the numbers of connections can be reached with the given multiplicity
+        if multiplicity < 1: raise Exception('ERROR: invalid multiplicity: {}'.format(multiplicity))
+        invalid = np.nonzero((np.asarray(n) < 0) | (np.asarray(n) > 4*multiplicity))[0]
+        if len(invalid)==0: return
+        idx = invalid[0]
+        msg = 'ERROR: vertex at ({}, {}) has {} connections,'.format(x[idx], y[idx], n[idx])
+        msg += ' which is not possible with multiplicity {}.'.format(multiplicity)
+        raise Exception(msg)
+
+    def check_neighbour_numbers(self):
+        # helper function to from_str and from_dict:
+        # check that the numbers of connections can be reached with the available neighbours
+        # (i.e. at most the multiplicity times the number of neighbours)
+        n = np.array([v.n for v in self.vertices], dtype=np.int64)
+        multiplicity = np.array([v.multiplicity for v in self.vertices], dtype=np.int64)
+        n_neighbours = np.sum(self.neighbour_indices >= 0, axis=1)
+        invalid = np.nonzero(n > multiplicity*n_neighbours)[0]
+        if len(invalid)==0: return
+        vertex = self.vertices[invalid[0]]
+        msg = 'ERROR: vertex at ({}, {}) has {} connections,'.format(vertex.x, vertex.y, vertex.n)
+        msg += ' which is not possible with {} neighbours'.format(n_neighbours[invalid[0]])
+        msg += ' and multiplicity {}.'.format(vertex.multiplicity)
+        raise Exception(msg)
 
     @staticmethod
-    def from_str(txt):
+    def parse_str(txt):
+        # parse a string representation into arrays of vertex coordinates and numbers.
+        # the following formats are supported:
+        # - dense grid with one character per position (the default format, see to_str):
+        #   '-' for empty positions and a digit for vertices.
+        # - dense grid with separators (spaces, tabs or commas) between the positions,
+        #   e.g. for numbers of connections larger than 9:
+        #   '-' for empty positions and an integer for vertices.
+        # - sparse list of vertices: a header line 'x y n',
+        #   followed by one line 'x y n' per vertex (with y pointing upwards).
+        # each of these formats can be preceded by a line 'multiplicity m',
+        # to allow up to m bridges between two vertices (instead of 2).
+        # note: the characters or tokens are converted to numbers all at once with numpy,
+        #       instead of one by one.
+        # returns a tuple of the form (x, y, n, multiplicity) with integer arrays x, y and n,
+        # with the vertices sorted by y and then by x for the dense formats,
+        # and multiplicity None if there is no multiplicity line.
         # format lines
-        lines = [line.strip(' \t\n') for line in txt.split('\n')]
+        lines = [line.strip(' \t\r\n') for line in txt.split('\n')]
         lines = [line for line in lines if len(line)!=0]
-        # make collection of vertices
-        vertices = []
-        for y,line in enumerate(lines[::-1]):
-            for x,char in enumerate(line):
-                if char=='-': continue
-                try: n = int(char)
-                except: raise Exception('ERROR: unrecognized character: {}'.format(char))
-                v = Vertex(x, y, n)
-                vertices.append(v)
-        # return a Hashi object
-        return Hashi(vertices)
+        multiplicity = None
+        if len(lines)>0 and lines[0].lower().startswith('multiplicity'):
+            tokens = lines.pop(0).split()
+            if len(tokens)!=2 or not tokens[1].isdigit():
+                raise Exception('ERROR: multiplicity line must be of the form: multiplicity m')
+            multiplicity = int(tokens[1])
+        if len(lines)==0: return tuple([np.zeros(0, dtype=np.int64)]*3) + (multiplicity,)
+        # sparse format
+        if lines[0].lower().split()==['x', 'y', 'n']:
+            tokens = ' '.join(lines[1:]).replace(',', ' ').split()
+            values = Hashi.parse_tokens(tokens)
+            if len(values)%3 != 0: raise Exception('ERROR: vertex lines must have 3 values (x y n).')
+            values = values.reshape(-1, 3)
+            return (values[:,0], values[:,1], values[:,2], multiplicity)
+        # dense format with separators
+        if any([(' ' in line or '\t' in line or ',' in line) for line in lines]):
+            rows = [line.replace(',', ' ').split() for line in lines[::-1]]
+            width = max([len(row) for row in rows])
+            tokens = np.array([row + ['-']*(width-len(row)) for row in rows])
+            mask = (tokens!='-')
+            (y, x) = np.nonzero(mask)
+            return (x, y, Hashi.parse_tokens(tokens[mask]), multiplicity)
+        # dense format with one character per position
+        width = max([len(line) for line in lines])
+        data = ''.join([line.ljust(width, '-') for line in lines[::-1]]).encode('utf-8')
+        if len(data) != width*len(lines):
+            char = [c for c in ''.join(lines) if len(c.encode('utf-8'))>1][0]
+            raise Exception('ERROR: unrecognized character: {}'.format(char))
+        chars = np.frombuffer(data, dtype=np.uint8).reshape(len(lines), width)
+        mask = (chars!=ord('-'))
+        (y, x) = np.nonzero(mask)
+        n = chars[mask].astype(np.int64) - ord('0')
+        invalid = (n<0) | (n>9)
+        if np.any(invalid):
+            char = chr(chars[mask][invalid][0])
+            raise Exception('ERROR: unrecognized character: {}'.format(char))
+        return (x, y, n, multiplicity)
+
+    @staticmethod
+    def parse_tokens(tokens):
+        # helper function to parse_str: convert string tokens to an integer array
+        try: return np.array(tokens, dtype=np.int64).ravel()
+        except ValueError:
+            token = [t for t in np.ravel(tokens) if not t.lstrip('+-').isdigit()][0]
+            raise Exception('ERROR: unrecognized token: {}'.format(token))
 
     @staticmethod
-    def from_dict(vdict):
+    def from_dict(vdict, multiplicity=2):
         # constructor from a dict of the form {(x,y): n, ...}
+        # input arguments:
+        # - multiplicity: maximum number of bridges between two vertices
+        coordinates = list(vdict.keys())
+        Hashi.check_numbers([c[0] for c in coordinates], [c[1] for c in coordinates],
+          list(vdict.values()), multiplicity)
         vertices = []
         for (x,y),n in vdict.items():
-            vertex = Vertex(x, y, n)
+            vertex = Vertex(x, y, n, multiplicity=multiplicity)
             vertices.append(vertex)
-        return Hashi(vertices)
+        hashi = Hashi(vertices)
+        hashi.check_neighbour_numbers()
+        return hashi
+
+    def to_grid(self):
+        # make a grid of the vertices, with rows from top to bottom and columns from left to right
+        # (shifted so that the first row and column contain a vertex).
+        # returns a 2D numpy array of strings, with '-' for empty positions
+        # and the number of connections for vertices.
+        x = np.array([v.x for v in self.vertices])
+        y = np.array([v.y for v in self.vertices])
+        x = x - np.min(x)
+        y = np.max(y) - y
+        grid = np.full((np.max(y)+1, np.max(x)+1), '-', dtype=object)
+        grid[y, x] = [str(v.n) for v in self.vertices]
+        return grid
+
+    @staticmethod
+    def grid_to_str(grid):
+        # make a string representation from a grid of strings (see to_grid).
+        # if all positions are single characters, the default dense format is used,
+        # else the positions are separated by spaces (and aligned).
+        lengths = np.vectorize(len, otypes=[int])(grid)
+        if np.max(lengths) <= 1: return '\n'.join([''.join(row) for row in grid])
+        width = np.max(lengths)
+        return '\n'.join([' '.join([token.rjust(width) for token in row]) for row in grid])
 
-    def to_str(self):
+    def to_str(self, sparse=False):
         # reverse operation with respect to from_str,
         # i.e. make string representation suitable for writing to file
         # (note: edges are ignored, mostly used for empty hashis)
-        offsetx = min([v.x for v in self.vertices])
-        offsety = min([v.y for v in self.vertices])
-        maxx = max([v.x for v in self.vertices]) - offsetx
-        maxy = max([v.y for v in self.vertices]) - offsety
-        chars = [['-']*(maxx+1)]*(maxy+1)
-        chars = np.array(chars)
-        for v in self.vertices:
-            chars[len(chars)-1-(v.y-offsety)][v.x-offsetx] = str(v.n)
-        lines = [''.join(linechars) for linechars in chars]
-        txt = '\n'.join(lines)
-        return txt
+        # input arguments:
+        # - sparse: whether to use the sparse format (one line per vertex, see parse_str)
+        #   instead of a dense grid.
+        # note: the multiplicity line is only added if the multiplicity differs from the default of 2.
+        if sparse:
+            lines = ['x y n'] + ['{} {} {}'.format(v.x, v.y, v.n) for v in self.vertices]
+            txt = '\n'.join(lines)
+        else: txt = Hashi.grid_to_str(self.to_grid())
+        return Hashi.multiplicity_header(self.multiplicity) + txt
+
+    @staticmethod
+    def multiplicity_header(multiplicity):
+        # get the multiplicity line to put in front of a string representation (see parse_str),
+        # including the line break (empty for the default multiplicity of 2)
+        if multiplicity==2: return ''
+        return 'multiplicity {}\n'.format(multiplicity)
+
+    def find_neighbours(self):
+        # find the closest vertex in each direction for all vertices at once.
+        # note: the vertices are grouped per row and per column
+        #       and sorted by coordinate within each group,
+        #       so that neighbours are simply consecutive elements in a group
+        #       (instead of searching all other vertices for each vertex).
+        # note: return type is a list of the form [[up, right, down, left], ...]
+        #       (one element per vertex) containing vertex indices,
+        #       with -1 for directions without a neighbour.
+        neighbours = [[-1, -1, -1, -1] for _ in range(self.nvertices)]
+        rows = {}
+        columns = {}
+        for vidx, vertex in enumerate(self.vertices):
+            rows.setdefault(vertex.y, []).append((vertex.x, vidx))
+            columns.setdefault(vertex.x, []).append((vertex.y, vidx))
+        for row in rows.values():
+            row.sort()
+            for (_, left), (_, right) in zip(row[:-1], row[1:]):
+                neighbours[left][1] = right
+                neighbours[right][3] = left
+        for column in columns.values():
+            column.sort()
+            for (_, below), (_, above) in zip(column[:-1], column[1:]):
+                neighbours[below][0] = above
+                neighbours[above][2] = below
+        return neighbours
 
     def make_topology(self):
         # make the topology for the provided list of vertices
@@ -143,35 +357,86 @@ class Hashi(object):
         # loop over vertices
         for vidx, vertex in enumerate(self.vertices):
             # check if some connections were already closed or established
-            if -1 in vertex.connections: raise Exception('ERROR: found already closed connection.') 
-            if 1 in vertex.connections: raise Exception('ERROR: found already established connection.')
+            if vertex.n_closed_connections()>0: raise Exception('ERROR: found already closed connection.')
+            if vertex.n_established_connections()>0: raise Exception('ERROR: found already established connection.')
             # loop over the directions
             for direction in [0,1,2,3]:
-                # neighbour in the given direction
-                neighbour = vertex.neighbours[direction]
+                # index of the neighbour in the given direction
+                nidx = self.neighbour_indices[vidx, direction]
                 # if none, close the corresponding connections and continue
-                if neighbour is None:
+                if nidx < 0:
                     vertex.close_connections(direction)
                     continue
                 # set the topological connection as allowed
-                nidx = self.vertices.index(neighbour)
-                self.topology[vidx, nidx] = 0
-                self.topology[nidx, vidx] = 0
+                self.topology[vidx, direction] = 0
     
+    def make_crossings(self):
+        # make the list of candidate edges (i.e. pairs of neighbouring vertices)
+        # and for each of them the list of other candidate edges it crosses.
+        # note: the candidate edges are stored in self.slots
+        #       as tuples of the form (v1idx, v2idx),
+        #       where v1 is the lower or leftmost vertex;
+        #       self.slot_indices holds the index of the candidate edge
+        #       for each vertex and direction (or -1 if there is none),
+        #       and self.crossings holds for each candidate edge
+        #       a list of indices of the candidate edges it crosses.
+        # note: the crossings are found by mapping all grid points
+        #       strictly inside vertical candidate edges to their index,
+        #       and then looking up the grid points strictly inside horizontal ones,
+        #       so the cost scales with the total length of all candidate edges
+        #       (instead of with the number of pairs of candidate edges).
+        self.slots = []
+        self.slot_indices = -np.ones((self.nvertices, 4), dtype=np.int32)
+        for vidx in range(self.nvertices):
+            # only consider up and right directions to avoid duplicates
+            for direction in [0,1]:
+                nidx = self.neighbour_indices[vidx, direction]
+                if nidx < 0: continue
+                self.slot_indices[vidx, direction] = len(self.slots)
+                self.slot_indices[nidx, direction+2] = len(self.slots)
+                self.slots.append((vidx, int(nidx)))
+        self.crossings = [[] for _ in self.slots]
+        inner_points = {}
+        for sidx, (v1idx, v2idx) in enumerate(self.slots):
+            v1 = self.vertices[v1idx]
+            v2 = self.vertices[v2idx]
+            if v1.x != v2.x: continue
+            for y in range(v1.y+1, v2.y): inner_points[(v1.x, y)] = sidx
+        for sidx, (v1idx, v2idx) in enumerate(self.slots):
+            v1 = self.vertices[v1idx]
+            v2 = self.vertices[v2idx]
+            if v1.y != v2.y: continue
+            for x in range(v1.x+1, v2.x):
+                other_sidx = inner_points.get((x, v1.y))
+                if other_sidx is None: continue
+                self.crossings[sidx].append(other_sidx)
+                self.crossings[other_sidx].append(sidx)
+
     def get(self, v):
         # auxiliary function for vertex/index conversion
         if isinstance(v, int):
             vidx = v
             v = self.vertices[vidx]
         elif isinstance(v, Vertex):
-            vidx = self.vertices.index(v)
+            vidx = self.vertex_indices[v]
         else: raise Exception('ERROR: unrecognized type for vertex: {}'.format(type(v)))
         return (vidx, v)
     
+    def get_topology(self, v1, v2):
+        # get the topological relation between two vertices
+        # note: returns -1 if the vertices are not neighbours,
+        #       else the number of established connections between them.
+        v1idx, v1 = self.get(v1)
+        v2idx, v2 = self.get(v2)
+        direction = v2.direction(v1)
+        if direction < 0: return -1
+        if self.neighbour_indices[v1idx, direction] != v2idx: return -1
+        return int(self.topology[v1idx, direction])
+
     def get_vertex_at_coordinate(self, x, y):
-        for vidx, v in self.vertices:
-            if( v.x==x and v.y==y ): return (vidx, v)
-        return None
+        vidx = self.coordinate_indices.get((x, y))
+        if vidx is None: return None
+        return (vidx, self.vertices[vidx])
 
     def get_edges(self):
         # get edges grouped by whether they connect the same vertices.
@@ -184,12 +449,29 @@ class Hashi(object):
             else: res[key] = [e]
         return res
 
+    def get_cluster_id(self, v):
+        ### get the id of the cluster of vertices that are connected to the given vertex
+        vidx, v = self.get(v)
+        return self.disjointset.find(vidx)
+
     def get_cluster(self, v):
         ### get the cluster of vertices that are connected to the given vertex
+        return self.clusters[self.get_cluster_id(v)]
+
+    def get_cluster_size(self, v):
+        ### get the number of vertices that are connected to the given vertex
+        # note: the vertex itself is included in the count.
         vidx, v = self.get(v)
-        cluster_ids = []
-        cluster = self.cluster_lookup_table[vidx]
-        return cluster
+        return self.disjointset.get_size(vidx)
+
+    def get_n_open_external_slots(self, v):
+        ### get the number of connections that can still be made
+        # between the cluster of the given vertex and other clusters
+        return self.get_cluster(v).n_open_external_slots()
+
+    def n_closed_connections(self):
+        ### get the total number of closed connections over all vertices
+        return self.n_closed
 
     def has_potential_connection(self, v1, v2):
         ### check if a connection between v1 and v2 could be made
@@ -199,56 +481,172 @@ class Hashi(object):
 
     def make_potential_edges(self):
         # returns a list of all currently potential edges
-        # note: return type is a list of tuples of the form (edge, v1, v2)
+        # note: return type is a list of tuples of the form (edge, v1idx, v1, v2idx, v2)
+        #       with v1idx < v2idx
         res = []
-        for v1idx, v1 in enumerate(self.vertices):
-            for v2idx, v2 in enumerate(self.vertices):
-                if v2idx<=v1idx: continue
-                if not self.has_potential_connection(v1, v2): continue
-                res.append( (Edge(v1.x, v1.y, v2.x, v2.y), v1idx, v1, v2idx, v2) )
+        for v1idx, v2idx in self.slots:
+            if v2idx < v1idx: v1idx, v2idx = v2idx, v1idx
+            v1 = self.vertices[v1idx]
+            v2 = self.vertices[v2idx]
+            if not self.has_potential_connection(v1, v2): continue
+            res.append( (Edge(v1.x, v1.y, v2.x, v2.y), v1idx, v1, v2idx, v2) )
         return res
 
+    def checkpoint(self):
+        ### start recording modifications, so that they can be undone later
+        # returns:
+        # - a marker to pass to rollback, to undo all modifications made after this call
+        # note: modifications are recorded as a trail of small undo entries
+        #       (e.g. the previous state of a modified vertex),
+        #       so making a checkpoint does not involve copying the hashi.
+        # note: while recording, path compression in the cluster tracking is disabled,
+        #       since merging clusters must be undone in reverse order.
+        #       use clear_trail to stop recording.
+        if self.trail is None:
+            self.trail = []
+            self.disjointset.path_compression = False
+        return len(self.trail)
+
+    def rollback(self, marker):
+        ### undo all modifications made after the checkpoint with the given marker
+        while len(self.trail) > marker:
+            entry = self.trail.pop()
+            if entry[0]=='vertex':
+                (_, vidx, state) = entry
+                self.n_closed -= self.vertices[vidx].n_closed_connections()
+                self.vertices[vidx].set_state(state)
+                self.n_closed += self.vertices[vidx].n_closed_connections()
+                self.stale.add(vidx)
+            elif entry[0]=='edge':
+                (_, v1idx, v2idx, direction, n_complete, complete) = entry
+                self.edges.pop()
+                self.topology[v1idx, direction] -= 1
+                self.topology[v2idx, (direction+2)%4] -= 1
+                self.n_complete = n_complete
+                self.complete = complete
+            elif entry[0]=='cluster':
+                (_, cid, other_cid, other_cluster) = entry
+                self.disjointset.split(cid, other_cid)
+                cluster = self.clusters[cid]
+                del cluster.vertices[len(cluster.vertices)-len(other_cluster.vertices):]
+                cluster.vertexset.difference_update(other_cluster.vertexset)
+                for vertex in other_cluster.incomplete: del cluster.incomplete[vertex]
+                self.clusters[other_cid] = other_cluster
+            elif entry[0]=='complete':
+                (_, cid, vertex) = entry
+                self.clusters[cid].incomplete[vertex] = True
+
+    def clear_trail(self):
+        ### stop recording modifications
+        # note: modifications made before this call can no longer be undone.
+        self.trail = None
+        self.disjointset.path_compression = True
+
+    def _touch(self, vidx):
+        ### mark a vertex as modified (see touched and get_board_state)
+        # note: if the vertex became complete, it is also removed
+        #       from the incomplete vertices of its cluster (see Cluster).
+        self.touched.add(vidx)
+        self.stale.add(vidx)
+        vertex = self.vertices[vidx]
+        if not vertex.complete: return
+        cluster_id = self.disjointset.find(vidx)
+        cluster = self.clusters[cluster_id]
+        if vertex not in cluster.incomplete: return
+        del cluster.incomplete[vertex]
+        if self.trail is not None: self.trail.append(('complete', cluster_id, vertex))
+
+    def get_board_state(self):
+        ### get the state of all vertices as arrays (see BoardState)
+        # note: the same BoardState is returned on each call, and it is updated in place
+        #       for the vertices that were modified in the meantime through the hashi
+        #       (add_edge, close_n_connections, rollback);
+        #       it should not be modified by the caller.
+        from boardstate import BoardState
+        if self.board_state is None: self.board_state = BoardState.from_hashi(self)
+        elif len(self.stale) > 0: self.board_state.update(self, sorted(self.stale))
+        self.stale = set()
+        return self.board_state
+
+    def _record_vertex(self, vidx):
+        ### record the state of a vertex before modifying it
+        if self.trail is None: return
+        self.trail.append(('vertex', vidx, self.vertices[vidx].get_state()))
+
+    def close_n_connections(self, v, direction, n, suppress_warnings=False):
+        ### close a given number of potential connections of a vertex in a given direction
+        # note: same as Vertex.close_n_connections,
+        #       but keeps track of the modified vertices.
+        vidx, v = self.get(v)
+        self._record_vertex(vidx)
+        n_closed = v.n_closed_connections()
+        v.close_n_connections(direction, n, suppress_warnings=suppress_warnings)
+        self.n_closed += v.n_closed_connections() - n_closed
+        self._touch(vidx)
+        nidx = self.neighbour_indices[vidx, direction]
+        if nidx >= 0: self._touch(int(nidx))
+
     def add_edge(self, v1, v2):
         v1idx, v1 = self.get(v1)
         v2idx, v2 = self.get(v2)
         # check if connection is allowed
         if not self.has_potential_connection(v1, v2):
-            print('ERROR: invalid connection:')
-            print('Trying to make a connection between:')
-            print('  - {}'.format(v1))
-            print('  - {}'.format(v2))
-            raise Exception('ERROR: invalid connection.')
+            msg = 'ERROR: invalid connection:'
+            msg += ' trying to make a connection between {} and {}.'.format(v1, v2)
+            raise Exception(msg)
         # make and add the edge
+        direction = v2.direction(v1)
+        if self.trail is not None:
+            self.trail.append(('edge', v1idx, v2idx, direction, self.n_complete, self.complete))
         edge = Edge(v1.x, v1.y, v2.x, v2.y)
         self.edges.append(edge)
-        # modify topology matrix
-        self.topology[v1idx, v2idx] += 1
-        self.topology[v2idx, v1idx] += 1
+        # modify topology
+        self.topology[v1idx, direction] += 1
+        self.topology[v2idx, (direction+2)%4] += 1
         # modify vertex connections
+        self._record_vertex(v1idx)
+        self._record_vertex(v2idx)
+        n_complete = int(v1.complete) + int(v2.complete)
+        n_closed = v1.n_closed_connections() + v2.n_closed_connections()
         v1.add_connection(v2.direction(v1))
         v2.add_connection(v1.direction(v2))
+        self.n_complete += int(v1.complete) + int(v2.complete) - n_complete
+        self.n_closed += v1.n_closed_connections() + v2.n_closed_connections() - n_closed
+        self._touch(v1idx)
+        self._touch(v2idx)
         # merge clusters
-        c1 = self.cluster_lookup_table[v1idx]
-        c2 = self.cluster_lookup_table[v2idx]
-        if c1 != c2:
-            c1.add_cluster(c2)
-            for vidx in range(len(self.vertices)):
-                if self.cluster_lookup_table[vidx] == c2:
-                    self.cluster_lookup_table[vidx] = c1
-            self.clusters.remove(c2)
+        # note: the vertices of the smallest cluster are added to the largest one
+        merged = self.disjointset.union(v1idx, v2idx)
+        if merged is not None:
+            (cid, other_cid) = merged
+            other_cluster = self.clusters.pop(other_cid)
+            self.clusters[cid].add_cluster(other_cluster, check_connection=False)
+            if self.trail is not None:
+                self.trail.append(('cluster', cid, other_cid, other_cluster))
         # close all potential connections crossing the newly added edge
-        for test_edge, test_v1idx, test_v1, test_v2idx, test_v2 in self.make_potential_edges():
-            if( test_v1idx==v1idx or test_v1idx==v2idx 
-                or test_v2idx==v1idx or test_v2idx==v2idx ): continue
-            if not edge.crosses( test_edge ): continue
+        for test_sidx in self.crossings[self.slot_indices[v1idx, direction]]:
+            test_v1idx, test_v2idx = self.slots[test_sidx]
+            test_v1 = self.vertices[test_v1idx]
+            test_v2 = self.vertices[test_v2idx]
+            if not test_v1.can_connect_with(test_v2): continue
+            self._record_vertex(test_v1idx)
+            self._record_vertex(test_v2idx)
+            n_closed = test_v1.n_closed_connections() + test_v2.n_closed_connections()
             test_v1.close_connections(test_v2.direction(test_v1), suppress_warnings=True)
             test_v2.close_connections(test_v1.direction(test_v2), suppress_warnings=True)
+            self.n_closed += test_v1.n_closed_connections() + test_v2.n_closed_connections() - n_closed
+            self._touch(test_v1idx)
+            self._touch(test_v2idx)
         # close all potential connections to v1 and v2 if they are complete
         for vtestidx, vtest in zip([v1idx, v2idx], [v1,v2]):
             if vtest.complete:
-                for vidx, v in enumerate(self.vertices):
-                    if vidx==vtestidx: continue
-                    if not self.has_potential_connection(vtest, v): continue
+                for v in vtest.neighbours:
+                    if v is None: continue
+                    if not vtest.can_connect_with(v): continue
+                    self._record_vertex(self.vertex_indices[v])
+                    n_closed = v.n_closed_connections()
                     v.close_connections(vtest.direction(v))
+                    self.n_closed += v.n_closed_connections() - n_closed
+                    self._touch(self.vertex_indices[v])
         # check if this makes the hashi complete
-        if all([v.complete for v in self.vertices]): self.complete = True
+        if self.n_complete == self.nvertices: self.complete = True
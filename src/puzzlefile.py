@@ -0,0 +1,183 @@
+# Binary container format for storing many puzzles (and optionally their solutions) in one file.
+
+# Layout of the file (all numbers little-endian):
+# - header (24 bytes):
+#   - magic string b'HASHIPZ1' (8 bytes)
+#   - format version (uint32)
+#   - number of puzzles (uint32)
+#   - offset of the index in bytes (uint64)
+# - records, one per puzzle, each consisting of:
+#   - record header: number of vertices, number of bridges, flags, reserved (4 x uint32)
+#   - x coordinates, y coordinates, numbers and multiplicities of the vertices
+#     (4 arrays of int32, each with length number of vertices)
+#   - bridges (array of int32 with shape (number of bridges, 3)),
+#     where each bridge is given by the indices of both vertices and the number of connections
+# - index: offset of each record in bytes (array of uint64, with length number of puzzles)
+# All arrays start at a multiple of 4 bytes, so that they can be read from a memory map
+# without copying.
+# The bridges are only present if the record has the solution flag set;
+# they can be the full solution of the puzzle or any partial solution.
+
+# external imports
+import numpy as np
+
+# local imports
+from vertex import Vertex
+from hashi import Hashi
+
+
+magic = b'HASHIPZ1'
+version = 1
+header_dtype = np.dtype([('magic', 'S8'), ('version', '<u4'), ('npuzzles', '<u4'), ('index_offset', '<u8')])
+record_dtype = np.dtype([('nvertices', '<u4'), ('nbridges', '<u4'), ('flags', '<u4'), ('reserved', '<u4')])
+flag_solution = 1
+
+
+def get_bridges(hashi):
+    ### get the bridges of a hashi as an array of shape (number of bridges, 3)
+    # note: each row holds the indices of both vertices and the number of connections.
+    bridges = []
+    for (x1, y1, x2, y2), edges in hashi.get_edges().items():
+        bridges.append([hashi.coordinate_indices[(x1, y1)], hashi.coordinate_indices[(x2, y2)], len(edges)])
+    return np.array(bridges, dtype='<i4').reshape(-1, 3)
+
+
+class PuzzleFileWriter(object):
+    # implementation of a writer for the binary container format.
+    # note: puzzles are written to the file as they are added,
+    #       the index is written when the writer is closed.
+    #       use as a context manager to make sure this happens, e.g.:
+    #       with PuzzleFileWriter('puzzles.hpz') as writer:
+    #           for hashi in hashis: writer.add(hashi)
+
+    def __init__(self, path):
+        ### initializer
+        self.path = path
+        self.f = open(path, 'wb')
+        self.offsets = []
+        # write a placeholder header (overwritten when closing)
+        self.f.write(np.zeros(1, dtype=header_dtype).tobytes())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add(self, hashi, solution=False):
+        ### add a hashi
+        # input arguments:
+        # - solution: whether to also store the edges of the hashi (e.g. if it is solved)
+        vertices = hashi.vertices
+        self.add_arrays([v.x for v in vertices], [v.y for v in vertices],
+                        [v.n for v in vertices], [v.multiplicity for v in vertices],
+                        bridges=(get_bridges(hashi) if solution else None))
+
+    def add_arrays(self, x, y, n, multiplicity, bridges=None):
+        ### add a puzzle given as arrays
+        # input arguments:
+        # - x, y, n, multiplicity: arrays with length number of vertices
+        # - bridges: array of shape (number of bridges, 3) (see get_bridges),
+        #   or None if no solution is to be stored
+        nvertices = len(n)
+        record = np.zeros(1, dtype=record_dtype)
+        record['nvertices'] = nvertices
+        if bridges is not None:
+            bridges = np.asarray(bridges, dtype='<i4').reshape(-1, 3)
+            record['nbridges'] = len(bridges)
+            record['flags'] = flag_solution
+        self.offsets.append(self.f.tell())
+        self.f.write(record.tobytes())
+        for values in [x, y, n, multiplicity]:
+            values = np.asarray(values, dtype='<i4')
+            if len(values)!=nvertices: raise Exception('ERROR: arrays have different lengths.')
+            self.f.write(values.tobytes())
+        if bridges is not None: self.f.write(bridges.tobytes())
+
+    def close(self):
+        ### write the index and the header and close the file
+        if self.f is None: return
+        index_offset = self.f.tell()
+        self.f.write(np.array(self.offsets, dtype='<u8').tobytes())
+        header = np.zeros(1, dtype=header_dtype)
+        header['magic'] = magic
+        header['version'] = version
+        header['npuzzles'] = len(self.offsets)
+        header['index_offset'] = index_offset
+        self.f.seek(0)
+        self.f.write(header.tobytes())
+        self.f.close()
+        self.f = None
+
+
+class PuzzleFile(object):
+    # implementation of a reader for the binary container format.
+    # note: the file is memory-mapped, so opening it does not read the puzzles;
+    #       the arrays of a puzzle (see get_arrays) are views on the memory map (no copy),
+    #       and Hashi objects are only made when requested (see get_hashi).
+    # note: can be used as a sequence of Hashi objects, e.g.:
+    #       for hashi in PuzzleFile('puzzles.hpz'): ...
+
+    def __init__(self, path):
+        ### initializer
+        self.path = path
+        self.data = np.memmap(path, dtype=np.uint8, mode='r')
+        header = self.data[:header_dtype.itemsize].view(header_dtype)[0]
+        if header['magic'] != magic:
+            raise Exception('ERROR: file {} is not a puzzle file.'.format(path))
+        if header['version'] > version:
+            msg = 'ERROR: file {} has format version {},'.format(path, header['version'])
+            msg += ' while only versions up to {} are supported.'.format(version)
+            raise Exception(msg)
+        self.npuzzles = int(header['npuzzles'])
+        index_offset = int(header['index_offset'])
+        self.offsets = self.data[index_offset:index_offset+8*self.npuzzles].view('<u8')
+
+    def __str__(self):
+        return 'PuzzleFile {} ({} puzzles)'.format(self.path, self.npuzzles)
+
+    def __len__(self):
+        return self.npuzzles
+
+    def __getitem__(self, idx):
+        return self.get_hashi(idx)
+
+    def __iter__(self):
+        for idx in range(self.npuzzles): yield self.get_hashi(idx)
+
+    def get_arrays(self, idx):
+        ### get the arrays of a puzzle
+        # returns:
+        # - a dict with keys x, y, n, multiplicity (arrays with length number of vertices)
+        #   and bridges (array of shape (number of bridges, 3), or None if no solution is stored)
+        if idx < 0: idx += self.npuzzles
+        if idx < 0 or idx >= self.npuzzles:
+            raise IndexError('puzzle index {} out of range.'.format(idx))
+        offset = int(self.offsets[idx])
+        record = self.data[offset:offset+record_dtype.itemsize].view(record_dtype)[0]
+        nvertices = int(record['nvertices'])
+        offset += record_dtype.itemsize
+        values = self.data[offset:offset+16*nvertices].view('<i4').reshape(4, nvertices)
+        res = {'x': values[0], 'y': values[1], 'n': values[2], 'multiplicity': values[3], 'bridges': None}
+        if record['flags'] & flag_solution:
+            offset += 16*nvertices
+            nbridges = int(record['nbridges'])
+            res['bridges'] = self.data[offset:offset+12*nbridges].view('<i4').reshape(nbridges, 3)
+        return res
+
+    def has_solution(self, idx):
+        ### check if a solution is stored for a puzzle
+        return (self.get_arrays(idx)['bridges'] is not None)
+
+    def get_hashi(self, idx, solved=False):
+        ### make a Hashi object for a puzzle
+        # input arguments:
+        # - solved: whether to add the stored solution (if any) to the hashi
+        arrays = self.get_arrays(idx)
+        vertices = [Vertex(x, y, n, multiplicity=m) for x, y, n, m in zip(arrays['x'].tolist(),
+                      arrays['y'].tolist(), arrays['n'].tolist(), arrays['multiplicity'].tolist())]
+        hashi = Hashi(vertices)
+        if solved and arrays['bridges'] is not None:
+            for v1idx, v2idx, nbridges in arrays['bridges'].tolist():
+                for _ in range(nbridges): hashi.add_edge(v1idx, v2idx)
+        return hashi
@@ -2,6 +2,12 @@ import numpy as np
 
 class Vertex(object):
     # implementation of single vertex object.
+    # note: the state of the connections is packed in a few integers
+    #       (see below), so that the vertex methods used by the solvers
+    #       do not need any array operations.
+    __slots__ = ('x', 'y', 'n', 'multiplicity', 'complete', 'neighbours',
+                 '_established', '_closed', '_n_established', '_n_closed',
+                 '_n_established_total', '_n_closed_total')
 
     def __init__(self, x, y, n, multiplicity=2, connections=None, neighbours=None):
         ### initializer
@@ -13,23 +19,42 @@ class Vertex(object):
         self.multiplicity = multiplicity
         # set vertex completion to false
         self.complete = False
-        # initialize list of connections
+        # initialize connections
         # note: convention is [u1,u2,r1,r2,d1,d2,l1,12]
         # note: 0 = no connection, but connection allowed
         #       1 = established connection
         #       -1 = no connection allowed
+        # note: internally, the connections are stored as two bitmasks
+        #       (one for established and one for closed connections),
+        #       where bit multiplicity*direction+idx corresponds to element
+        #       multiplicity*direction+idx in the convention above;
+        #       on top of that, the number of established and closed connections
+        #       is counted per direction and in total.
+        #       the full list can be retrieved with the connections attribute.
+        self._established = 0
+        self._closed = 0
+        self._n_established = [0, 0, 0, 0]
+        self._n_closed = [0, 0, 0, 0]
+        self._n_established_total = 0
+        self._n_closed_total = 0
         if connections is not None:
             # special case: connections are provided as argument
             # (e.g. when copying an already partially solved vertex)
-            self.connections = connections.astype(int)
+            for idx, connection in enumerate(connections):
+                direction = idx // multiplicity
+                if connection==1:
+                    self._established |= (1 << idx)
+                    self._n_established[direction] += 1
+                    self._n_established_total += 1
+                elif connection==-1:
+                    self._closed |= (1 << idx)
+                    self._n_closed[direction] += 1
+                    self._n_closed_total += 1
             # check completion
-            if np.sum(self.connections==1)==self.n:
+            if self._n_established_total==self.n:
                 self.complete = True
                 # close all remaining connections for this vertex
-                self.connections = np.where(self.connections==0, -1, self.connections)
-        else:
-            # default case: all connections are initialized to 0 (allowed connection)
-            self.connections = np.zeros(4*multiplicity).astype(int)
+                self._close_all()
         # initialize list of neighbouring vertices,
         # i.e. vertices that are topologically connected with this one.
         # note: convention is [up, right, down, left]
@@ -42,11 +67,49 @@ class Vertex(object):
         infostr = 'Vertex (x: {}, y: {}, n: {}'.format(self.x, self.y, self.n)
         infostr += ', complete: {}, connections: {})'.format(self.complete, self.connections)
         return infostr
+
+    @property
+    def connections(self):
+        ### get the connections as an array
+        # note: convention is the same as in the initializer.
+        # note: this is a new array, modifying it does not modify the vertex.
+        connections = np.zeros(4*self.multiplicity).astype(int)
+        for idx in range(4*self.multiplicity):
+            if (self._established >> idx) & 1: connections[idx] = 1
+            elif (self._closed >> idx) & 1: connections[idx] = -1
+        return connections
     
     def copy(self):
         # note: neighbours are not copied,
         #       maybe change in the future if the need arises
-        return Vertex(self.x, self.y, self.n, multiplicity=self.multiplicity, connections=np.copy(self.connections))
+        return Vertex(self.x, self.y, self.n, multiplicity=self.multiplicity, connections=self.connections)
+
+    def get_state(self):
+        ### get the state of the connections
+        # note: mostly intended to restore it later with set_state,
+        #       e.g. to undo modifications (see Hashi.checkpoint and Hashi.rollback).
+        return (self.complete, self._established, self._closed,
+                tuple(self._n_established), tuple(self._n_closed),
+                self._n_established_total, self._n_closed_total)
+
+    def set_state(self, state):
+        ### set the state of the connections
+        # note: the state is supposed to be retrieved earlier with get_state.
+        (self.complete, self._established, self._closed,
+          n_established, n_closed,
+          self._n_established_total, self._n_closed_total) = state
+        self._n_established = list(n_established)
+        self._n_closed = list(n_closed)
+
+    def _direction_mask(self, direction):
+        ### get a bitmask with all bits set for connections in a given direction
+        return ((1 << self.multiplicity) - 1) << (self.multiplicity*direction)
+
+    def _close_all(self):
+        ### close all remaining potential connections
+        self._closed = ((1 << 4*self.multiplicity) - 1) & ~self._established
+        self._n_closed = [self.multiplicity - n for n in self._n_established]
+        self._n_closed_total = 4*self.multiplicity - self._n_established_total
 
     def get_connections(self, direction):
         ### get connections in a given direction
@@ -87,85 +150,122 @@ class Vertex(object):
         if not other.has_established_connection(direction_self_wrt_other): return False
         return True
 
-    def n_established_connections(self, direction):
+    def n_established_connections(self, direction=None):
         # count number of established connections in a given direction
-        connections = self.get_connections(direction)
-        return np.sum(connections==1)
+        # (or in all directions if direction is None)
+        if direction is None: return self._n_established_total
+        return self._n_established[direction]
 
     def has_established_connection(self, direction):
         # check if at least one connection in a given direction is established
-        return (self.n_established_connections(direction)>0)
+        return (self._n_established[direction]>0)
 
-    def n_potential_connections(self, direction):
+    def n_potential_connections(self, direction=None):
         # cound number of potential connections in a given direction
-        connections = self.get_connections(direction)
-        return np.sum(connections==0)
+        # (or in all directions if direction is None)
+        if direction is None:
+            return 4*self.multiplicity - self._n_established_total - self._n_closed_total
+        return self.multiplicity - self._n_established[direction] - self._n_closed[direction]
 
     def has_potential_connection(self, direction):
         # check if at least one connection in a given direction is possible
         return (self.n_potential_connections(direction)>0)
 
-    def n_closed_connections(self, direction):
+    def n_closed_connections(self, direction=None):
         # cound number of closed connections in a given direction
-        connections = self.get_connections(direction)
-        return np.sum(connections==-1)
+        # (or in all directions if direction is None)
+        if direction is None: return self._n_closed_total
+        return self._n_closed[direction]
 
     def has_closed_connection(self, direction):
         # check if at least one connection in a given direction is closed
-        return (self.n_closed_connections(direction)>0)
+        return (self._n_closed[direction]>0)
     
+    def connection_counts(self):
+        # get the number of established and potential connections in each direction
+        # note: returns a tuple of two lists of the form [up, right, down, left]
+        established = list(self._n_established)
+        potential = [self.multiplicity - e - c for e, c in zip(self._n_established, self._n_closed)]
+        return (established, potential)
+
     def n_missing_connections(self):
         # check how many connections are still missing for this vertex
-        return self.n - np.sum(self.connections==1)
+        return self.n - self._n_established_total
 
     def directions_with_established_connection(self):
-        return [d for d in [0,1,2,3] if self.has_established_connection(d)]
+        return [d for d in [0,1,2,3] if self._n_established[d]>0]
 
     def directions_with_potential_connection(self):
         return [d for d in [0,1,2,3] if self.has_potential_connection(d)]
 
     def directions_with_closed_connection(self):
-        return [d for d in [0,1,2,3] if self.has_closed_connection(d)]
+        return [d for d in [0,1,2,3] if self._n_closed[d]>0]
 
     def add_connection(self, direction):
         # add a connections in a given direction
-        n = 0
-        while n < self.multiplicity:
-            if self.connections[self.multiplicity*direction+n]==0:
-                self.connections[self.multiplicity*direction+n] = 1
-                break
-            else: n += 1
-        if n==self.multiplicity: raise Exception('ERROR: connection not allowed.')
+        # note: the first potential connection in this direction is used.
+        potential = self._direction_mask(direction) & ~(self._established | self._closed)
+        if potential==0: raise Exception('ERROR: connection not allowed.')
+        self._established |= potential & -potential
+        self._n_established[direction] += 1
+        self._n_established_total += 1
         # check if this makes the vertex complete
-        if np.sum(self.connections==1)==self.n:
+        if self._n_established_total==self.n:
             self.complete = True
             # close all remaining connections for this vertex
-            self.connections = np.where(self.connections==0, -1, self.connections)
+            self._close_all()
 
     def close_connection(self, direction, n, suppress_warnings=False):
         # close a potential connection in a given direction
         # note: usually only used as auxiliary function to close_connections
-        if self.connections[self.multiplicity*direction+n]==1:
+        bit = 1 << (self.multiplicity*direction+n)
+        if self._established & bit:
             raise Exception('ERROR: trying to close an already established connection.')
-        elif self.connections[self.multiplicity*direction+n]==-1 and not suppress_warnings:
-            print('WARNING: trying to close an already closed connection.')
-        # close the connection
-        self.connections[self.multiplicity*direction+n] = -1
+        elif self._closed & bit:
+            if not suppress_warnings:
+                print('WARNING: trying to close an already closed connection.')
+        else:
+            # close the connection
+            self._closed |= bit
+            self._n_closed[direction] += 1
+            self._n_closed_total += 1
         # check if this makes the vertex complete
-        if np.sum(self.connections==1)==self.n: self.complete = True
+        if self._n_established_total==self.n: self.complete = True
 
     def close_connections(self, direction, suppress_warnings=False):
         # close all potential connections in a given direction
-        for n in range(self.multiplicity): self.close_connection(direction, n, suppress_warnings=suppress_warnings)
+        mask = self._direction_mask(direction)
+        if self._established & mask:
+            raise Exception('ERROR: trying to close an already established connection.')
+        if (self._closed & mask) and not suppress_warnings:
+            print('WARNING: trying to close an already closed connection.')
+        self._closed |= mask
+        self._n_closed_total += self.multiplicity - self._n_closed[direction]
+        self._n_closed[direction] = self.multiplicity
+        # check if this makes the vertex complete
+        if self._n_established_total==self.n: self.complete = True
 
     def close_n_connections(self, direction, n, suppress_warnings=False):
         # close a given number of connections in a given direction
-        n_closed = 0
-        for idx in range(self.multiplicity):
-            if self.connections[self.multiplicity*direction+idx]==0:
-                self.close_connection(direction, idx, suppress_warnings=suppress_warnings)
-                n_closed += 1
-                if n_closed == n: break
+        # note: the first potential connections in this direction are closed.
+        # note: the potential connections in a direction normally form a contiguous block of bits
+        #       (as connections are always established and closed from the lowest bit upwards),
+        #       in which case the bits to close are found at once, independent of the multiplicity;
+        #       else (e.g. for a vertex made from arbitrary connections) they are found one by one.
+        potential = self._direction_mask(direction) & ~(self._established | self._closed)
+        n_closed = min(n, self.n_potential_connections(direction))
+        if n_closed > 0:
+            lowest = potential & -potential
+            if (potential + lowest) & potential == 0:
+                self._closed |= (lowest << n_closed) - lowest
+            else:
+                for _ in range(n_closed):
+                    bit = potential & -potential
+                    potential ^= bit
+                    self._closed |= bit
+        self._n_closed[direction] += n_closed
+        self._n_closed_total += n_closed
+        if n_closed > 0 and self._n_established_total==self.n: self.complete = True
         if n_closed < n and not suppress_warnings:
             print('WARNING: could not find enough connections to close.')
 
@@ -190,7 +290,8 @@ class Vertex(object):
     def find_closest(self, others, direction):
         ### find closest vertex among provided others in a given direction
         # note: returns None if no vertices in the given direction were found
-        # note: mostly intended as a helper function for initialization of the topology;
+        # note: a Hashi does not use this function for its initialization,
+        #       as it finds the neighbours of all vertices at once in Hashi.find_neighbours;
         #       after initialization, the closest vertex in each direction
         #       is stored in the neighbours attribute.
         candidates = [v for v in others if v.is_in_direction(self, direction)]
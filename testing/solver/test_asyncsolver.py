@@ -0,0 +1,75 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+
+sys.path.append('../../src')
+from hashi import Hashi
+import generator
+sys.path.append('../../solver')
+import asyncsolver
+
+
+# puzzle that takes about a second to solve with search
+txt = generator.generate_str(40, 40, seed=5, density=0.25, loop_fraction=0.3)
+
+
+async def main(inputfile):
+
+    # solve a hashi while printing the progress
+    h = Hashi.from_txt(inputfile)
+    def progress(info):
+        print('Round {}, rule {}: {} bridges'.format(info['round'], info['rule'], info['edges']))
+    stats = await asyncsolver.solve_async(h, progress=progress)
+    print('Complete: {}'.format(h.complete))
+
+    # same with the asynchronous iterator
+    h = Hashi.from_txt(inputfile)
+    async for info in asyncsolver.iter_progress(h, snapshots=True):
+        if info['final']: print('Final solution: {}'.format(info['solution']))
+
+    # start solving and cancel it right away
+    h = Hashi.from_txt(inputfile)
+    task = asyncio.ensure_future(asyncsolver.solve_async(h))
+    await asyncio.sleep(0)
+    task.cancel()
+    try: await task
+    except asyncio.CancelledError: print('Cancelled')
+
+    # cancel a longer solving with an engine that can not be stopped halfway
+    # note: the task only finishes once the hashi is not modified anymore.
+    h = Hashi.from_str(txt)
+    task = asyncio.ensure_future(asyncsolver.solve_async(h, engine='search'))
+    await asyncio.sleep(0.05)
+    task.cancel()
+    try: await task
+    except asyncio.CancelledError: print('Cancelled')
+    nedges = len(h.edges)
+    await asyncio.sleep(0.5)
+    print('Stopped after cancelling: {}'.format(len(h.edges)==nedges))
+
+
+if __name__=='__main__':
+
+    # read input file
+    #inputfile = sys.argv[1]
+    inputfile = '../../fls/example1.txt'
+
+    asyncio.run(main(inputfile))
+
+    # same with a solver running in a background thread
+    solver = asyncsolver.BackgroundSolver()
+    h = Hashi.from_str(txt)
+    finished = threading.Event()
+    def done(task):
+        print('Done, cancelled: {}'.format(task.cancelled()))
+        finished.nedges = len(h.edges)
+        finished.set()
+    solving = solver.submit(h, engine='search', done=done)
+    time.sleep(0.05)
+    solving.cancel()
+    finished.wait()
+    time.sleep(0.5)
+    print('Stopped after cancelling: {}'.format(len(h.edges)==finished.nedges))
+    solver.close()
@@ -0,0 +1,44 @@
+import os
+import sys
+import signal
+
+sys.path.append('../../src')
+import generator
+sys.path.append('../../solver')
+import batchsolver
+
+
+if __name__=='__main__':
+
+    # solve a small puzzle with search within the timeout
+    with open('../../fls/menneske/superhard_7x7_1953.txt', 'r') as f: txt = f.read().strip()
+    result = batchsolver.solve_text(txt, name='small', engine='search', timeout=10.)
+    print('Status: {} (expected solved)'.format(result['status']))
+
+    # solve a large puzzle with search that takes longer than the timeout
+    # note: the timeout must stop the search instead of being treated as a contradiction.
+    txt = generator.generate_str(40, 40, seed=2, density=0.25, loop_fraction=0.3)
+    result = batchsolver.solve_text(txt, name='large', engine='search', timeout=0.5)
+    print('Status: {} (expected timeout), time: {:.2f} seconds'.format(result['status'], result['time']))
+
+    # solve a stream of puzzles and write the results with the solved boards
+    # note: the results of a stream have a name instead of a file.
+    lines = batchsolver.iter_lines(['../../fls/example1.txt', '../../fls/example2.txt'])
+    results = batchsolver.solve_stream(lines, workers=1, pretty=True)
+    outputfile = 'test_batchsolver_output.jsonl'
+    summary = batchsolver.write_jsonl(results, outputfile=outputfile, pretty=True)
+    print('Summary: {}'.format(summary))
+    os.remove(outputfile)
+
+    # solve a puzzle many times with a timeout close to the solving time
+    # note: the timer must never go off outside of solve_puzzle,
+    #       and the signal handler of this process must be restored.
+    previous_handler = signal.signal(signal.SIGALRM, signal.SIG_IGN)
+    with open('../../fls/example1.txt', 'r') as f: txt = f.read().strip()
+    statuses = {}
+    for timeout in [0.0001*i for i in range(1, 101)]:
+        result = batchsolver.solve_text(txt, name='small', timeout=timeout, pretty=True)
+        statuses[result['status']] = statuses.get(result['status'], 0) + 1
+    print('Statuses: {}'.format(statuses))
+    print('Signal handler restored: {}'.format(signal.getsignal(signal.SIGALRM)==signal.SIG_IGN))
+    signal.signal(signal.SIGALRM, previous_handler)
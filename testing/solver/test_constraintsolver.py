@@ -0,0 +1,23 @@
+import os
+import sys
+
+sys.path.append('../../src')
+from hashi import Hashi
+sys.path.append('../../solver')
+import hashisolver
+
+
+if __name__=='__main__':
+
+    # read input file
+    #inputfile = sys.argv[1]
+    inputfile = '../../fls/menneske/superhard_7x7_1953.txt'
+
+    # solve the hashi with each of the solving engines
+    # (the 'rules' engine does not find the full solution for this example)
+    for engine in hashisolver.engines:
+        h = Hashi.from_txt(inputfile)
+        hashisolver.solve(h, engine=engine, verbose=(engine=='constraint'))
+        h.print()
+        print('Engine: {}'.format(engine))
+        print('Complete: {}'.format(h.complete))
@@ -25,4 +25,31 @@ if __name__=='__main__':
     h.print()
     
     # test disjoint solving methods
-    disjointsolver.close_connections_disjoint(h, verbose=True)
\ No newline at end of file
+    disjointsolver.close_connections_disjoint(h, verbose=True)
+    # regression test for make_joining_connection:
+    # a connection towards a cluster that would be made complete may only be ignored
+    # if that cluster cannot connect to anything else,
+    # and if both clusters together do not make up the full hashi.
+    # in the state below, the island (4,1) can only connect to the other cluster,
+    # but together they make up the full hashi, so no connection is forced
+    # (the correct solution uses a double bridge between (2,1) and (4,1)).
+    h = Hashi.from_str('4-4-3\n-----\n----2\n2-3-2\n-----')
+    for c1, c2 in [((0,4),(2,4)), ((0,4),(2,4)), ((0,4),(0,1)), ((0,4),(0,1)),
+                   ((4,4),(4,2)), ((4,4),(2,4)), ((2,1),(2,4))]:
+        h.add_edge(h.coordinate_indices[c1], h.coordinate_indices[c2])
+    hashisolver.close_connections(h)
+    h.print()
+    added_edges = disjointsolver.make_joining_connection(h, verbose=True)
+    print('Added edges (expected none): {}'.format(len(added_edges)))
+
+    # regression test: puzzles that the old version of make_joining_connection
+    # solved incorrectly (and then ran into a contradiction)
+    import constraintsolver
+    for inputfile in ['../../fls/menneske/superhard_7x7_1564.txt', '../../fls/menneske/superhard_7x7_3831.txt']:
+        h = Hashi.from_txt(inputfile)
+        hashisolver.solve(h)
+        solution = Hashi.from_txt(inputfile)
+        constraintsolver.solve(solution)
+        edges = h.get_edges()
+        consistent = all([len(edges[key]) <= len(solution.get_edges().get(key, [])) for key in edges])
+        print('{}: complete: {}, consistent with solution: {}'.format(inputfile, h.complete, consistent))
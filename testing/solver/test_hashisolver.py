@@ -17,7 +17,8 @@ if __name__=='__main__':
     for v in h.vertices: print('  - {}'.format(v))
 
     # solve the hashi
-    hashisolver.solve(h)
+    stats = hashisolver.solve(h, stats=True)
     h.print()
     for v in h.vertices: print('  - {}'.format(v))
-    print('Complete: {}'.format(h.complete))
\ No newline at end of file
+    print('Complete: {}'.format(h.complete))
+    print(stats)
\ No newline at end of file
@@ -0,0 +1,47 @@
+import os
+import sys
+import time
+
+sys.path.append('../../src')
+from hashi import Hashi
+import generator
+sys.path.append('../../solver')
+import hashisolver
+import searchsolver
+
+
+if __name__=='__main__':
+
+    # read input file
+    #inputfile = sys.argv[1]
+    inputfile = '../../fls/menneske/superhard_7x7_1953.txt'
+    h = Hashi.from_txt(inputfile)
+    h.print()
+
+    # solve the hashi with only the deterministic solving methods
+    # (does not find the full solution for this example)
+    hashisolver.solve(h)
+    h.print()
+    print('Complete: {}'.format(h.complete))
+
+    # solve the hashi with search
+    solved = searchsolver.solve(h, verbose=True)
+    h.print()
+    for v in h.vertices: print('  - {}'.format(v))
+    print('Solved: {}'.format(solved))
+    print('Complete: {}'.format(h.complete))
+
+    # solve a larger generated hashi with search
+    # and check that the incomplete vertices of the clusters are kept up to date
+    # (these are used to only process the relevant clusters after each option)
+    sys.path.append('../../src')
+    txt = generator.generate_str(30, 30, seed=4, density=0.25, loop_fraction=0.3)
+    h = Hashi.from_str(txt)
+    starttime = time.perf_counter()
+    solved = searchsolver.solve(h)
+    print('Solved: {} ({:.2f} seconds)'.format(solved, time.perf_counter()-starttime))
+    up_to_date = all([set(cluster.incomplete)==set([v for v in cluster.vertices if not v.complete])
+                      for cluster in h.clusters.values()])
+    print('Incomplete vertices up to date: {}'.format(up_to_date))
+    n_closed = sum([v.n_closed_connections() for v in h.vertices])
+    print('Number of closed connections up to date: {}'.format(h.n_closed_connections()==n_closed))
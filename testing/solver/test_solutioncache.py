@@ -0,0 +1,33 @@
+import os
+import sys
+import numpy as np
+
+sys.path.append('../../src')
+from hashi import Hashi
+sys.path.append('../../solver')
+from solutioncache import SolutionCache
+
+
+if __name__=='__main__':
+
+    # read input file
+    #inputfile = sys.argv[1]
+    inputfile = '../../fls/example1.txt'
+    with open(inputfile, 'r') as f: txt = f.read().strip()
+
+    # make a cache that identifies rotated and reflected puzzles
+    cache = SolutionCache(maxsize=10, symmetries=True)
+
+    # solve the hashi (not yet in the cache)
+    h = Hashi.from_str(txt)
+    fromcache = cache.solve(h)
+    print('From cache: {}, complete: {}'.format(fromcache, h.complete))
+
+    # solve a rotated version of the hashi (from the cache)
+    grid = np.array([list(line.strip()) for line in txt.split('\n')])
+    rotated = '\n'.join([''.join(row) for row in np.rot90(grid)])
+    h = Hashi.from_str(rotated)
+    fromcache = cache.solve(h)
+    h.print()
+    print('From cache: {}, complete: {}'.format(fromcache, h.complete))
+    print(cache)
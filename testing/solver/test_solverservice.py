@@ -0,0 +1,72 @@
+import os
+import sys
+import json
+import time
+import threading
+import urllib.request
+import urllib.error
+from http.server import ThreadingHTTPServer
+
+sys.path.append('../../src')
+sys.path.append('../../solver')
+import solverservice
+
+
+def post(port, body, content_type='application/json'):
+    # send a request to the solve endpoint and return the response code and content
+    request = urllib.request.Request('http://127.0.0.1:{}/solve'.format(port),
+                data=body.encode('utf-8'), headers={'Content-Type': content_type})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return (response.status, json.loads(response.read()))
+    except urllib.error.HTTPError as e:
+        return (e.code, json.loads(e.read()))
+
+
+if __name__=='__main__':
+
+    # start the service on a free port
+    service = solverservice.SolverService(workers=1, max_timeout=10.)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), solverservice.make_handler(service))
+    port = server.server_address[1]
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    # valid requests
+    with open('../../fls/example1.txt', 'r') as f: txt = f.read().strip()
+    (code, response) = post(port, txt, content_type='text/plain')
+    print('Plain text: {} {}'.format(code, [r['status'] for r in response['results']]))
+    (code, response) = post(port, json.dumps({'puzzles': [txt, txt], 'timeout': 100}))
+    print('Batch with large timeout: {} {}'.format(code, [r['status'] for r in response['results']]))
+
+    # invalid requests (all expected to give code 400)
+    invalid = [
+      '[1]',
+      json.dumps(txt),
+      'not json',
+      json.dumps({'puzzles': txt}),
+      json.dumps({'puzzles': [txt, 1]}),
+      json.dumps({'puzzle': txt, 'timeout': -1}),
+      json.dumps({'puzzle': txt, 'timeout': 0}),
+      json.dumps({'puzzle': txt, 'timeout': 'fast'}),
+      json.dumps({'puzzle': txt, 'engine': ['rules']}),
+      json.dumps({'puzzle': txt, 'pretty': 'yes'}),
+      json.dumps({'image': 'not base64!'}),
+      json.dumps({}),
+    ]
+    for body in invalid:
+        (code, response) = post(port, body)
+        print('{}: {} {}'.format(body[:40], code, response['error']))
+
+    # puzzle without a result in time from the workers
+    # (the only worker is kept busy for longer than the timeout plus the margin of the service)
+    # note: the result still identifies the puzzle and has the same keys as the other results.
+    service.max_timeout = 0.1
+    service.pool.apply_async(time.sleep, (6.,))
+    (code, response) = post(port, json.dumps({'puzzles': [txt]}))
+    print('Busy workers: {} {}'.format(code, response['results']))
+
+    # stop the service
+    server.shutdown()
+    server.server_close()
+    service.close()
@@ -0,0 +1,54 @@
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append('../../src')
+from hashi import Hashi
+from boardstate import BoardState
+import generator
+sys.path.append('../../solver')
+import hashisolver
+import searchsolver
+
+
+def same_state(hashi):
+    # check that the persistent board state of a hashi matches a new snapshot
+    state = hashi.get_board_state()
+    snapshot = BoardState.from_hashi(hashi)
+    return( np.array_equal(state.established, snapshot.established)
+            and np.array_equal(state.potential, snapshot.potential)
+            and np.array_equal(state.n_established, snapshot.n_established) )
+
+
+if __name__=='__main__':
+
+    # make a board state and solve the hashi
+    h = Hashi.from_txt('../../fls/example1.txt')
+    h.get_board_state()
+    hashisolver.solve(h)
+    print('Complete: {}'.format(h.complete))
+    print('Persistent state up to date after solving: {}'.format(same_state(h)))
+
+    # check the persistent state after undoing modifications
+    h = generator.generate(20, 20, seed=1)
+    h.get_board_state()
+    marker = h.checkpoint()
+    hashisolver.solve(h)
+    h.rollback(marker)
+    h.clear_trail()
+    print('Persistent state up to date after rollback: {}'.format(same_state(h)))
+    searchsolver.solve(h)
+    print('Complete: {}'.format(h.complete))
+    print('Persistent state up to date after search: {}'.format(same_state(h)))
+
+    # compare the time to get the state of a large hashi
+    h = generator.generate(200, 200, seed=1)
+    hashisolver.solve(h)
+    starttime = time.perf_counter()
+    for _ in range(10): BoardState.from_hashi(h)
+    print('Snapshot: {:.2f} ms'.format((time.perf_counter()-starttime)*100))
+    h.get_board_state()
+    starttime = time.perf_counter()
+    for _ in range(10): h.get_board_state()
+    print('Persistent state: {:.3f} ms'.format((time.perf_counter()-starttime)*100))
@@ -0,0 +1,32 @@
+import os
+import sys
+
+sys.path.append('../../src')
+from hashi import Hashi
+import generator
+sys.path.append('../../solver')
+import hashisolver
+
+
+if __name__=='__main__':
+
+    # generate a random puzzle and print it
+    txt = generator.generate_str(12, 10, seed=1)
+    print(txt)
+    h = Hashi.from_str(txt)
+    h.print()
+
+    # check that it is reproducible
+    print('Reproducible: {}'.format(txt==generator.generate_str(12, 10, seed=1)))
+
+    # solve it
+    hashisolver.solve(h, engine='constraint')
+    h.print()
+    print('Complete: {}'.format(h.complete))
+
+    # generate a puzzle with a unique solution
+    h = generator.generate(8, 8, seed=1, unique=True)
+    h.print()
+    hashisolver.solve(h)
+    h.print()
+    print('Complete: {}'.format(h.complete))
@@ -0,0 +1,51 @@
+import os
+import sys
+
+sys.path.append('../../src')
+from hashi import Hashi
+import generator
+sys.path.append('../../solver')
+import hashisolver
+
+
+if __name__=='__main__':
+
+    # parse a puzzle with up to three bridges between two islands
+    txt = 'multiplicity 3\n6--6\n----\n6--6'
+    h = Hashi.from_str(txt)
+    print('Multiplicity: {}'.format(h.multiplicity))
+    print('Round trip: {}'.format(h.to_str()==txt))
+    print('Sparse round trip: {}'.format(Hashi.from_str(h.to_str(sparse=True)).to_str()==txt))
+
+    # solve it and print it
+    hashisolver.solve(h)
+    h.print()
+    print('Complete: {}'.format(h.complete))
+
+    # this puzzle is not possible with single bridges
+    try:
+        Hashi.from_str(txt, multiplicity=1)
+        print('Invalid puzzle accepted')
+    except Exception as e: print(e)
+
+    # generate and solve puzzles with larger multiplicities with all engines
+    for multiplicity in [1, 3, 4]:
+        txt = generator.generate_str(10, 10, seed=1, multiplicity=multiplicity)
+        print(txt)
+        for engine in hashisolver.engines:
+            h = Hashi.from_str(txt)
+            hashisolver.solve(h, engine=engine)
+            nedges = max([len(edges) for edges in h.get_edges().values()])
+            print('Engine {}: complete: {}, max bridges: {}'.format(engine, h.complete, nedges))
+        h.print()
+
+    # numbers that are not possible with the multiplicity or the neighbours
+    # are also rejected when making a hashi from a dict
+    for vdict in [{(0,0): 12, (2,0): 12}, {(0,0): 3, (2,0): 3}]:
+        try:
+            Hashi.from_dict(vdict)
+            print('Invalid puzzle accepted')
+        except Exception as e: print(e)
+    h = Hashi.from_dict({(0,0): 3, (2,0): 3}, multiplicity=3)
+    hashisolver.solve(h)
+    print('Complete: {}'.format(h.complete))
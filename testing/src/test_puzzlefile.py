@@ -0,0 +1,32 @@
+import os
+import sys
+
+sys.path.append('../../src')
+from hashi import Hashi
+from puzzlefile import PuzzleFile, PuzzleFileWriter
+sys.path.append('../../solver')
+import hashisolver
+
+
+if __name__=='__main__':
+
+    # read input files
+    inputfiles = ['../../fls/example1.txt', '../../fls/example2.txt']
+    outputfile = 'test_puzzlefile.hpz'
+
+    # write the puzzles and their solutions to a puzzle file
+    with PuzzleFileWriter(outputfile) as writer:
+        for inputfile in inputfiles:
+            h = Hashi.from_txt(inputfile)
+            hashisolver.solve(h)
+            writer.add(h, solution=True)
+
+    # read the puzzle file
+    puzzles = PuzzleFile(outputfile)
+    print(puzzles)
+    for idx in range(len(puzzles)):
+        print(puzzles.get_arrays(idx))
+        h = puzzles.get_hashi(idx, solved=True)
+        h.print()
+        print('Complete: {}'.format(h.complete))
+    os.remove(outputfile)